@@ -0,0 +1,217 @@
+"""
+Staff back-office listings across all customers.
+
+Every listing filters on a fixed set of equality fields plus a created_at
+range, sorts on one timestamp field and pages with a keyset cursor on
+(sort field, _id). Each combination of equality filters and sort field has a
+declared index, created at startup and forced with `hint`, so no listing
+can fall back to a collection scan.
+
+Totals never come from `count_documents`: unfiltered listings use the
+collection's estimated count, listings filtered on equality fields only read
+counters maintained on insert, and date-range listings report no total.
+"""
+import base64
+import json
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+MAX_PAGE_SIZE = 200
+
+
+class ListingError(ValueError):
+    """Invalid listing parameters (unknown sort field, malformed cursor or date)"""
+
+
+class ListingSpec:
+    def __init__(self, name: str, equality_fields: Tuple[str, ...], sort_fields: Tuple[str, ...]):
+        self.name = name
+        self.equality_fields = equality_fields
+        self.sort_fields = sort_fields
+
+    def filter_combinations(self) -> List[Tuple[str, ...]]:
+        return [
+            combo
+            for size in range(len(self.equality_fields) + 1)
+            for combo in combinations(self.equality_fields, size)
+        ]
+
+    def index_name(self, fields: Tuple[str, ...], sort_field: str) -> str:
+        return "bo_" + "_".join(fields + (sort_field,))
+
+    def indexes(self) -> List[Tuple[str, list]]:
+        """Equality fields first, then the sort field and _id for the keyset (ESR order)"""
+        return [
+            (self.index_name(fields, sort_field),
+             [(field, ASCENDING) for field in fields] + [(sort_field, DESCENDING), ("_id", DESCENDING)])
+            for fields in self.filter_combinations()
+            for sort_field in self.sort_fields
+        ]
+
+
+LISTINGS: Dict[str, ListingSpec] = {
+    "contacts": ListingSpec("contacts", ("status", "service"), ("created_at",)),
+    "quotes": ListingSpec("quotes", ("status", "service"), ("created_at", "updated_at")),
+    "tickets": ListingSpec("tickets", ("status", "priority"), ("created_at", "updated_at")),
+}
+
+
+def ensure_indexes(db) -> None:
+    for spec in LISTINGS.values():
+        for name, keys in spec.indexes():
+            db[spec.name].create_index(keys, name=name)
+
+
+# ===========================
+# Counters
+# ===========================
+
+def _counter_id(collection: str, filters: Dict[str, str]) -> str:
+    # Values come from user input, so keep them out of field names and use them only in _id
+    return collection + "|" + json.dumps(sorted(filters.items()))
+
+
+def record_insert(counters_collection, collection: str, document: dict) -> None:
+    """Increment the counter of every equality-filter combination the document matches"""
+    spec = LISTINGS[collection]
+    operations = []
+    for fields in spec.filter_combinations():
+        filters = {field: document.get(field) for field in fields}
+        operations.append(UpdateOne({"_id": _counter_id(collection, filters)}, {"$inc": {"count": 1}}, upsert=True))
+    counters_collection.bulk_write(operations, ordered=False)
+
+
+def record_removal(counters_collection, collection: str, documents: List[dict]) -> None:
+    """Decrement counters for documents removed from the live collection"""
+    spec = LISTINGS[collection]
+    decrements: Dict[str, int] = {}
+    for document in documents:
+        for fields in spec.filter_combinations():
+            counter_id = _counter_id(collection, {field: document.get(field) for field in fields})
+            decrements[counter_id] = decrements.get(counter_id, 0) + 1
+    if decrements:
+        counters_collection.bulk_write(
+            [UpdateOne({"_id": counter_id}, {"$inc": {"count": -count}}) for counter_id, count in decrements.items()],
+            ordered=False
+        )
+
+
+def rebuild_counters(db, counters_collection, collection: str) -> int:
+    """
+    Recompute the counters of one collection from scratch.
+    Needed after bulk loads or status changes made outside the API.
+
+    Fresh counts are written over the old ones before counters for filter
+    values that no longer occur are pruned, so listings keep their totals
+    while it runs. An insert counted between the aggregation and the write
+    is overwritten; run it when writes are quiet.
+    """
+    spec = LISTINGS[collection]
+    operations, counter_ids = [], []
+    for fields in spec.filter_combinations():
+        group_id = {field: f"${field}" for field in fields} or None
+        for row in db[collection].aggregate([{"$group": {"_id": group_id, "count": {"$sum": 1}}}], allowDiskUse=True):
+            filters = {field: (row["_id"] or {}).get(field) for field in fields}
+            counter_ids.append(_counter_id(collection, filters))
+            operations.append(UpdateOne({"_id": counter_ids[-1]}, {"$set": {"count": row["count"]}}, upsert=True))
+    if operations:
+        counters_collection.bulk_write(operations, ordered=False)
+    counters_collection.delete_many({
+        "_id": {"$regex": f"^{collection}\\|", "$nin": counter_ids}
+    })
+    return len(operations)
+
+
+# ===========================
+# Listing
+# ===========================
+
+def encode_cursor(sort_value, doc_id: ObjectId) -> str:
+    raw = json.dumps([sort_value, str(doc_id)]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    try:
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return sort_value, ObjectId(doc_id)
+    except (ValueError, TypeError, InvalidId):
+        raise ListingError("Invalid cursor")
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        # Timestamps are stored as ISO strings, which compare correctly as strings
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ListingError(f"Invalid {name}, expected an ISO date")
+
+
+def list_documents(db, counters_collection, collection: str, filters: Dict[str, Optional[str]],
+                   created_from: Optional[str] = None, created_to: Optional[str] = None,
+                   sort: str = "created_at", order: str = "desc", limit: int = 50,
+                   cursor: Optional[str] = None, projection: Optional[dict] = None) -> dict:
+    spec = LISTINGS[collection]
+    if sort not in spec.sort_fields:
+        raise ListingError(f"Cannot sort {collection} by {sort}")
+    if order not in ("asc", "desc"):
+        raise ListingError("order must be asc or desc")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    equality = {field: filters[field] for field in spec.equality_fields if filters.get(field) is not None}
+    query: dict = dict(equality)
+
+    created_from = _parse_date(created_from, "created_from")
+    created_to = _parse_date(created_to, "created_to")
+    date_range = {}
+    if created_from:
+        date_range["$gte"] = created_from
+    if created_to:
+        date_range["$lt"] = created_to
+    conditions = [{"created_at": date_range}] if date_range else []
+
+    direction = DESCENDING if order == "desc" else ASCENDING
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        op = "$lt" if direction == DESCENDING else "$gt"
+        conditions.append({"$or": [
+            {sort: {op: last_value}},
+            {sort: last_value, "_id": {op: last_id}},
+        ]})
+    if conditions:
+        query["$and"] = conditions
+
+    index_fields = tuple(field for field in spec.equality_fields if field in equality)
+    docs = list(
+        db[collection].find(query, projection)
+        .sort([(sort, direction), ("_id", direction)])
+        .hint(spec.index_name(index_fields, sort))
+        .limit(limit + 1)
+    )
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = encode_cursor(docs[-1].get(sort), docs[-1]["_id"]) if has_more else None
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+
+    if date_range:
+        total, total_source = None, None
+    elif not equality:
+        total, total_source = db[collection].estimated_document_count(), "estimate"
+    else:
+        counter = counters_collection.find_one({"_id": _counter_id(collection, equality)})
+        total, total_source = (counter or {}).get("count", 0), "counter"
+
+    return {
+        "items": docs,
+        "next_cursor": next_cursor,
+        "total": total,
+        "total_source": total_source,
+    }
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-call cost of logging on the request path.
+Compares print() against the queue-based structured logger, both with a fast
+sink (/dev/null) and a slow one that simulates a backed-up log pipe.
+
+Usage: python bench_logging.py [iterations]
+"""
+import contextlib
+import logging
+import os
+import sys
+import time
+
+from structured_logging import request_id_var, setup_logging
+
+
+class SlowStream:
+    """A stream whose writes take 1 ms, like a log pipe that isn't drained fast enough"""
+
+    def write(self, data):
+        time.sleep(0.001)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def bench(label, fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed / iterations * 1e9:>12.0f} ns/call", file=sys.__stdout__)
+
+
+def print_line(i):
+    print(f"Attempting to send email to user{i}@example.lu: New Quote Request")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    slow_iterations = min(iterations, 200)
+    request_id_var.set("bench-request")
+    logger = logging.getLogger("bench")
+
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            bench("print() to /dev/null", print_line, iterations)
+        with contextlib.redirect_stdout(SlowStream()):
+            bench("print() to slow pipe", print_line, slow_iterations)
+
+        listener = setup_logging("DEBUG", debug_sample_rate=0.01, queue_size=iterations * 3, stream=devnull)
+        bench("logger.info to /dev/null", lambda i: logger.info(
+            "Sending email", extra={"to_email": f"user{i}@example.lu", "subject": "New Quote Request"}), iterations)
+        bench("logger.debug (1% sampled)", lambda i: logger.debug(
+            "Email body", extra={"body": "<html>...</html>"}), iterations)
+        logging.getLogger().setLevel(logging.INFO)
+        bench("logger.debug (level disabled)", lambda i: logger.debug("Email body"), iterations)
+        listener.stop()
+
+    # The listener absorbs the slow writes; the caller only pays for the enqueue
+    listener = setup_logging("INFO", queue_size=slow_iterations * 2, stream=SlowStream())
+    bench("logger.info to slow pipe", lambda i: logger.info(
+        "Sending email", extra={"to_email": f"user{i}@example.lu", "subject": "New Quote Request"}), slow_iterations)
+    listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark search latency over the synthetic corpus.
+Generate data first (python generate_data.py --users 200000 gives ~1.2M
+quotes/tickets/contacts), then run:
+
+Usage: python bench_search.py [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+import search
+
+QUERIES = [
+    "Esch Creos subsidy EV charger",
+    "borne de recharge subvention",
+    "Wärmepumpe Angebot",
+    "pompe à chaleur",
+    "solar pan",
+    "fuse box renovation",
+    "inverter error",
+    "Wallbox Förderung",
+]
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Benchmark full-text search")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_url).get_database()
+    search.ensure_indexes(db)
+    sizes = {c: db[c].estimated_document_count() for c in search.SEARCH_FIELDS}
+    print(f"📚 Corpus: {sizes} ({sum(sizes.values())} documents)\n")
+
+    print(f"{'query':<35} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8}")
+    for query in QUERIES:
+        search.search(db, query, limit=args.limit)  # warm up
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            hits = search.search(db, query, limit=args.limit)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{query:<35} {len(hits):>5} {statistics.median(timings):>8.1f} {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
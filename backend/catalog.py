@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Localized service catalog.
+
+service_catalog.json is the single source of the services, with every
+translatable field given per locale. It is loaded and validated once at
+startup (a missing translation stops the worker instead of showing up as a
+blank card) and turned into one serialized JSON bundle per locale. Requests
+only pick a bundle; nothing is rendered per request.
+
+Each bundle is versioned by a hash of its content. `/api/services` answers
+with that hash as ETag; requests that name the current version (`?v=`) get
+an immutable, year-long cache header, so the Next.js build and browsers can
+pin a version and never revalidate.
+
+Usage: python catalog.py --check                      # validate the catalog
+       python catalog.py --out ../frontend/public/catalog   # write bundles for the frontend build
+"""
+import argparse
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "service_catalog.json")
+
+LOCALIZED_FIELDS = ("name", "description", "features")
+PLAIN_FIELDS = ("id", "icon", "emoji")
+
+
+class CatalogError(ValueError):
+    """The catalog file is malformed or incomplete"""
+
+
+class LocaleBundle:
+    def __init__(self, locale: str, services: List[dict]):
+        self.locale = locale
+        self.body = json.dumps(services, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.version = hashlib.sha256(self.body).hexdigest()[:16]
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+
+def validate(raw: dict) -> None:
+    locales = raw.get("locales")
+    if not locales or not isinstance(locales, list):
+        raise CatalogError("locales must be a non-empty list")
+    if raw.get("default_locale") not in locales:
+        raise CatalogError("default_locale must be one of locales")
+
+    seen = set()
+    for position, service in enumerate(raw.get("services") or []):
+        service_id = service.get("id")
+        where = service_id or f"services[{position}]"
+        for field in PLAIN_FIELDS:
+            if not isinstance(service.get(field), str) or not service[field]:
+                raise CatalogError(f"{where}: missing {field}")
+        if service_id in seen:
+            raise CatalogError(f"{where}: duplicate id")
+        seen.add(service_id)
+        for field in LOCALIZED_FIELDS:
+            values = service.get(field)
+            if not isinstance(values, dict):
+                raise CatalogError(f"{where}: {field} must map locales to values")
+            for locale in locales:
+                if not values.get(locale):
+                    raise CatalogError(f"{where}: {field} has no {locale} translation")
+            if field == "features" and len({len(values[locale]) for locale in locales}) != 1:
+                raise CatalogError(f"{where}: features differ in length between locales")
+    if not seen:
+        raise CatalogError("catalog has no services")
+
+
+def localize(service: dict, locale: str) -> dict:
+    localized = {field: service[field] for field in PLAIN_FIELDS}
+    localized.update({field: service[field][locale] for field in LOCALIZED_FIELDS})
+    return localized
+
+
+class ServiceCatalog:
+    def __init__(self, path: str = CATALOG_PATH):
+        with open(path, encoding="utf-8") as f:
+            try:
+                raw = json.load(f)
+            except ValueError as e:
+                raise CatalogError(f"{path}: {e}")
+        validate(raw)
+        self.locales: List[str] = raw["locales"]
+        self.default_locale: str = raw["default_locale"]
+        self.bundles: Dict[str, LocaleBundle] = {
+            locale: LocaleBundle(locale, [localize(service, locale) for service in raw["services"]])
+            for locale in self.locales
+        }
+        # Submissions name services by ID or by their name in any locale
+        self._ids_by_name: Dict[str, str] = {}
+        for service in raw["services"]:
+            self._ids_by_name[service["id"]] = service["id"]
+            for name in service["name"].values():
+                self._ids_by_name[name.strip().lower()] = service["id"]
+
+    def manifest(self) -> dict:
+        return {
+            "default_locale": self.default_locale,
+            "versions": {locale: bundle.version for locale, bundle in self.bundles.items()},
+        }
+
+    def negotiate(self, lang: Optional[str] = None, accept_language: Optional[str] = None) -> str:
+        """`?lang=` wins; otherwise the best-weighted supported Accept-Language entry"""
+        if lang:
+            primary = lang.strip().lower().split("-")[0]
+            if primary in self.bundles:
+                return primary
+        candidates = []
+        for position, part in enumerate((accept_language or "").split(",")):
+            tag, _, params = part.strip().partition(";")
+            quality = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            primary = tag.strip().lower().split("-")[0]
+            if primary in self.bundles and quality > 0:
+                candidates.append((-quality, position, primary))
+        return min(candidates)[2] if candidates else self.default_locale
+
+    def resolve_id(self, service: Optional[str]) -> Optional[str]:
+        """Catalog ID for a service ID or localized name, None if unknown"""
+        return self._ids_by_name.get((service or "").strip().lower())
+
+    def bundle(self, lang: Optional[str] = None, accept_language: Optional[str] = None) -> LocaleBundle:
+        return self.bundles[self.negotiate(lang, accept_language)]
+
+
+def write_bundles(catalog: ServiceCatalog, out_dir: str) -> List[str]:
+    """Write services.<locale>.<version>.json plus manifest.json; return the written paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for locale, bundle in catalog.bundles.items():
+        path = os.path.join(out_dir, f"services.{locale}.{bundle.version}.json")
+        with open(path, "wb") as f:
+            f.write(bundle.body)
+        paths.append(path)
+    path = os.path.join(out_dir, "manifest.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(catalog.manifest(), f, indent=2)
+    paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the service catalog and export per-locale bundles")
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    parser.add_argument("--check", action="store_true", help="validate only")
+    parser.add_argument("--out", help="directory to write the bundles to")
+    args = parser.parse_args()
+
+    catalog = ServiceCatalog(args.catalog)
+    for locale, bundle in catalog.bundles.items():
+        print(f"✅ {locale}: {len(bundle.body)} bytes, version {bundle.version}")
+    if args.out and not args.check:
+        for path in write_bundles(catalog, args.out):
+            print(f"   wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
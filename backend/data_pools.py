@@ -0,0 +1,109 @@
+"""
+Shared pools of names and review texts for seed and synthetic data scripts.
+"""
+
+# Sample review texts
+review_texts = [
+    "Excellent service! Very professional team. Highly recommend for solar panel installation.",
+    "Great experience with the EV charger installation. Quick and efficient work.",
+    "Professional electricians, fair pricing, and excellent customer service.",
+    "Solar panels installed perfectly. The team was knowledgeable and respectful.",
+    "Best electrical service in Luxembourg! Very satisfied with the heat pump installation.",
+    "Quick response time and quality work. Will definitely use again.",
+    "Fantastic job on our home automation system. Everything works perfectly.",
+    "Very impressed with the professionalism and attention to detail.",
+    "Fair prices and excellent workmanship. Highly recommended!",
+    "The team was punctual, professional, and did an amazing job.",
+    "Outstanding service from start to finish. Very happy with the solar installation.",
+    "Great communication throughout the project. Exceeded expectations.",
+    "Professional team that knows what they're doing. Five stars!",
+    "Excellent electrical work. Clean, efficient, and professional.",
+    "Highly recommend for any electrical needs. Top-notch service!",
+    "Very satisfied with the EV charger installation. Works perfectly.",
+    "Professional, courteous, and skilled technicians. Great job!",
+    "Best experience we've had with any contractor. Highly professional.",
+    "Quality work at reasonable prices. Will use again for sure.",
+    "Impressed with the level of expertise and professionalism.",
+]
+
+# Sample names
+first_names = ["Jean", "Marie", "Michel", "Sophie", "Laurent", "Anne", "Pierre", "Nathalie", "François", "Catherine",
+               "Thomas", "Julie", "Nicolas", "Isabelle", "Alexandre", "Patricia", "Olivier", "Christine", "Philippe", "Sylvie",
+               "David", "Martine", "Luc", "Monique", "André", "Françoise", "Marc", "Brigitte", "Paul", "Valérie"]
+
+last_names = ["Muller", "Schmidt", "Weber", "Meyer", "Wagner", "Becker", "Schulz", "Hoffmann", "Schmitt", "Koch",
+              "Bauer", "Richter", "Klein", "Wolf", "Schroeder", "Neumann", "Schwarz", "Zimmermann", "Braun", "Krüger",
+              "Hartmann", "Lange", "Werner", "Schmitz", "Krause", "Meier", "Lehmann", "Huber", "Mayer", "Herrmann"]
+
+# Service IDs from the catalog, with the share of leads each one gets
+service_weights = {
+    "solar-panels": 0.28,
+    "ev-chargers": 0.24,
+    "heat-pumps": 0.16,
+    "electrician": 0.12,
+    "energy-audits": 0.06,
+    "air-conditioning": 0.05,
+    "home-automation": 0.04,
+    "security-systems": 0.03,
+    "maintenance": 0.02,
+}
+
+# Communes in Luxembourg and the Greater Region
+locations = ["Luxembourg", "Esch-sur-Alzette", "Differdange", "Dudelange", "Ettelbruck", "Diekirch", "Wiltz",
+             "Echternach", "Remich", "Grevenmacher", "Mersch", "Bertrange", "Strassen", "Hesperange", "Sanem",
+             "Pétange", "Schifflange", "Bettembourg", "Kayl", "Mondorf-les-Bains", "Clervaux", "Vianden",
+             "Junglinster", "Mamer", "Kehlen", "Steinsel", "Walferdange", "Arlon", "Thionville", "Trier"]
+
+# Quote request descriptions per service, in the languages customers write in (FR/DE/EN)
+quote_descriptions = {
+    "solar-panels": [
+        "I would like a quote for solar panels on my south-facing roof, about {area} m2.",
+        "Je souhaite un devis pour l'installation de panneaux solaires sur une toiture de {area} m2.",
+        "Ich möchte ein Angebot für eine Photovoltaikanlage auf meinem Dach mit {area} m2.",
+    ],
+    "ev-chargers": [
+        "Looking to install an EV charger in our garage. Can you help with the Creos subsidy?",
+        "Nous voudrions installer une borne de recharge pour voiture électrique avec la subvention Creos.",
+        "Wir brauchen eine Wallbox für unser Elektroauto, bitte mit Creos-Förderung.",
+    ],
+    "heat-pumps": [
+        "We need a heat pump to replace our old oil boiler in a {rooms}-room house.",
+        "Remplacement de notre chaudière au mazout par une pompe à chaleur, maison de {rooms} pièces.",
+        "Angebot für eine Wärmepumpe für ein Haus mit {rooms} Zimmern, bitte.",
+    ],
+    "electrician": [
+        "Complete electrical renovation of an apartment, {rooms} rooms, including new fuse box.",
+        "Rénovation électrique complète d'un appartement de {rooms} pièces à {location}.",
+    ],
+    "energy-audits": ["Energy audit needed before selling our house in {location}."],
+    "air-conditioning": ["Installation of air conditioning in {rooms} bedrooms."],
+    "home-automation": ["Smart home setup: lights, shutters and heating controlled from the phone."],
+    "security-systems": ["Alarm system and cameras for a detached house in {location}."],
+}
+
+generic_quote_descriptions = [
+    "Please contact me about {service} for my house in {location}.",
+    "Merci de me contacter pour {service} à {location}.",
+]
+
+ticket_subjects = [
+    "Inverter shows error code", "EV charger not starting", "Heat pump making noise", "Invoice question",
+    "Reschedule installation", "Solar production lower than expected", "Fuse keeps tripping",
+    "App cannot connect to charger", "Request maintenance visit", "Warranty question",
+]
+
+ticket_descriptions = [
+    "Since yesterday the {service} stopped working. Could someone take a look?",
+    "The installation in {location} was done last month, but we noticed an issue.",
+    "Depuis hier, notre {service} ne fonctionne plus correctement.",
+    "Seit gestern funktioniert unsere Anlage ({service}) nicht mehr richtig.",
+    "Please call me back about my {service}, I have a question about the invoice.",
+]
+
+contact_messages = [
+    "Hello, do you also work in {location}? I'm interested in {service}.",
+    "Bonjour, pouvez-vous me rappeler concernant {service} ?",
+    "Guten Tag, ich hätte gerne Informationen zu {service}.",
+    "What are your opening hours? I'd like to discuss a project in {location}.",
+    "Do you offer maintenance contracts for {service}?",
+]
@@ -0,0 +1,200 @@
+"""
+Per-request deadlines.
+
+Each request gets a time budget (per route prefix, optionally lowered by the
+client's `X-Request-Timeout-Ms`) that starts when it reached the proxy
+(`X-Request-Start`, if set) or this worker. The deadline is carried in a
+context variable and every blocking dependency derives its limit from what
+is left of it:
+
+  Mongo     the request runs inside `pymongo.timeout(...)`, so every
+            operation gets a matching maxTimeMS and server selection /
+            socket timeouts (raises a PyMongoError with `.timeout` set)
+  HTTP/SMTP `timeout(default)` is the smaller of the call's own timeout and
+            the remaining budget
+  queues    admission (REQUEST_MAX_CONCURRENCY) and idempotency waits use
+            `cap(...)`, so nothing waits longer than the client will
+
+Work that can no longer finish is shed instead of started: a request whose
+budget is already spent on arrival, or that can't get an admission slot in
+time, gets 503 with Retry-After; a call site that finds too little time left
+raises DeadlineExceeded (504).
+
+Background tasks must not inherit the deadline of the request that queued
+them: wrap them with `detached`.
+"""
+import asyncio
+import contextvars
+import json
+import time
+from typing import Callable, Dict, Optional
+
+import pymongo
+
+from structured_logging import request_id_var
+
+deadline_var: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+TIMEOUT_HEADER = b"x-request-timeout-ms"
+REQUEST_START_HEADER = b"x-request-start"
+
+# Below this there's no point starting a network call
+MIN_CALL_SECONDS = 0.05
+
+
+class DeadlineExceeded(Exception):
+    """Not enough of the request budget is left to do the work"""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, None outside a deadline"""
+    deadline = deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check(min_seconds: float = MIN_CALL_SECONDS) -> None:
+    left = remaining()
+    if left is not None and left < min_seconds:
+        raise DeadlineExceeded(f"{max(left, 0) * 1000:.0f} ms left")
+
+
+def timeout(default: float) -> float:
+    """Timeout for a blocking call: `default`, shortened to the remaining budget"""
+    check()
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+def expired(margin: float = MIN_CALL_SECONDS) -> bool:
+    """True once the current request's budget is (all but) spent; False outside a deadline"""
+    left = remaining()
+    return left is not None and left < margin
+
+
+def cap(seconds: float) -> float:
+    """Upper bound for a wait, never past the deadline (may be 0)"""
+    left = remaining()
+    return seconds if left is None else max(0.0, min(seconds, left))
+
+
+def detached(func: Callable) -> Callable:
+    """
+    Wrap `func` to run in a fresh context without the request deadline
+    (or Mongo timeout), keeping only the request ID for log correlation.
+    """
+    request_id = request_id_var.get()
+
+    def _run(*args, **kwargs):
+        request_id_var.set(request_id)
+        return func(*args, **kwargs)
+
+    def run(*args, **kwargs):
+        return contextvars.Context().run(_run, *args, **kwargs)
+
+    return run
+
+
+def _request_start(value: bytes) -> Optional[float]:
+    """Wall-clock seconds from `X-Request-Start` ("t=<ms or µs>" or a bare number)"""
+    try:
+        raw = float(value.decode("latin-1").strip().removeprefix("t="))
+    except ValueError:
+        return None
+    # nginx sends seconds with ms precision, others ms or µs since the epoch
+    now = time.time()
+    for divisor in (1, 1e3, 1e6):
+        started = raw / divisor
+        if now - 3600 < started < now + 60:
+            return started
+    return None
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that sets the request deadline, applies it to Mongo and
+    sheds requests that can't be served in time.
+
+    `budgets` maps path prefixes to seconds (longest prefix wins); None
+    means no deadline, for streaming endpoints.
+    """
+
+    def __init__(self, app, default_budget: float, budgets: Optional[Dict[str, Optional[float]]] = None,
+                 max_concurrency: int = 0, max_queue_wait: float = 1.0):
+        self.app = app
+        self.default_budget = default_budget
+        self.budgets = sorted((budgets or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.max_concurrency = max_concurrency
+        self.max_queue_wait = max_queue_wait
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.shed = 0
+
+    def budget_for(self, path: str) -> Optional[float]:
+        for prefix, budget in self.budgets:
+            if path.startswith(prefix):
+                return budget
+        return self.default_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        budget = self.budget_for(scope["path"])
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if TIMEOUT_HEADER in headers:
+            try:
+                budget = min(budget, max(int(headers[TIMEOUT_HEADER]), 0) / 1000)
+            except ValueError:
+                pass
+        # Time already spent queued in front of this worker counts against the budget
+        deadline = time.monotonic() + budget
+        started = _request_start(headers[REQUEST_START_HEADER]) if REQUEST_START_HEADER in headers else None
+        if started is not None:
+            deadline -= max(time.time() - started, 0)
+
+        token = deadline_var.set(deadline)
+        try:
+            if deadline - time.monotonic() < MIN_CALL_SECONDS:
+                await self._shed(send, "Request budget spent before processing")
+                return
+            if self.max_concurrency <= 0:
+                await self._run(scope, receive, send, deadline)
+                return
+            if self._slots is None:
+                # Created lazily so it belongs to the serving event loop
+                self._slots = asyncio.Semaphore(self.max_concurrency)
+            slots = self._slots
+            try:
+                await asyncio.wait_for(slots.acquire(), timeout=cap(self.max_queue_wait))
+            except asyncio.TimeoutError:
+                await self._shed(send, "Server busy")
+                return
+            try:
+                await self._run(scope, receive, send, deadline)
+            finally:
+                slots.release()
+        finally:
+            deadline_var.reset(token)
+
+    async def _run(self, scope, receive, send, deadline: float):
+        with pymongo.timeout(max(deadline - time.monotonic(), MIN_CALL_SECONDS)):
+            await self.app(scope, receive, send)
+
+    async def _shed(self, send, detail: str):
+        self.shed += 1
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
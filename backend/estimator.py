@@ -0,0 +1,221 @@
+"""
+Indicative price and payback ranges for solar, heat pump and EV charger quotes.
+
+Nothing about a customer's site is known exactly, so instead of one number
+each estimate evaluates a grid of scenarios: every combination of the
+uncertain inputs (installed cost, yield, efficiency, energy prices, ...)
+from the tables below, a few thousand per request. The grid is evaluated
+with NumPy broadcasting in one pass and summarised as 10th/50th/90th
+percentiles, which is what the customer sees as low/typical/high.
+
+Tariffs and subsidies are Luxembourg figures (Klimabonus, PV feed-in
+tariffs) and are indicative only; update TABLES and TABLES_VERSION when
+they change. Estimates are stored with the version they were made with.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+TABLES_VERSION = "2024-10"
+
+TABLES = {
+    # Household electricity price incl. network fees and taxes, EUR/kWh
+    "electricity_price": np.linspace(0.24, 0.36, 7),
+    "solar": {
+        "kwp_per_m2": 0.2,               # ~400 Wp panels of 2 m²
+        "usable_roof_share": np.array([0.6, 0.7, 0.8]),
+        "min_kwp": 2.0,
+        "max_kwp": 30.0,
+        "yield_kwh_per_kwp": np.linspace(850, 1050, 5),
+        "cost_per_kwp": np.linspace(1300, 1900, 7),
+        "fixed_cost": np.array([1000, 1500, 2000]),
+        # Share of production used on site (no battery)
+        "self_consumption_share": np.array([0.25, 0.35, 0.45]),
+        # Feed-in tariff by system size: (up to kWp, EUR/kWh)
+        "feed_in_tariff": [(10, 0.145), (30, 0.135)],
+        "subsidy_rate": 0.625,
+        "subsidy_cap_per_kwp": 1562.5,
+        "default_consumption_kwh": 4500,
+    },
+    "heat_pump": {
+        # Space heating demand by insulation level, kWh/m²/year
+        "heat_demand_per_m2": {
+            "poor": np.array([150, 180, 210]),
+            "average": np.array([90, 110, 130]),
+            "good": np.array([50, 65, 80]),
+        },
+        "scop": np.linspace(2.8, 4.0, 5),
+        "full_load_hours": 2000,
+        "min_kw": 4.0,
+        "cost_per_kw": np.array([1000, 1200, 1400, 1600]),
+        "fixed_cost": np.array([6000, 7500, 9000]),
+        # Current heating: (fuel price EUR/kWh, boiler efficiency)
+        "fuels": {
+            "oil": (np.array([0.10, 0.12, 0.14]), 0.85),
+            "gas": (np.array([0.09, 0.11, 0.13]), 0.90),
+            "electric": (None, 1.0),
+        },
+        "subsidy_rate": 0.5,
+        "subsidy_cap": 8000.0,
+        "default_floor_area_m2": 150,
+    },
+    "ev_charger": {
+        "consumption_kwh_per_100km": np.linspace(15, 22, 5),
+        "home_charging_share": np.array([0.6, 0.75, 0.9]),
+        "public_price": np.array([0.45, 0.55, 0.65]),
+        "hardware_cost": np.array([700, 1000, 1400]),
+        "installation_cost": np.array([400, 800, 1200, 1600]),
+        "subsidy_rate": 0.5,
+        "subsidy_cap": 1200.0,
+        "default_annual_km": 15000,
+    },
+}
+
+PERCENTILES = (10, 50, 90)
+
+
+class EstimateError(ValueError):
+    """The service can't be estimated or the inputs are out of range"""
+
+
+def _grid(*axes: np.ndarray):
+    """Every combination of the axes as flat arrays of equal length"""
+    return [axis.ravel() for axis in np.meshgrid(*axes, indexing="ij")]
+
+
+def _range(values: np.ndarray, decimals: int = 0) -> dict:
+    # Scenarios that never pay back are infinite; "nearest" keeps interpolation from turning them into NaN
+    low, mid, high = np.percentile(values, PERCENTILES, method="nearest")
+    return {
+        name: (round(float(value), decimals) if np.isfinite(value) else None)
+        for name, value in zip(("low", "typical", "high"), (low, mid, high))
+    }
+
+
+def _summary(gross: np.ndarray, subsidy: np.ndarray, annual_savings: np.ndarray) -> dict:
+    net = gross - subsidy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback = np.where(annual_savings > 0, net / annual_savings, np.inf)
+    return {
+        "scenarios": int(gross.size),
+        "gross_price": _range(gross, -1),
+        "subsidy": _range(subsidy, -1),
+        "net_price": _range(net, -1),
+        "annual_savings": _range(annual_savings, -1),
+        "payback_years": _range(payback, 1),
+    }
+
+
+def estimate_solar(roof_area_m2: Optional[float], annual_consumption_kwh: Optional[float]) -> dict:
+    table = TABLES["solar"]
+    if not roof_area_m2 or roof_area_m2 <= 0:
+        raise EstimateError("roof_area_m2 is required for solar estimates")
+    consumption = annual_consumption_kwh or table["default_consumption_kwh"]
+
+    share, specific_yield, cost_per_kwp, fixed_cost, self_share, price = _grid(
+        table["usable_roof_share"], table["yield_kwh_per_kwp"], table["cost_per_kwp"],
+        table["fixed_cost"], table["self_consumption_share"], TABLES["electricity_price"],
+    )
+    size = np.minimum(roof_area_m2 * share * table["kwp_per_m2"], table["max_kwp"])
+    if size.max() < table["min_kwp"]:
+        raise EstimateError("Roof area too small for a solar installation")
+    size = np.maximum(size, table["min_kwp"])
+
+    production = size * specific_yield
+    self_consumed = np.minimum(production * self_share, consumption)
+    tariff = np.full(size.shape, table["feed_in_tariff"][-1][1])
+    for limit, rate in reversed(table["feed_in_tariff"]):
+        tariff = np.where(size <= limit, rate, tariff)
+
+    gross = size * cost_per_kwp + fixed_cost
+    subsidy = np.minimum(gross * table["subsidy_rate"], size * table["subsidy_cap_per_kwp"])
+    savings = self_consumed * price + (production - self_consumed) * tariff
+
+    result = _summary(gross, subsidy, savings)
+    result["system"] = {"size_kwp": _range(size, 1), "annual_production_kwh": _range(production, -2)}
+    result["inputs"] = {"roof_area_m2": roof_area_m2, "annual_consumption_kwh": consumption}
+    return result
+
+
+def estimate_heat_pump(floor_area_m2: Optional[float], current_heating: Optional[str],
+                       insulation: Optional[str]) -> dict:
+    table = TABLES["heat_pump"]
+    floor_area = floor_area_m2 or table["default_floor_area_m2"]
+    if floor_area <= 0:
+        raise EstimateError("floor_area_m2 must be positive")
+    heating = current_heating or "oil"
+    insulation = insulation or "average"
+    if heating not in table["fuels"]:
+        raise EstimateError(f"current_heating must be one of {', '.join(table['fuels'])}")
+    if insulation not in table["heat_demand_per_m2"]:
+        raise EstimateError(f"insulation must be one of {', '.join(table['heat_demand_per_m2'])}")
+
+    fuel_prices, efficiency = table["fuels"][heating]
+    demand_per_m2, scop, cost_per_kw, fixed_cost, price, fuel_price = _grid(
+        table["heat_demand_per_m2"][insulation], table["scop"], table["cost_per_kw"],
+        table["fixed_cost"], TABLES["electricity_price"],
+        fuel_prices if fuel_prices is not None else np.array([np.nan]),
+    )
+    if fuel_prices is None:
+        # Direct electric heating pays the same tariff as the heat pump
+        fuel_price = price
+
+    demand = floor_area * demand_per_m2
+    capacity = np.maximum(demand / table["full_load_hours"], table["min_kw"])
+    gross = capacity * cost_per_kw + fixed_cost
+    subsidy = np.minimum(gross * table["subsidy_rate"], table["subsidy_cap"])
+    savings = demand / efficiency * fuel_price - demand / scop * price
+
+    result = _summary(gross, subsidy, savings)
+    result["system"] = {"capacity_kw": _range(capacity, 1), "heat_demand_kwh": _range(demand, -2)}
+    result["inputs"] = {"floor_area_m2": floor_area, "current_heating": heating, "insulation": insulation}
+    return result
+
+
+def estimate_ev_charger(annual_km: Optional[float]) -> dict:
+    table = TABLES["ev_charger"]
+    km = annual_km or table["default_annual_km"]
+    if km <= 0:
+        raise EstimateError("annual_km must be positive")
+
+    consumption, home_share, public_price, hardware, installation, price = _grid(
+        table["consumption_kwh_per_100km"], table["home_charging_share"], table["public_price"],
+        table["hardware_cost"], table["installation_cost"], TABLES["electricity_price"],
+    )
+    home_kwh = km / 100 * consumption * home_share
+    gross = hardware + installation
+    subsidy = np.minimum(gross * table["subsidy_rate"], table["subsidy_cap"])
+    savings = home_kwh * (public_price - price)
+
+    result = _summary(gross, subsidy, savings)
+    result["system"] = {"home_charging_kwh": _range(home_kwh, -1)}
+    result["inputs"] = {"annual_km": km}
+    return result
+
+
+ESTIMATORS = {
+    "solar-panels": lambda inputs: estimate_solar(inputs.get("roof_area_m2"), inputs.get("annual_consumption_kwh")),
+    "heat-pumps": lambda inputs: estimate_heat_pump(
+        inputs.get("floor_area_m2"), inputs.get("current_heating"), inputs.get("insulation")
+    ),
+    "ev-chargers": lambda inputs: estimate_ev_charger(inputs.get("annual_km")),
+}
+
+
+def estimate(service_id: str, inputs: Dict[str, object]) -> dict:
+    """Estimate for a catalog service ID; raises EstimateError for other services"""
+    if service_id not in ESTIMATORS:
+        raise EstimateError(f"No estimate available for {service_id}")
+    result = ESTIMATORS[service_id](inputs)
+    result.update({"service": service_id, "currency": "EUR", "tables_version": TABLES_VERSION})
+    return result
+
+
+def describe(result: dict) -> str:
+    """One-line summary for staff notifications"""
+    net, payback = result["net_price"], result["payback_years"]
+    text = f"EUR {net['low']:,.0f}–{net['high']:,.0f} after subsidies"
+    if payback["low"] is not None:
+        high = f"{payback['high']}" if payback["high"] is not None else "n/a"
+        text += f", payback {payback['low']}–{high} years"
+    return text
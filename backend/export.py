@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Streaming NDJSON/CSV export of quotes, tickets and contacts.
+
+Documents are read through a batched cursor with a fixed projection and
+written out batch by batch, so memory use doesn't depend on the size of the
+collection. A full export walks the `_id` index; a date-range export walks
+the back-office `created_at` index in (created_at, _id) order, so it reads
+only the range and never sorts in memory. Every row carries its `_id` and
+`created_at`; an export that was interrupted resumes after the last row
+written (`after_id`, plus `after_created_at` for a date range).
+
+Usage: python export.py quotes --format csv --out quotes.csv.gz --from 2024-01-01 --to 2024-02-01
+       python export.py quotes --format csv --out quotes.csv.gz --resume
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+
+import backoffice
+
+BATCH_SIZE = 1000
+
+# Fixed projection per collection: accounting gets the same columns every month
+EXPORT_FIELDS = {
+    "quotes": ["quote_id", "service", "location", "preferred_date", "email", "phone", "status",
+               "created_at", "updated_at", "description"],
+    "tickets": ["ticket_id", "customer_id", "customer_email", "subject", "priority", "status",
+                "created_at", "updated_at", "description"],
+    "contacts": ["name", "email", "phone", "service", "status", "created_at", "message"],
+}
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class ExportError(ValueError):
+    """Invalid export parameters"""
+
+
+def parse_after_id(after_id: Optional[str]) -> Optional[ObjectId]:
+    if not after_id:
+        return None
+    try:
+        return ObjectId(after_id)
+    except (InvalidId, TypeError):
+        raise ExportError("Invalid after_id")
+
+
+def parse_date(value: Optional[str], name: str) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ExportError(f"Invalid {name}, expected an ISO date")
+
+
+def created_at_of(db, collection: str, after_id: ObjectId) -> str:
+    """created_at of the row a date-range export resumes after"""
+    last = db[collection].find_one({"_id": after_id}, {"created_at": 1})
+    if last is None or not last.get("created_at"):
+        raise ExportError("after_id not found; pass after_created_at as well")
+    return last["created_at"]
+
+
+def iter_batches(db, collection: str, created_from: Optional[str] = None, created_to: Optional[str] = None,
+                 after_id: Optional[ObjectId] = None, after_created_at: Optional[str] = None,
+                 batch_size: int = BATCH_SIZE) -> Iterator[list]:
+    """
+    Yield lists of at most `batch_size` projected documents, in `_id` order
+    or, with a date range, in (created_at, _id) order. Resuming a date-range
+    export needs the last row's created_at too; without it it is looked up.
+    """
+    if collection not in EXPORT_FIELDS:
+        raise ExportError(f"Cannot export {collection}")
+
+    date_range = {}
+    if created_from:
+        date_range["$gte"] = created_from
+    if created_to:
+        date_range["$lt"] = created_to
+
+    projection = {field: 1 for field in EXPORT_FIELDS[collection]}
+    if date_range:
+        conditions = [{"created_at": date_range}]
+        if after_id is not None:
+            if after_created_at is None:
+                after_created_at = created_at_of(db, collection, after_id)
+            conditions.append({"$or": [
+                {"created_at": {"$gt": after_created_at}},
+                {"created_at": after_created_at, "_id": {"$gt": after_id}},
+            ]})
+        query = {"$and": conditions} if len(conditions) > 1 else conditions[0]
+        # The (created_at desc, _id desc) listing index, walked backwards
+        cursor = (
+            db[collection].find(query, projection, batch_size=batch_size)
+            .sort([("created_at", ASCENDING), ("_id", ASCENDING)])
+            .hint(backoffice.LISTINGS[collection].index_name((), "created_at"))
+        )
+    else:
+        query = {"_id": {"$gt": after_id}} if after_id is not None else {}
+        cursor = (
+            db[collection].find(query, projection, batch_size=batch_size)
+            .sort("_id", ASCENDING)
+            .hint([("_id", ASCENDING)])
+        )
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def render_header(collection: str, fmt: str) -> bytes:
+    if fmt != "csv":
+        return b""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(["_id"] + EXPORT_FIELDS[collection])
+    return buffer.getvalue().encode("utf-8")
+
+
+def render_batch(collection: str, fmt: str, batch: list) -> bytes:
+    fields = EXPORT_FIELDS[collection]
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        for doc in batch:
+            writer.writerow([str(doc["_id"])] + [doc.get(field) if doc.get(field) is not None else "" for field in fields])
+    else:
+        for doc in batch:
+            row = {"_id": str(doc["_id"])}
+            row.update({field: doc.get(field) for field in fields})
+            buffer.write(json.dumps(row, ensure_ascii=False, default=str))
+            buffer.write("\n")
+    return buffer.getvalue().encode("utf-8")
+
+
+def stream_export(db, collection: str, fmt: str, created_from: Optional[str] = None,
+                  created_to: Optional[str] = None, after_id: Optional[ObjectId] = None,
+                  after_created_at: Optional[str] = None, compress: bool = False,
+                  include_header: bool = True) -> Iterator[bytes]:
+    """Yield the export as byte chunks, one per batch, optionally gzip-compressed"""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format {fmt}")
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    if include_header:
+        header = emit(render_header(collection, fmt))
+        if header:
+            yield header
+    for batch in iter_batches(db, collection, created_from, created_to, after_id, after_created_at):
+        chunk = emit(render_batch(collection, fmt, batch))
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+def export_to_file(db, collection: str, fmt: str, path: str, created_from: Optional[str] = None,
+                   created_to: Optional[str] = None, resume: bool = False) -> int:
+    """
+    Write an export to `path` (gzip if it ends in .gz, one gzip member per
+    batch). After every batch the last row's `_id` and `created_at` and the
+    file size are saved to `<path>.resume`; with `resume` the file is
+    truncated back to that size, dropping any half-written batch, and the
+    export continues after that row.
+    """
+    state_path = path + ".resume"
+    state = None
+    if resume and os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+    compress = path.endswith(".gz")
+
+    def encode(data: bytes) -> bytes:
+        return gzip.compress(data) if compress else data
+
+    written = 0
+    with open(path, "r+b" if state else "wb") as out:
+        if state:
+            out.truncate(state["offset"])
+            out.seek(state["offset"])
+            after_id = parse_after_id(state["after_id"])
+            after_created_at = state.get("after_created_at")
+        else:
+            out.write(encode(render_header(collection, fmt)))
+            after_id = after_created_at = None
+        for batch in iter_batches(db, collection, created_from, created_to, after_id, after_created_at):
+            out.write(encode(render_batch(collection, fmt, batch)))
+            out.flush()
+            written += len(batch)
+            with open(state_path, "w") as f:
+                json.dump({
+                    "after_id": str(batch[-1]["_id"]),
+                    "after_created_at": batch[-1].get("created_at"),
+                    "offset": out.tell(),
+                }, f)
+
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return written
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export a collection as NDJSON or CSV")
+    parser.add_argument("collection", choices=sorted(EXPORT_FIELDS))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--out", required=True, help="output file; .gz for gzip")
+    parser.add_argument("--from", dest="created_from", help="created_at >= this ISO date")
+    parser.add_argument("--to", dest="created_to", help="created_at < this ISO date")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted export")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_url).get_database()
+    written = export_to_file(
+        db, args.collection, args.format, args.out,
+        created_from=parse_date(args.created_from, "--from"),
+        created_to=parse_date(args.created_to, "--to"),
+        resume=args.resume,
+    )
+    print(f"✅ Exported {written} {args.collection} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
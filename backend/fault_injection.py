@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Fault-injection check for request deadlines.
+
+Starts local stand-ins for the API's dependencies, each misbehaving in one
+way, runs the API against them with uvicorn and checks that every request
+still finishes within its budget (plus a tolerance) with the expected
+status instead of hanging:
+
+  slow-google   Places API answering after --stall seconds   -> 200 with the cached/fallback reviews
+  slow-mongo    TCP proxy to MONGO_URL adding --mongo-delay  -> 504
+  hung-smtp     SMTP server that accepts and never greets    -> 200 (mail is sent in the background)
+  client-budget X-Request-Timeout-Ms lower than the route's  -> 504 or 503
+  queued        X-Request-Start older than the budget        -> 503
+
+Needs a reachable MONGO_URL (the proxy sits in front of it).
+
+Usage: python fault_injection.py [--port 8099] [--tolerance 1.0]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def serve_slow_http(stall: float) -> int:
+    """HTTP server that waits `stall` seconds before every response; returns its port"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(stall)
+            body = b'{"status": "OK", "result": {"rating": 4.9, "user_ratings_total": 1, "reviews": []}}'
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass  # The API gave up first, as it should
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def serve_hung_tcp() -> int:
+    """TCP server that accepts connections and never sends a byte"""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(64)
+    held = []
+
+    def accept():
+        while True:
+            conn, _ = listener.accept()
+            held.append(conn)
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+class LatencyProxy:
+    """TCP proxy that delays every chunk coming back from the target by `delay` seconds (settable live)"""
+
+    def __init__(self, target_host: str, target_port: int):
+        self.target = (target_host, target_port)
+        self.delay = 0.0
+        self.port = self._serve()
+
+    def _serve(self) -> int:
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(64)
+
+        def pipe(source, sink, delayed):
+            try:
+                while True:
+                    chunk = source.recv(65536)
+                    if not chunk:
+                        break
+                    if delayed and self.delay:
+                        time.sleep(self.delay)
+                    sink.sendall(chunk)
+            except OSError:
+                pass
+            finally:
+                for s in (source, sink):
+                    try:
+                        s.close()
+                    except OSError:
+                        pass
+
+        def accept():
+            while True:
+                client, _ = listener.accept()
+                try:
+                    upstream = socket.create_connection(self.target)
+                except OSError:
+                    client.close()
+                    continue
+                threading.Thread(target=pipe, args=(client, upstream, False), daemon=True).start()
+                threading.Thread(target=pipe, args=(upstream, client, True), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+        return listener.getsockname()[1]
+
+
+def proxied_mongo_url(mongo_url: str, proxy_port: int) -> str:
+    """MONGO_URL with its host replaced by the proxy (single-host URLs only)"""
+    parts = urlsplit(mongo_url)
+    credentials, _, _ = parts.netloc.rpartition("@")
+    netloc = f"{credentials}@127.0.0.1:{proxy_port}" if credentials else f"127.0.0.1:{proxy_port}"
+    query = "&".join(filter(None, [parts.query, "directConnection=true"]))
+    return urlunsplit((parts.scheme, netloc, parts.path, query, parts.fragment))
+
+
+def start_api(port: int, env: dict) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/health/live", timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.kill()
+    raise SystemExit("❌ API did not start")
+
+
+def check(name: str, method: str, url: str, budget: float, tolerance: float, expected: set, **kwargs) -> bool:
+    started = time.monotonic()
+    try:
+        response = requests.request(method, url, timeout=budget + tolerance + 5, **kwargs)
+        status = response.status_code
+    except requests.RequestException as e:
+        status = type(e).__name__
+    elapsed = time.monotonic() - started
+    ok = status in expected and elapsed <= budget + tolerance
+    print(f"{'✅' if ok else '❌'} {name:<14} {str(status):<6} {elapsed:6.2f}s  (budget {budget:g}s, expected {sorted(expected)})")
+    return ok
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Check that request deadlines hold when dependencies stall")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017/sparksonic"))
+    parser.add_argument("--stall", type=float, default=30, help="seconds the Google stand-in waits")
+    parser.add_argument("--mongo-delay", type=float, default=3, help="seconds added to every Mongo reply")
+    parser.add_argument("--budget", type=float, default=4, help="REQUEST_BUDGET_SECONDS for the run")
+    parser.add_argument("--tolerance", type=float, default=1.0)
+    args = parser.parse_args()
+
+    google_port = serve_slow_http(args.stall)
+    smtp_port = serve_hung_tcp()
+    target = urlsplit(args.mongo_url)
+    base = f"http://127.0.0.1:{args.port}/api"
+    common = {
+        "REQUEST_BUDGET_SECONDS": str(args.budget),
+        "GOOGLE_PLACES_URL": f"http://127.0.0.1:{google_port}/details/json",
+        "SMTP_ENABLED": "true",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "NOTIFICATION_DIGEST_SECONDS": "0",
+    }
+    results = []
+
+    # Mongo goes through the proxy from the start; latency is switched on once the API is up
+    proxy = LatencyProxy(target.hostname or "localhost", target.port or 27017)
+    print(f"🔌 Stand-ins: google :{google_port} (stalls {args.stall:g}s), smtp :{smtp_port} (hangs), "
+          f"mongo proxy :{proxy.port}")
+    api = start_api(args.port, {**common, "MONGO_URL": proxied_mongo_url(args.mongo_url, proxy.port)})
+    try:
+        results.append(check("slow-google", "GET", f"{base}/reviews", 5, args.tolerance, {200}))
+        results.append(check("hung-smtp", "POST", f"{base}/contact", args.budget, args.tolerance, {200}, json={
+            "name": "Fault Injection", "email": "fault@example.com", "phone": "+352 000 000",
+            "message": "Deadline check, please ignore.",
+        }))
+        results.append(check("client-budget", "GET", f"{base}/reviews", 0.5, args.tolerance, {503, 504, 200},
+                             headers={"X-Request-Timeout-Ms": "500"}))
+        results.append(check("queued", "GET", f"{base}/projects", 0, args.tolerance, {503},
+                             headers={"X-Request-Start": f"t={(time.time() - 60) * 1000:.0f}"}))
+
+        # Each Mongo round trip now costs mongo-delay, so a page of projects can't fit the budget
+        proxy.delay = args.mongo_delay
+        print(f"🐢 Mongo replies delayed by {args.mongo_delay:g}s")
+        results.append(check("slow-mongo", "GET", f"{base}/projects", args.budget, args.tolerance, {504}))
+    finally:
+        api.terminate()
+        api.wait()
+
+    print(f"\n{sum(results)}/{len(results)} scenarios within budget")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
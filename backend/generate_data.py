@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for benchmarking at production volumes.
+
+Produces users, quotes, tickets, contacts and reviews from the same pools as
+seed_reviews.py, with realistic shapes: a few customers with long ticket
+histories, more activity in recent years, and bursty timestamps around
+campaign days during office hours.
+
+Output is deterministic for a given --seed: each batch draws from its own RNG
+seeded by (seed, collection, batch number), so batches can be generated and
+inserted in parallel worker processes with unordered insert_many calls.
+
+Reviews go to a `reviews` collection (one document per review); at these
+volumes they don't fit in the single reviews_cache document.
+
+Usage: python generate_data.py --users 1000000 --workers 8 --seed 42
+"""
+import argparse
+import os
+import random
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+from pymongo import MongoClient
+
+from search import search_fields
+from data_pools import (
+    contact_messages, first_names, generic_quote_descriptions, last_names, locations, quote_descriptions, review_texts,
+    service_weights, ticket_descriptions, ticket_subjects,
+)
+
+load_dotenv()
+
+COLLECTIONS = ["users", "quotes", "tickets", "contacts", "reviews"]
+HISTORY_DAYS = 5 * 365
+SERVICES = list(service_weights)
+SERVICE_WEIGHTS = list(service_weights.values())
+
+# Office hours get most of the traffic
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 14, 16, 16, 14, 10, 12, 14, 14, 12, 10, 8, 7, 6, 4, 2, 1]
+
+_db = None
+
+
+def _init_worker(mongo_url: str) -> None:
+    global _db
+    _db = MongoClient(mongo_url).get_database()
+
+
+def _ascii(text: str) -> str:
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def user_identity(index: int) -> dict:
+    """Name, email and customer ID of user `index`, derivable without the users collection"""
+    mixed = (index * 2654435761) & 0xFFFFFFFF
+    first = first_names[mixed % len(first_names)]
+    last = last_names[(mixed >> 8) % len(last_names)]
+    return {
+        "customer_id": f"CUST-{index:08X}",
+        "email": f"{_ascii(first)}.{_ascii(last)}.{index}@example.lu".lower(),
+        "full_name": f"{first} {last}",
+    }
+
+
+def skewed_user(rng: random.Random, user_count: int) -> int:
+    """
+    Pick a user so that 2% of customers (every 50th) account for 40% of activity,
+    giving them long histories (~100 tickets each at the default ratios).
+    """
+    if rng.random() < 0.4:
+        return rng.randrange(0, user_count, 50)
+    return rng.randrange(user_count)
+
+
+def burst_days(seed: int, count: int = 60) -> list:
+    """Campaign days (as offsets from the start of the history) around which traffic bursts"""
+    rng = random.Random(f"{seed}:bursts")
+    return sorted(rng.uniform(0, HISTORY_DAYS) for _ in range(count))
+
+
+def timestamps(rng: random.Random, count: int, bursts: list, end: datetime) -> list:
+    """
+    Day offsets weighted towards recent years (the business grows), with 30%
+    of events clustered within a couple of days after a campaign. `end` is
+    the newest possible timestamp.
+    """
+    days = []
+    for _ in range(count):
+        if rng.random() < 0.3:
+            day = rng.choice(bursts) + rng.expovariate(1.0)
+        else:
+            day = HISTORY_DAYS * rng.random() ** 0.5
+        days.append(min(day, HISTORY_DAYS))
+    hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)
+    start = end - timedelta(days=HISTORY_DAYS)
+    return [
+        start + timedelta(days=int(day), hours=hour, minutes=rng.randrange(60), seconds=rng.randrange(60))
+        for day, hour in zip(days, hours)
+    ]
+
+
+def _fill(template: str, rng: random.Random, service: str, location: str) -> str:
+    return template.format(area=rng.randrange(20, 120), rooms=rng.randrange(2, 9),
+                           service=service.replace("-", " "), location=location)
+
+
+def generate_users(rng, start, count, ctx):
+    created = timestamps(rng, count, ctx["bursts"], ctx["end"])
+    docs = []
+    for offset, created_at in enumerate(created):
+        identity = user_identity(start + offset)
+        docs.append({
+            **identity,
+            "password": ctx["password_hash"],
+            "phone": f"+352 661 {rng.randrange(1000000):06d}",
+            "created_at": created_at.isoformat(),
+            "updated_at": created_at.isoformat(),
+            "synthetic": True,
+        })
+    return docs
+
+
+def generate_quotes(rng, start, count, ctx):
+    services = rng.choices(SERVICES, weights=SERVICE_WEIGHTS, k=count)
+    places = rng.choices(locations, k=count)
+    statuses = rng.choices(["pending", "contacted", "quoted", "won", "lost"], weights=[30, 20, 20, 15, 15], k=count)
+    created = timestamps(rng, count, ctx["bursts"], ctx["end"])
+    docs = []
+    for i in range(count):
+        # 60% of quotes come from registered customers
+        if rng.random() < 0.6:
+            email = user_identity(skewed_user(rng, ctx["users"]))["email"]
+        else:
+            email = f"lead.{ctx['seed']}.{start + i}@example.lu"
+        docs.append({
+            "quote_id": f"QT-{start + i:08X}",
+            "service": services[i],
+            "description": _fill(rng.choice(quote_descriptions.get(services[i], generic_quote_descriptions)),
+                                 rng, services[i], places[i]),
+            "location": places[i],
+            "preferred_date": (created[i] + timedelta(days=rng.randrange(7, 90))).date().isoformat(),
+            "phone": f"+352 621 {rng.randrange(1000000):06d}",
+            "email": email,
+            "status": statuses[i],
+            "created_at": created[i].isoformat(),
+            "updated_at": created[i].isoformat(),
+            "synthetic": True,
+        })
+    return docs
+
+
+def generate_tickets(rng, start, count, ctx):
+    priorities = rng.choices(["low", "medium", "high", "urgent"], weights=[25, 50, 20, 5], k=count)
+    created = timestamps(rng, count, ctx["bursts"], ctx["end"])
+    docs = []
+    for i in range(count):
+        identity = user_identity(skewed_user(rng, ctx["users"]))
+        age_days = (ctx["end"] - created[i]).days
+        # Older tickets are almost always closed
+        if age_days > 30:
+            status = rng.choices(["closed", "resolved", "open"], weights=[80, 18, 2])[0]
+        else:
+            status = rng.choices(["open", "in_progress", "resolved"], weights=[50, 30, 20])[0]
+        service = rng.choices(SERVICES, weights=SERVICE_WEIGHTS)[0]
+        docs.append({
+            "ticket_id": f"TKT-{start + i:08X}",
+            "customer_id": identity["customer_id"],
+            "customer_email": identity["email"],
+            "subject": rng.choice(ticket_subjects),
+            "description": _fill(rng.choice(ticket_descriptions), rng, service, rng.choice(locations)),
+            "priority": priorities[i],
+            "status": status,
+            "created_at": created[i].isoformat(),
+            "updated_at": created[i].isoformat(),
+            "synthetic": True,
+        })
+    return docs
+
+
+def generate_contacts(rng, start, count, ctx):
+    services = rng.choices(SERVICES + [None], weights=SERVICE_WEIGHTS + [0.3], k=count)
+    created = timestamps(rng, count, ctx["bursts"], ctx["end"])
+    docs = []
+    for i in range(count):
+        first, last = rng.choice(first_names), rng.choice(last_names)
+        docs.append({
+            "name": f"{first} {last}",
+            "email": f"{_ascii(first)}.{_ascii(last)}.c{start + i}@example.lu".lower(),
+            "phone": f"+352 691 {rng.randrange(1000000):06d}" if rng.random() < 0.7 else None,
+            "message": _fill(rng.choice(contact_messages), rng, services[i] or "your services", rng.choice(locations)),
+            "service": services[i],
+            "status": rng.choices(["new", "read", "answered"], weights=[10, 30, 60])[0],
+            "created_at": created[i].isoformat(),
+            "synthetic": True,
+        })
+    return docs
+
+
+def generate_reviews(rng, start, count, ctx):
+    ratings = rng.choices([5, 4, 3], weights=[0.85, 0.13, 0.02], k=count)
+    created = timestamps(rng, count, ctx["bursts"], ctx["end"])
+    docs = []
+    for i in range(count):
+        text = rng.choice(review_texts)
+        if rng.random() > 0.7:
+            text += " " + rng.choice(review_texts)
+        docs.append({
+            "author_name": f"{rng.choice(first_names)} {rng.choice(last_names)}",
+            "language": "en",
+            "rating": ratings[i],
+            "text": text,
+            "time": int(created[i].timestamp()),
+            "synthetic": True,
+        })
+    return docs
+
+
+GENERATORS = {
+    "users": generate_users,
+    "quotes": generate_quotes,
+    "tickets": generate_tickets,
+    "contacts": generate_contacts,
+    "reviews": generate_reviews,
+}
+
+
+def build_batch(collection: str, batch_number: int, start: int, count: int, ctx: dict) -> list:
+    rng = random.Random(f"{ctx['seed']}:{collection}:{batch_number}")
+    docs = GENERATORS[collection](rng, start, count, ctx)
+    # Same derived search fields the API stores on insert
+    if collection in ("quotes", "tickets", "contacts"):
+        for doc in docs:
+            doc.update(search_fields(collection, doc))
+    return docs
+
+
+def insert_batch(collection: str, batch_number: int, start: int, count: int, ctx: dict) -> int:
+    docs = build_batch(collection, batch_number, start, count, ctx)
+    _db[collection].insert_many(docs, ordered=False)
+    return len(docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Sparksonic data for benchmarking")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--quotes", type=int, help="default: 3 per user")
+    parser.add_argument("--tickets", type=int, help="default: 5 per user")
+    parser.add_argument("--contacts", type=int, help="default: 2 per user")
+    parser.add_argument("--reviews", type=int, help="default: 1 per 2 users")
+    parser.add_argument("--collections", nargs="+", choices=COLLECTIONS, default=COLLECTIONS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--end", default="2025-01-01T00:00:00", help="timestamp of the newest generated record")
+    existing = parser.add_mutually_exclusive_group()
+    existing.add_argument("--drop", action="store_true", help="delete existing synthetic documents first")
+    existing.add_argument("--append", action="store_true", help="add to collections that already hold documents")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    args = parser.parse_args()
+
+    counts = {
+        "users": args.users,
+        "quotes": args.quotes if args.quotes is not None else args.users * 3,
+        "tickets": args.tickets if args.tickets is not None else args.users * 5,
+        "contacts": args.contacts if args.contacts is not None else args.users * 2,
+        "reviews": args.reviews if args.reviews is not None else args.users // 2,
+    }
+
+    # Hashing a password per user would dominate the run; every user shares one (password: "Synthetic123")
+    ctx = {
+        "seed": args.seed,
+        "users": max(args.users, 1),
+        "bursts": burst_days(args.seed),
+        "end": datetime.fromisoformat(args.end),
+        "password_hash": CryptContext(schemes=["bcrypt"]).hash("Synthetic123"),
+    }
+
+    db = MongoClient(args.mongo_url).get_database()
+    if not (args.drop or args.append):
+        # A second run with the same seed would duplicate every ID; make mixing data a deliberate choice
+        non_empty = [collection for collection in args.collections if db[collection].count_documents({}, limit=1)]
+        if non_empty:
+            parser.error(f"{', '.join(non_empty)} already hold documents; pass --drop or --append")
+
+    if args.drop:
+        for collection in args.collections:
+            result = db[collection].delete_many({"synthetic": True})
+            print(f"🗑  Removed {result.deleted_count} synthetic documents from {collection}")
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.mongo_url,)) as pool:
+        for collection in args.collections:
+            total = counts[collection]
+            collection_started = time.perf_counter()
+            futures = [
+                pool.submit(insert_batch, collection, batch_number, start, min(args.batch_size, total - start), ctx)
+                for batch_number, start in enumerate(range(0, total, args.batch_size))
+            ]
+            inserted = sum(future.result() for future in as_completed(futures))
+            elapsed = time.perf_counter() - collection_started
+            print(f"✅ {collection}: {inserted} documents in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):.0f}/s)")
+
+    print(f"\n✨ Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Offline geocoding of free-text locations ("12 rue de la Gare, L-4131 Esch",
+"Diddeleng", "Thionvile") against the bundled places.csv and
+postal_codes.csv.
+
+The tables are loaded once at startup into four in-memory indexes:
+
+  names     folded name/alias -> place, for exact matches
+  codes     (country, code) -> places, from postal_codes.csv: one row per
+            code and locality, as in the official Luxembourg code list,
+            where neighbouring localities share codes
+  postal    per country, sorted (first, last, place) code ranges from
+            places.csv searched with bisect, for countries where a town's
+            codes form a range
+  trigrams  trigram -> names containing it, so misspellings are scored
+            against the few names sharing a trigram, not the whole table
+
+Names are matched exactly on word runs of each comma-separated part, last
+part first, since the town usually ends an address. A postal code places
+the text on its own, or narrows a named locality down to the commune it
+belongs to; when the named town lies in another commune than the code,
+the name wins (codes get mistyped) and the match is flagged with
+`postal_code_conflict`. The code found in the text is kept on the match
+whenever it can belong to the place's country. Only when both fail is the text
+matched fuzzily: names sharing enough trigrams are scored by edit
+similarity (difflib), which also forgives swapped letters.
+
+Matches are GeoJSON points, stored on quotes and tickets as `geo` under a
+2dsphere index so radius queries ("open quotes within 15 km of Esch") use
+the index.
+
+postal_codes.csv is generated from the official list (Luxembourg's
+"Registre national des localités et des rues" export on data.public.lu, a
+CSV with one row per code and locality); rows whose locality isn't in
+places.csv are skipped and reported:
+
+Usage: python geocoding.py --lookup "L-4131 Esch"   # show the match
+       python geocoding.py --backfill             # geocode quotes/tickets stored before geocoding existed
+       python geocoding.py --bench                # lookup latency
+       python geocoding.py --import-postal-codes official.csv [--code-column code_postal --locality-column localite]
+"""
+import argparse
+import bisect
+import csv
+import difflib
+import math
+import os
+import random
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from search import fold
+
+PLACES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "places.csv")
+POSTAL_CODES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "postal_codes.csv")
+
+# Collections with a geocoded `location`
+GEO_COLLECTIONS = ("quotes", "tickets")
+
+EARTH_RADIUS_KM = 6371.0088
+MIN_FUZZY_SCORE = 0.8
+# Trigram similarity (Dice) a name needs before it is scored at all
+MIN_TRIGRAM_OVERLAP = 0.3
+MAX_NAME_WORDS = 5
+
+# Country prefixes in addresses ("L-4131", "F-57100", "B 6700", "D-54290")
+COUNTRY_PREFIXES = {"l": "LU", "lu": "LU", "f": "FR", "fr": "FR", "b": "BE", "be": "BE", "d": "DE", "de": "DE"}
+# Unprefixed codes: four digits are Luxembourgish unless only Belgium has them, five are French or German
+COUNTRIES_BY_LENGTH = {4: ("LU", "BE"), 5: ("FR", "DE")}
+
+_POSTAL_RE = re.compile(r"\b(?:([a-z]{1,2})\s*-\s*|([a-z]{1,2})\s+)?(\d{4,5})\b")
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+class GeocodingError(ValueError):
+    """places.csv is malformed"""
+
+
+class Place(NamedTuple):
+    name: str
+    commune: str
+    region: str
+    country: str
+    lat: float
+    lon: float
+
+    @property
+    def point(self) -> dict:
+        return {"type": "Point", "coordinates": [self.lon, self.lat]}
+
+
+def normalize(text: str) -> str:
+    """Accent-folded words separated by single spaces: 'Esch-sur-Alzette' -> 'esch sur alzette'"""
+    return " ".join(_WORD_RE.findall(fold(text)))
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def distance_km(a: dict, b: dict) -> float:
+    """Great-circle distance between two GeoJSON points"""
+    lon1, lat1 = map(math.radians, a["coordinates"])
+    lon2, lat2 = map(math.radians, b["coordinates"])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def nearest(point: dict, documents: List[dict], field: str) -> List[Tuple[float, dict]]:
+    """(distance in km, document) for the documents with a `field` point, nearest first"""
+    return sorted(
+        ((distance_km(point, doc[field]), doc) for doc in documents if doc.get(field)),
+        key=lambda pair: pair[0],
+    )
+
+
+def within_query(point: dict, radius_km: float) -> dict:
+    """Filter for documents whose `geo` lies within `radius_km`, nearest first (2dsphere index)"""
+    return {"geo": {"$nearSphere": {"$geometry": point, "$maxDistance": radius_km * 1000}}}
+
+
+def ensure_indexes(db) -> None:
+    for collection in GEO_COLLECTIONS:
+        db[collection].create_index([("geo", "2dsphere")], name="geo")
+
+
+class Geocoder:
+    def __init__(self, path: str = PLACES_PATH, min_fuzzy_score: float = MIN_FUZZY_SCORE,
+                 postal_codes_path: Optional[str] = POSTAL_CODES_PATH):
+        self.min_fuzzy_score = min_fuzzy_score
+        self.places: List[Place] = []
+        self._names: Dict[str, Place] = {}
+        self._codes: Dict[Tuple[str, int], List[Place]] = {}
+        self._postal: Dict[str, List[Tuple[int, int, Place]]] = {}
+        self._trigrams: Dict[str, List[str]] = {}
+        self._name_trigrams: Dict[str, Set[str]] = {}
+
+        with open(path, encoding="utf-8") as f:
+            rows = csv.DictReader(line for line in f if not line.startswith("#"))
+            for line, row in enumerate(rows, 2):
+                try:
+                    self._add(row)
+                except (KeyError, TypeError, ValueError) as e:
+                    raise GeocodingError(f"{path}: row {line}: {e}")
+        for ranges in self._postal.values():
+            ranges.sort()
+            for (_, last, place), (first, _, other) in zip(ranges, ranges[1:]):
+                if first <= last:
+                    raise GeocodingError(f"{path}: postal codes of {place.name} and {other.name} overlap")
+        if postal_codes_path:
+            self._load_codes(postal_codes_path)
+        for key in self._names:
+            grams = trigrams(key)
+            self._name_trigrams[key] = grams
+            for gram in grams:
+                self._trigrams.setdefault(gram, []).append(key)
+
+    def _add(self, row: dict) -> None:
+        place = Place(row["name"], row["commune"], row["region"], row["country"], float(row["lat"]), float(row["lon"]))
+        if not (-90 <= place.lat <= 90 and -180 <= place.lon <= 180):
+            raise ValueError("coordinates out of range")
+        self.places.append(place)
+        for name in [place.name, *(row.get("aliases") or "").split("|")]:
+            key = normalize(name)
+            if not key:
+                continue
+            if self._names.get(key, place) != place:
+                raise ValueError(f"{name} already names {self._names[key].name}")
+            self._names[key] = place
+        for span in (row.get("postal_codes") or "").split():
+            first, _, last = span.partition("-")
+            self._postal.setdefault(place.country, []).append((int(first), int(last or first), place))
+
+    def _load_codes(self, path: str) -> None:
+        with open(path, encoding="utf-8") as f:
+            rows = csv.DictReader(line for line in f if not line.startswith("#"))
+            for line, row in enumerate(rows, 2):
+                try:
+                    place = self._names.get(normalize(row["locality"]))
+                    if place is None or place.country != row["country"]:
+                        raise ValueError(f"{row['locality']} is not a {row['country']} place in places.csv")
+                    places = self._codes.setdefault((row["country"], int(row["postal_code"])), [])
+                except (KeyError, TypeError, ValueError) as e:
+                    raise GeocodingError(f"{path}: row {line}: {e}")
+                if place not in places:
+                    places.append(place)
+
+    # Lookups
+
+    def by_postal_code(self, code: str, country: Optional[str] = None) -> List[Place]:
+        """Places whose range contains `code`, in COUNTRIES_BY_LENGTH order when no country is given"""
+        places = []
+        for candidate in (country,) if country else COUNTRIES_BY_LENGTH.get(len(code), ()):
+            if (candidate, int(code)) in self._codes:
+                places.extend(self._codes[(candidate, int(code))])
+                continue
+            ranges = self._postal.get(candidate, [])
+            position = bisect.bisect_right(ranges, (int(code), math.inf)) - 1
+            if position >= 0 and ranges[position][0] <= int(code) <= ranges[position][1]:
+                places.append(ranges[position][2])
+        return places
+
+    def by_name(self, text: str) -> Optional[Place]:
+        """Exact name or alias within the text; the longest run of words wins, later parts first"""
+        for part in reversed(text.split(",")):
+            words = normalize(part).split()
+            for length in range(min(len(words), MAX_NAME_WORDS), 0, -1):
+                for start in range(len(words) - length, -1, -1):
+                    place = self._names.get(" ".join(words[start:start + length]))
+                    if place:
+                        return place
+        return None
+
+    def fuzzy(self, text: str) -> Optional[Tuple[Place, float]]:
+        """Best trigram match of a comma-separated part against the names, if it scores high enough"""
+        best = None
+        for part in text.split(","):
+            key = normalize(part)
+            if not key or len(key.split()) > MAX_NAME_WORDS:
+                continue
+            grams = trigrams(key)
+            candidates = {name for gram in grams for name in self._trigrams.get(gram, ())}
+            for name in candidates:
+                other = self._name_trigrams[name]
+                if 2 * len(grams & other) / (len(grams) + len(other)) < MIN_TRIGRAM_OVERLAP:
+                    continue
+                # Trigrams find the candidates; edit similarity scores them (it forgives swapped letters)
+                score = difflib.SequenceMatcher(None, key, name).ratio()
+                if score >= self.min_fuzzy_score and (best is None or score > best[1]):
+                    best = (self._names[name], score)
+        return best
+
+    def geocode(self, text: Optional[str]) -> Optional[dict]:
+        """
+        {"point": GeoJSON, "place", "commune", "region", "country", "postal_code",
+        "method": "postal_code" | "name" | "fuzzy", "score"} or None when nothing matches;
+        "postal_code_conflict": True is added when the code points at another commune
+        than the town named with it
+        """
+        if not text or not text.strip():
+            return None
+        place, method, score, conflict = None, None, 1.0, False
+        named = self.by_name(text)
+        # Every code-shaped token with the country its prefix (or its length) allows
+        codes = [
+            (code, (COUNTRY_PREFIXES[prefix],) if prefix else COUNTRIES_BY_LENGTH.get(len(code), ()))
+            for prefix, code in (
+                (prefix or spaced_prefix, code) for prefix, spaced_prefix, code in _POSTAL_RE.findall(fold(text))
+            )
+            # Unknown prefixes are ordinary words ("à 4131 Esch")
+            if not prefix or prefix in COUNTRY_PREFIXES
+        ]
+        postal_code = None
+        for code, countries in codes:
+            candidates = [c for country in countries for c in self.by_postal_code(code, country)]
+            if candidates:
+                postal_code, method = code, "postal_code"
+                # A code shared by several places ("6790", or one Luxembourg code for two villages)
+                # is settled by the town named with it
+                place = next((c for c in candidates if named and named.commune == c.commune), candidates[0])
+                break
+        if place is None:
+            place = named
+            method = "name" if place else None
+        elif named and named.commune == place.commune:
+            # A named locality inside the commune the code points at is more precise ("L-4501 Oberkorn")
+            place = named
+        elif named:
+            # The town disagrees with the code ("rue du Kiem 8070 Bertrange" under a Strassen code)
+            place, method, conflict = named, "name", True
+        if place is None:
+            match = self.fuzzy(text)
+            if match is None:
+                return None
+            (place, score), method = match, "fuzzy"
+        if postal_code is None:
+            # A code the tables don't know ("4131 Esch") is still the customer's postal code
+            postal_code = next((code for code, countries in codes if place.country in countries), None)
+        match = {
+            "point": place.point,
+            "place": place.name,
+            "commune": place.commune,
+            "region": place.region,
+            "country": place.country,
+            "postal_code": postal_code,
+            "method": method,
+            "score": round(score, 3),
+        }
+        if conflict:
+            match["postal_code_conflict"] = True
+        return match
+
+
+def geo_fields(geocoder: Geocoder, location: Optional[str]) -> dict:
+    """Fields to store alongside a document with a free-text location (empty if it can't be placed)"""
+    match = geocoder.geocode(location)
+    if match is None:
+        return {}
+    point = match.pop("point")
+    return {"geo": point, "geo_match": match}
+
+
+POSTAL_CODES_HEADER = """\
+# Postal codes for the offline geocoder (geocoding.py), one row per code and
+# locality; a code shared by several localities has one row for each.
+# Generated with `python geocoding.py --import-postal-codes <official list>`
+# from Luxembourg's official code list; don't edit by hand, re-import it.
+"""
+
+
+def import_postal_codes(geocoder: Geocoder, source: str, destination: str, country: str = "LU",
+                        code_column: str = "code_postal", locality_column: str = "localite") -> Tuple[int, List[str]]:
+    """
+    Write `destination` from an official code list (CSV, delimiter sniffed);
+    returns the rows written and the localities places.csv doesn't know
+    """
+    with open(source, encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        rows, unknown = set(), set()
+        for row in csv.DictReader(f, dialect=dialect):
+            code = re.sub(r"\D", "", row[code_column] or "")
+            locality = (row[locality_column] or "").strip()
+            if not code or not locality:
+                continue
+            place = geocoder._names.get(normalize(locality))
+            if place is None or place.country != country:
+                unknown.add(locality)
+                continue
+            rows.add((int(code), place.name))
+    with open(destination, "w", encoding="utf-8", newline="") as f:
+        f.write(POSTAL_CODES_HEADER)
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["country", "postal_code", "locality"])
+        for code, name in sorted(rows):
+            writer.writerow([country, code, name])
+    return len(rows), sorted(unknown)
+
+
+def backfill(db, geocoder: Geocoder, collection: str, batch_size: int = 1000) -> Tuple[int, int]:
+    """Geocode documents with a location but no geo_match yet; returns (placed, unplaced)"""
+    placed = unplaced = 0
+    operations = []
+    query = {"location": {"$type": "string"}, "geo_match": {"$exists": False}}
+    for doc in db[collection].find(query, {"location": 1}, batch_size=batch_size):
+        fields = geo_fields(geocoder, doc["location"])
+        if fields:
+            placed += 1
+        else:
+            unplaced += 1
+        # Unplaced documents get geo_match null so they aren't retried on every run
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields or {"geo_match": None}}))
+        if len(operations) >= batch_size:
+            db[collection].bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        db[collection].bulk_write(operations, ordered=False)
+    return placed, unplaced
+
+
+def _misspell(text: str, rng: random.Random) -> str:
+    position = rng.randrange(len(text))
+    edit = rng.choice(("drop", "swap", "double"))
+    if edit == "drop":
+        return text[:position] + text[position + 1:]
+    if edit == "swap" and position < len(text) - 1:
+        return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+    return text[:position] + text[position] + text[position:]
+
+
+def bench(geocoder: Geocoder, lookups: int) -> None:
+    rng = random.Random(42)
+    names = [place.name for place in geocoder.places]
+    inputs = {
+        "exact": [rng.choice(names) for _ in range(lookups)],
+        "address": [f"{rng.randint(1, 120)} rue Principale, {rng.choice(names)}" for _ in range(lookups)],
+        "misspelt": [_misspell(rng.choice(names), rng) for _ in range(lookups)],
+    }
+    print(f"🗺️  {len(geocoder.places)} places, {len(geocoder._names)} names, {len(geocoder._trigrams)} trigrams")
+    for label, texts in inputs.items():
+        started = time.perf_counter()
+        matched = sum(1 for text in texts if geocoder.geocode(text))
+        elapsed = (time.perf_counter() - started) * 1e6 / len(texts)
+        print(f"   {label:<9} {elapsed:7.1f} µs/lookup, {matched}/{len(texts)} placed")
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Offline geocoding of quote and ticket locations")
+    parser.add_argument("--lookup", help="geocode a location and print the match")
+    parser.add_argument("--backfill", action="store_true", help="geocode stored quotes and tickets")
+    parser.add_argument("--bench", action="store_true", help="time lookups on synthetic input")
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--import-postal-codes", metavar="CSV", help="rebuild postal_codes.csv from the official code list")
+    parser.add_argument("--code-column", default="code_postal")
+    parser.add_argument("--locality-column", default="localite")
+    parser.add_argument("--places", default=os.getenv("GEOCODER_PLACES_PATH") or PLACES_PATH)
+    parser.add_argument("--postal-codes", default=os.getenv("GEOCODER_POSTAL_CODES_PATH") or POSTAL_CODES_PATH)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    args = parser.parse_args()
+    if not (args.lookup or args.backfill or args.bench or args.import_postal_codes):
+        parser.error("nothing to do (use --lookup, --backfill, --bench or --import-postal-codes)")
+
+    if args.import_postal_codes:
+        # Locality names only come from places.csv, so the current code table isn't needed
+        written, unknown = import_postal_codes(Geocoder(args.places, postal_codes_path=None), args.import_postal_codes,
+                                               args.postal_codes, code_column=args.code_column,
+                                               locality_column=args.locality_column)
+        print(f"✅ {written} postal codes written to {args.postal_codes}")
+        if unknown:
+            print(f"   {len(unknown)} localities not in places.csv (add them to place their codes): "
+                  + ", ".join(unknown[:20]) + (" ..." if len(unknown) > 20 else ""))
+    geocoder = Geocoder(args.places, postal_codes_path=args.postal_codes)
+    if args.lookup:
+        match = geocoder.geocode(args.lookup)
+        if match is None:
+            print("❌ No match")
+        else:
+            lon, lat = match["point"]["coordinates"]
+            print(f"📍 {match['place']} ({match['commune']}, {match['region']}, {match['country']}) "
+                  f"{lat:.4f}, {lon:.4f} by {match['method']}, score {match['score']}")
+    if args.bench:
+        bench(geocoder, args.lookups)
+    if args.backfill:
+        db = MongoClient(args.mongo_url).get_database()
+        ensure_indexes(db)
+        for collection in GEO_COLLECTIONS:
+            placed, unplaced = backfill(db, geocoder, collection)
+            print(f"✅ {collection}: {placed} geocoded, {unplaced} not placed")
+
+
+if __name__ == "__main__":
+    main()
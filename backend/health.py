@@ -0,0 +1,112 @@
+"""
+Cached dependency checks for liveness/readiness probes.
+
+Checks run in a background task on a fixed interval and their results are
+cached, so probe requests only read memory and never touch the dependencies.
+A check that is still running from a previous round is not started again,
+which keeps a hung dependency from piling up threads.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("sparksonic.health")
+
+
+class HealthCheck:
+    def __init__(self, name: str, check: Callable[[], Optional[dict]], critical: bool = True):
+        """
+        `check` is a blocking callable that raises on failure and may return
+        extra details. Only critical checks make the worker unready.
+        """
+        self.name = name
+        self.check = check
+        self.critical = critical
+        self.result: Optional[dict] = None
+        self.running: Optional[asyncio.Future] = None
+
+
+class HealthMonitor:
+    def __init__(self, interval: float = 10.0, timeout: float = 3.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.checks: Dict[str, HealthCheck] = {}
+        self.last_refresh: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_check(self, name: str, check: Callable[[], Optional[dict]], critical: bool = True) -> None:
+        self.checks[name] = HealthCheck(name, check, critical)
+
+    async def _run_check(self, health_check: HealthCheck) -> None:
+        if health_check.running is not None and not health_check.running.done():
+            health_check.result = {
+                "ok": False,
+                "error": "previous check still running",
+                "checked_at": datetime.utcnow().isoformat()
+            }
+            return
+
+        loop = asyncio.get_running_loop()
+        health_check.running = loop.run_in_executor(None, health_check.check)
+        started = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(asyncio.shield(health_check.running), timeout=self.timeout)
+            result = {"ok": True}
+            result.update(details or {})
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        result["checked_at"] = datetime.utcnow().isoformat()
+
+        previous = health_check.result
+        if previous is not None and previous["ok"] != result["ok"]:
+            logger.warning("Health check changed state", extra={"check": health_check.name, "ok": result["ok"]})
+        health_check.result = result
+
+    async def refresh(self) -> None:
+        await asyncio.gather(*(self._run_check(c) for c in self.checks.values()))
+        self.last_refresh = time.monotonic()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Health refresh failed", extra={"error": str(e)})
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def liveness(self) -> dict:
+        """The worker is alive as long as its event loop answers and the refresher is running"""
+        alive = self._task is not None and not self._task.done()
+        return {"status": "alive" if alive else "dead"}
+
+    def readiness(self) -> dict:
+        stale = self.last_refresh is None or time.monotonic() - self.last_refresh > self.interval * 3
+        checks = {name: c.result or {"ok": False, "error": "not checked yet"} for name, c in self.checks.items()}
+        critical_ok = all(checks[name]["ok"] for name, c in self.checks.items() if c.critical)
+        all_ok = all(result["ok"] for result in checks.values())
+
+        if stale or not critical_ok:
+            status = "unready"
+        elif not all_ok:
+            status = "degraded"
+        else:
+            status = "ready"
+        return {"status": status, "stale": stale, "checks": checks}
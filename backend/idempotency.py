@@ -0,0 +1,203 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+A client that retries a request with the same `Idempotency-Key` header gets the
+stored response back instead of a second insert (and a second round of emails).
+Responses live in a TTL-indexed collection; concurrent requests for the same key
+are coalesced so only the first one is processed.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+import deadlines
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# Response headers stored with the body and sent again on replay
+REPLAYED_HEADERS = (b"content-type", b"content-length", b"x-causal-token")
+
+
+def ensure_indexes(collection, ttl_seconds: int) -> None:
+    """Create the TTL index that expires stored responses"""
+    collection.create_index([("created_at", ASCENDING)], expireAfterSeconds=ttl_seconds)
+
+
+def _json_response(status_code: int, content: dict, extra_headers: Optional[list] = None):
+    body = json.dumps(content).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("latin-1")),
+    ]
+    return status_code, headers + (extra_headers or []), body
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware that stores and replays responses keyed by Idempotency-Key.
+
+    The stored key is scoped to the request path and Authorization header, so two
+    customers can't replay each other's responses. Reusing a key with a different
+    body is rejected with 422. Only responses below 500 are stored; server errors
+    release the key so the client can retry.
+    """
+
+    def __init__(self, app, collection, paths: Iterable[str], wait_timeout: float = 15.0,
+                 poll_interval: float = 0.1):
+        self.app = app
+        self.collection = collection
+        self.paths = set(paths)
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        raw_key = headers.get(IDEMPOTENCY_HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await self._send(send, *_json_response(400, {"detail": "Invalid Idempotency-Key header"}))
+            return
+
+        body = await self._read_body(receive)
+        storage_key = hashlib.sha256(
+            b"\0".join([scope["path"].encode("utf-8"), headers.get(b"authorization", b""), key.encode("utf-8")])
+        ).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        stored = await self._acquire(storage_key, fingerprint)
+        if stored is not None:
+            await self._send(send, *stored)
+            return
+
+        event = asyncio.Event()
+        self._inflight[storage_key] = event
+        try:
+            await self._run_and_store(scope, body, send, storage_key)
+        finally:
+            event.set()
+            self._inflight.pop(storage_key, None)
+
+    async def _acquire(self, storage_key: str, fingerprint: str):
+        """
+        Return a response to replay, or None once this request owns the key.
+        """
+        # Never wait past the request's own deadline
+        deadline = time.monotonic() + deadlines.cap(self.wait_timeout)
+        while True:
+            # Coalesce with a request for the same key in this worker
+            event = self._inflight.get(storage_key)
+            if event is not None:
+                remaining = deadline - time.monotonic()
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=max(remaining, 0))
+                except asyncio.TimeoutError:
+                    return _json_response(409, {"detail": "A request with this Idempotency-Key is still in progress"})
+                continue
+
+            doc = self.collection.find_one({"_id": storage_key})
+            if doc is None:
+                try:
+                    self.collection.insert_one({
+                        "_id": storage_key,
+                        "fingerprint": fingerprint,
+                        "state": "pending",
+                        "created_at": datetime.utcnow()
+                    })
+                    return None
+                except DuplicateKeyError:
+                    continue
+
+            if doc["fingerprint"] != fingerprint:
+                return _json_response(422, {"detail": "Idempotency-Key was already used with a different request body"})
+
+            if doc["state"] == "done":
+                headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in doc["headers"]]
+                headers.append((b"idempotent-replayed", b"true"))
+                return doc["status_code"], headers, doc["body"]
+
+            # Another worker owns the key; poll until it finishes
+            if time.monotonic() >= deadline:
+                return _json_response(409, {"detail": "A request with this Idempotency-Key is still in progress"})
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run_and_store(self, scope, body: bytes, send, storage_key: str):
+        response = {"status_code": 500, "headers": [], "chunks": []}
+        stored = False
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        async def capture_send(message):
+            nonlocal stored
+            if message["type"] == "http.response.start":
+                response["status_code"] = message["status"]
+                response["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                response["chunks"].append(message.get("body", b""))
+                # Store as soon as the body is complete, before background tasks run
+                if not message.get("more_body", False):
+                    self._store(storage_key, response)
+                    stored = True
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if not stored:
+                self.collection.delete_one({"_id": storage_key, "state": "pending"})
+
+    def _store(self, storage_key: str, response: dict) -> None:
+        if response["status_code"] >= 500:
+            self.collection.delete_one({"_id": storage_key, "state": "pending"})
+            return
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in response["headers"]
+            if name.lower() in REPLAYED_HEADERS
+        ]
+        self.collection.update_one(
+            {"_id": storage_key},
+            {"$set": {
+                "state": "done",
+                "status_code": response["status_code"],
+                "headers": headers,
+                "body": b"".join(response["chunks"]),
+                "completed_at": datetime.utcnow()
+            }}
+        )
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    @staticmethod
+    async def _send(send, status_code: int, headers: list, body: bytes):
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
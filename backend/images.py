@@ -0,0 +1,294 @@
+"""
+Resized WebP/AVIF derivatives of project images.
+
+Project documents point at full-size originals (usually remote URLs). For
+each size preset the frontend uses, a derivative is rendered once in a
+process pool and kept in a disk cache:
+
+  sources/<sha256 of source bytes>           the fetched original
+  <sha256 of source bytes+preset+format>     the encoded derivative
+
+File names are derived from the content that produced them, so a cached file
+never needs revalidating; each worker re-fetches a source URL after
+SOURCE_MAX_AGE to notice when the image behind it was replaced. The cache is
+bounded by total size and evicts the least recently used files first (access
+time is tracked with the file mtime). Files handed out by `get`/`put` are
+pinned until released, so eviction never removes one that is being read.
+Concurrent requests for the same derivative share one render.
+
+Derivative URLs carry `v=<version>` (a hash of the source bytes); a request
+with the current version is served as immutable. New content behind the same
+URL gets a new version, so stale derivatives are never served from browser
+caches.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+import requests
+from PIL import Image, ImageOps, features
+
+# Bump when the rendering changes so old derivatives are not reused
+PIPELINE_VERSION = "1"
+
+MAX_SOURCE_BYTES = 25 * 1024 * 1024
+SOURCE_TIMEOUT = 10
+SOURCE_MAX_AGE = 3600
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+# Widths used by the frontend: project cards (1x/2x) and the hero slider
+PRESETS: Dict[str, int] = {
+    "thumb": 320,
+    "card": 640,
+    "card_2x": 1280,
+    "hero": 1920,
+}
+
+# format -> (Pillow format, media type, encoder options)
+FORMATS: Dict[str, Tuple[str, str, dict]] = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "avif": ("AVIF", "image/avif", {"quality": 55, "speed": 6}),
+}
+
+
+class ImageError(ValueError):
+    """Unknown preset or format, or a source that can't be used"""
+
+
+def available_formats() -> list:
+    """Formats the installed Pillow can encode (AVIF needs Pillow built with libavif)"""
+    return [name for name in FORMATS if features.check(name)]
+
+
+def image_version(digest: str) -> str:
+    """`v=` of the derivatives rendered from a source with this content digest"""
+    return hashlib.sha256(f"{PIPELINE_VERSION}:{digest}".encode("utf-8")).hexdigest()[:12]
+
+
+def parse_variant(filename: str) -> Tuple[str, str]:
+    """'card.webp' -> ('card', 'webp')"""
+    preset, _, fmt = filename.partition(".")
+    if preset not in PRESETS:
+        raise ImageError(f"Unknown preset {preset}")
+    if fmt not in FORMATS or not features.check(fmt):
+        raise ImageError(f"Unsupported format {fmt}")
+    return preset, fmt
+
+
+def render_derivative(source_path: str, width: int, fmt: str) -> bytes:
+    """Runs in a worker process: resize (never upscale) and encode"""
+    pillow_format, _, options = FORMATS[fmt]
+    try:
+        image = Image.open(source_path)
+    except Image.DecompressionBombError:
+        raise ImageError("Image source too large")
+    with image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, pillow_format, **options)
+    return out.getvalue()
+
+
+def iter_file(handle: BinaryIO, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+    """Stream an open file and close it; the data stays readable even if the path is evicted"""
+    try:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
+
+
+class DiskCache:
+    """
+    Content-addressed files under one directory, LRU-evicted by total size.
+    `get` and `put` pin the returned path; callers `release` it when done.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+        self._pins: Dict[str, int] = {}
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _scan(self) -> None:
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except FileNotFoundError:
+                    pass
+        self._total = total
+
+    def _pin(self, path: str) -> None:
+        self._pins[path] = self._pins.get(path, 0) + 1
+
+    def release(self, path: str) -> None:
+        with self._lock:
+            count = self._pins.pop(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path(key)
+        # Under the lock, so an eviction can't slip in between the check and the pin
+        with self._lock:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+            self._pin(path)
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._pin(path)
+            if self._total is None:
+                self._scan()
+            else:
+                self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+        return path
+
+    def _evict(self) -> None:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        # Evict down to 90% so a full cache doesn't rescan on every write
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            # Files being read or rendered from, and writes not yet renamed into place
+            if path in self._pins or path.endswith(".tmp"):
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total = total
+
+
+class ImagePipeline:
+    def __init__(self, cache: DiskCache, workers: int = 2):
+        self.cache = cache
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._sources: Dict[str, Tuple[str, float]] = {}  # url -> (content digest, fetched at)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app doesn't fork workers
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _fetch_source(self, url: str) -> Tuple[str, str]:
+        """Content digest and pinned cache path of the image at `url`"""
+        known = self._sources.get(url)
+        if known and time.monotonic() - known[1] < SOURCE_MAX_AGE:
+            cached = self.cache.get(os.path.join("sources", known[0]))
+            if cached:
+                return known[0], cached
+        if not url.startswith(("http://", "https://")):
+            raise ImageError("Image source must be an http(s) URL")
+        with requests.get(url, timeout=SOURCE_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            data = bytearray()
+            for chunk in response.iter_content(chunk_size=256 * 1024):
+                data.extend(chunk)
+                if len(data) > MAX_SOURCE_BYTES:
+                    raise ImageError("Image source too large")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.cache.put(os.path.join("sources", digest), bytes(data))
+        self._sources[url] = (digest, time.monotonic())
+        return digest, path
+
+    async def derivative(self, url: str, preset: str, fmt: str) -> Tuple[str, str]:
+        """
+        Pinned path of the cached derivative (rendering it if needed) and the
+        source's content digest. Release the path when done with it.
+        """
+        loop = asyncio.get_running_loop()
+        digest, source_path = await loop.run_in_executor(None, self._fetch_source, url)
+        try:
+            key = hashlib.sha256(f"{PIPELINE_VERSION}:{digest}:{preset}:{fmt}".encode("utf-8")).hexdigest() + "." + fmt
+            # Another request's render may be evicted before this one pins it; try again once
+            for _ in range(2):
+                cached = self.cache.get(key)
+                if cached:
+                    return cached, digest
+                pending = self._inflight.get(key)
+                if pending is not None:
+                    await asyncio.shield(pending)
+                    continue
+                return await self._render(key, source_path, preset, fmt), digest
+            raise ImageError("Derivative evicted while rendering")
+        finally:
+            self.cache.release(source_path)
+
+    async def open(self, url: str, preset: str, fmt: str) -> Tuple[BinaryIO, str]:
+        """Open handle on the derivative (safe to stream while the cache evicts) and the source digest"""
+        path, digest = await self.derivative(url, preset, fmt)
+        try:
+            return open(path, "rb"), digest
+        finally:
+            self.cache.release(path)
+
+    async def _render(self, key: str, source_path: str, preset: str, fmt: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            data = await loop.run_in_executor(self._get_pool(), render_derivative, source_path, PRESETS[preset], fmt)
+            path = await loop.run_in_executor(None, self.cache.put, key, data)
+            future.set_result(path)
+            return path
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a render nobody else waited for doesn't log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            del self._inflight[key]
@@ -0,0 +1,214 @@
+"""
+Digest mode for staff notifications.
+
+Instead of one email to SMTP_TO_EMAIL per contact, quote and ticket, each
+notification is queued in Mongo and a background task sends one grouped
+summary per window. The queue is shared by all workers:
+
+  - a flush is started by at most one worker per window (a schedule
+    document whose `next_flush_at` is advanced with a conditional update)
+  - entries are claimed by tagging them with a batch ID before sending, so
+    two flushes never mail the same entry
+  - entries are deleted only after the digest was sent; on failure the claim
+    is released and they go out with the next window. Claims left behind by
+    a worker that died mid-flush are taken over after a few windows.
+
+Urgent notifications (high-priority tickets) bypass the queue; customer
+confirmations never go through it. Repeats that only need a look
+(same-sender near-duplicates) are throttled with `once_per_window`, so a
+sender who keeps resubmitting costs staff one notification per window.
+"""
+import asyncio
+import html
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger("sparksonic.notifications")
+
+MAX_ENTRIES_PER_DIGEST = 500
+MAX_MESSAGE_CHARS = 600
+
+# Section titles, in the order they appear in the digest
+KIND_TITLES = OrderedDict([
+    ("ticket", "Support Tickets"),
+    ("quote", "Quote Requests"),
+    ("contact", "Contact Messages"),
+])
+
+
+def ensure_indexes(queue_collection, schedule_collection=None) -> None:
+    queue_collection.create_index([("batch", ASCENDING), ("created_at", ASCENDING)])
+    if schedule_collection is not None:
+        # Throttle keys from once_per_window; the digest's own schedule has no expire_at
+        schedule_collection.create_index("expire_at", name="expire_at", expireAfterSeconds=0)
+
+
+def render_digest(entries: List[dict]) -> Tuple[str, str]:
+    """Subject and HTML body of one digest, entries grouped by kind"""
+    groups = OrderedDict((kind, []) for kind in KIND_TITLES)
+    for entry in entries:
+        groups.setdefault(entry["kind"], []).append(entry)
+
+    counts = [f"{len(items)} {KIND_TITLES.get(kind, kind).lower()}" for kind, items in groups.items() if items]
+    subject = f"Sparksonic digest: {', '.join(counts)}"
+
+    sections = []
+    for kind, items in groups.items():
+        if not items:
+            continue
+        rows = []
+        for entry in items:
+            fields = "<br>".join(
+                f"<strong>{html.escape(label)}:</strong> {html.escape(str(value))}"
+                for label, value in entry.get("fields", [])
+            )
+            message = entry.get("message") or ""
+            if len(message) > MAX_MESSAGE_CHARS:
+                message = message[:MAX_MESSAGE_CHARS] + "…"
+            rows.append(f"""
+            <tr>
+                <td style="padding:8px;border-bottom:1px solid #ddd;vertical-align:top;white-space:nowrap">
+                    {entry["created_at"].strftime("%H:%M")}
+                </td>
+                <td style="padding:8px;border-bottom:1px solid #ddd">
+                    <strong>{html.escape(entry["title"])}</strong><br>
+                    {fields}
+                    <p>{html.escape(message)}</p>
+                </td>
+            </tr>""")
+        sections.append(f"""
+        <h3>{html.escape(KIND_TITLES.get(kind, kind))} ({len(items)})</h3>
+        <table style="border-collapse:collapse;width:100%">{"".join(rows)}
+        </table>""")
+
+    first, last = entries[0]["created_at"], entries[-1]["created_at"]
+    body = f"""
+    <html>
+        <body>
+            <h2>New submissions</h2>
+            <p>{first.strftime("%Y-%m-%d %H:%M")} – {last.strftime("%H:%M")} UTC</p>
+            {"".join(sections)}
+        </body>
+    </html>
+    """
+    return subject, body
+
+
+class NotificationDigest:
+    def __init__(self, queue_collection, schedule_collection, send: Callable[[str, str], bool],
+                 window_seconds: float = 900.0, name: str = "staff"):
+        """
+        `send(subject, body)` is a blocking callable that mails one digest and
+        returns False on failure.
+        """
+        self.queue = queue_collection
+        self.schedule = schedule_collection
+        self.send = send
+        self.window_seconds = window_seconds
+        self.name = name
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(self, kind: str, title: str, fields: List[Tuple[str, Optional[str]]], message: str = "") -> None:
+        self.queue.insert_one({
+            "digest": self.name,
+            "kind": kind,
+            "title": title,
+            "fields": [[label, value] for label, value in fields if value],
+            "message": message,
+            "created_at": datetime.utcnow(),
+            "batch": None,
+        })
+
+    def _acquire_window(self, now: datetime) -> bool:
+        """True for exactly one caller per window across all workers"""
+        try:
+            self.schedule.find_one_and_update(
+                {"_id": f"digest:{self.name}", "next_flush_at": {"$lte": now}},
+                {"$set": {"next_flush_at": now + timedelta(seconds=self.window_seconds * 0.9)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return True
+        except DuplicateKeyError:
+            # The schedule exists and isn't due yet: another worker flushed this window
+            return False
+
+    def once_per_window(self, key: str, now: Optional[datetime] = None) -> bool:
+        """True for the first caller with `key` in each window, across all workers"""
+        now = now or datetime.utcnow()
+        until = now + timedelta(seconds=self.window_seconds)
+        try:
+            self.schedule.find_one_and_update(
+                {"_id": f"once:{self.name}:{key}", "next_at": {"$lte": now}},
+                {"$set": {"next_at": until, "expire_at": until}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _claim(self, now: datetime) -> Tuple[str, List[dict]]:
+        batch = uuid.uuid4().hex
+        stale = now - timedelta(seconds=self.window_seconds * 3)
+        query = {
+            "digest": self.name,
+            "created_at": {"$lte": now},
+            "$or": [{"batch": None}, {"claimed_at": {"$lt": stale}}],
+        }
+        ids = [doc["_id"] for doc in self.queue.find(query, {"_id": 1})
+               .sort("created_at", ASCENDING).limit(MAX_ENTRIES_PER_DIGEST)]
+        if not ids:
+            return batch, []
+        # Re-check the claim condition so an entry taken by another flush in between is skipped
+        self.queue.update_many(dict(query, _id={"$in": ids}), {"$set": {"batch": batch, "claimed_at": now}})
+        entries = list(self.queue.find({"batch": batch}).sort("created_at", ASCENDING))
+        return batch, entries
+
+    def flush(self, force: bool = False) -> int:
+        """Send every queued notification as digests; return how many entries went out"""
+        now = datetime.utcnow()
+        if not force and not self._acquire_window(now):
+            return 0
+        sent = 0
+        while True:
+            batch, entries = self._claim(now)
+            if not entries:
+                return sent
+            subject, body = render_digest(entries)
+            if not self.send(subject, body):
+                self.queue.update_many({"batch": batch}, {"$set": {"batch": None}, "$unset": {"claimed_at": ""}})
+                logger.warning("Digest not sent, entries kept for the next window", extra={"entries": len(entries)})
+                return sent
+            self.queue.delete_many({"batch": batch})
+            sent += len(entries)
+            logger.info("Digest sent", extra={"entries": len(entries)})
+            if len(entries) < MAX_ENTRIES_PER_DIGEST:
+                return sent
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.window_seconds)
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception as e:
+                logger.error("Digest flush failed", extra={"error": str(e)})
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
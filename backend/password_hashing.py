@@ -0,0 +1,115 @@
+"""
+Password hashing with a cost calibrated to the machine.
+
+At startup the cost of the configured scheme is measured on this box and
+raised until one hash takes about PASSWORD_HASH_TARGET_MS, so login latency
+is the same in dev and prod instead of whatever passlib's default cost
+happens to cost here. A floor keeps slow machines from picking a weak cost.
+
+  bcrypt   cost = log2 rounds, every step doubles the time
+  argon2   argon2id with fixed memory/parallelism; cost = time_cost (passes)
+
+Hashes made with another scheme or below the minimum cost are flagged by
+`needs_update` and replaced after the next successful login, so changing
+the scheme or raising the floor needs no migration. The minimum comes from
+configuration (`min_cost`, else the fixed `cost`, else the scheme's
+security floor), never from calibration: each host calibrates on its own,
+and a host-derived bound would have a slower host rehash a faster host's
+hashes down and back. Hashes above the cost are never downgraded.
+"""
+import logging
+import math
+import time
+from typing import Optional
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger("sparksonic.passwords")
+
+SCHEMES = ("bcrypt", "argon2")
+
+# Security floors (OWASP password storage recommendations)
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+ARGON2_MIN_TIME_COST = 2
+ARGON2_MAX_TIME_COST = 12
+ARGON2_MIN_MEMORY_KIB = 19456
+
+CALIBRATION_PASSWORD = "calibration-password-0123456789"
+
+
+def _timed_hash(context: CryptContext, samples: int = 3) -> float:
+    """Fastest of a few hashes, in milliseconds; the minimum is the least noisy estimate"""
+    best = float("inf")
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(CALIBRATION_PASSWORD)
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def _settings(scheme: str, cost: int, memory_kib: int, parallelism: int) -> dict:
+    # default_rounds, not rounds: passlib's `rounds` also pins min/max, flagging every other cost for update
+    if scheme == "bcrypt":
+        return {"bcrypt__default_rounds": cost}
+    return {
+        "argon2__type": "ID",
+        "argon2__default_rounds": cost,
+        "argon2__memory_cost": memory_kib,
+        "argon2__parallelism": parallelism,
+    }
+
+
+def calibrate(scheme: str, target_ms: float, memory_kib: int = ARGON2_MIN_MEMORY_KIB, parallelism: int = 1) -> int:
+    """Highest cost whose hash time stays within `target_ms` (never below the floor)"""
+    if scheme == "bcrypt":
+        low, high = BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS
+    else:
+        low, high = ARGON2_MIN_TIME_COST, ARGON2_MAX_TIME_COST
+
+    def measure(cost: int, samples: int) -> float:
+        return _timed_hash(CryptContext(schemes=[scheme], **_settings(scheme, cost, memory_kib, parallelism)), samples)
+
+    # Extrapolate from the floor: bcrypt doubles per step, argon2 grows linearly with passes
+    elapsed = measure(low, samples=3)
+    if scheme == "bcrypt":
+        cost = low + int(math.log2(target_ms / elapsed)) if elapsed < target_ms else low
+    else:
+        cost = int(low * target_ms / elapsed)
+    cost = max(low, min(cost, high))
+    # Confirm the prediction, stepping down if this box is slower than extrapolated
+    while cost > low and measure(cost, samples=1) > target_ms:
+        cost -= 1
+    return cost
+
+
+def build_context(scheme: str = "bcrypt", target_ms: float = 250.0, cost: Optional[int] = None,
+                  memory_kib: int = ARGON2_MIN_MEMORY_KIB, parallelism: int = 1,
+                  min_cost: Optional[int] = None) -> CryptContext:
+    """
+    CryptContext hashing new passwords with `scheme` at a calibrated cost
+    (or `cost` when given) and still verifying hashes of the other scheme.
+    Hashes below `min_cost` need an update.
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown password hash scheme {scheme}")
+    memory_kib = max(memory_kib, ARGON2_MIN_MEMORY_KIB)
+    floor = BCRYPT_MIN_ROUNDS if scheme == "bcrypt" else ARGON2_MIN_TIME_COST
+    min_cost = max(floor, min_cost if min_cost is not None else cost or floor)
+
+    calibrated = cost is None
+    if calibrated:
+        started = time.perf_counter()
+        cost = calibrate(scheme, target_ms, memory_kib, parallelism)
+        logger.info("Password hashing calibrated", extra={
+            "scheme": scheme,
+            "cost": cost,
+            "target_ms": target_ms,
+            "calibration_ms": round((time.perf_counter() - started) * 1000),
+        })
+
+    other = [name for name in SCHEMES if name != scheme]
+    settings = _settings(scheme, cost, memory_kib, parallelism)
+    # Never above what this host hashes with, or its own new hashes would need an update
+    settings[f"{scheme}__min_desired_rounds"] = min(min_cost, cost)
+    return CryptContext(schemes=[scheme] + other, default=scheme, deprecated=other, **settings)
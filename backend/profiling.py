@@ -0,0 +1,198 @@
+"""
+On-demand sampling profiler for individual requests.
+
+A request is profiled when it carries a valid signed `X-Profile` header or is
+picked by the sampling rate. While it runs, a background thread samples the
+stack of the thread serving it and the result is written in collapsed-stack
+("folded") format, ready for flamegraph.pl or speedscope. Profiles are kept in
+a bounded on-disk ring.
+
+When profiling is disabled the middleware only checks a header and returns.
+"""
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+PROFILE_HEADER = b"x-profile"
+
+
+def sign_profile_token(secret: str, expires_at: int) -> str:
+    """Build an `X-Profile` header value valid until `expires_at` (unix time)"""
+    signature = hmac.new(secret.encode("utf-8"), str(expires_at).encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{expires_at}:{signature}"
+
+
+def verify_profile_token(secret: str, token: str) -> bool:
+    try:
+        expires_at, signature = token.split(":", 1)
+        expires_at = int(expires_at)
+    except ValueError:
+        return False
+    if expires_at < time.time():
+        return False
+    expected = sign_profile_token(secret, expires_at).split(":", 1)[1]
+    return hmac.compare_digest(expected, signature)
+
+
+class StackSampler:
+    """Samples the stack of one thread at a fixed interval from a daemon thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """Bounded ring of profiles on disk: `<id>.folded` plus `<id>.json` metadata"""
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def save(self, metadata: dict, folded: str) -> None:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            profile_id = metadata["id"]
+            with open(os.path.join(self.directory, f"{profile_id}.folded"), "w") as f:
+                f.write(folded)
+            with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as f:
+                json.dump(metadata, f)
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries[:max(len(entries) - self.max_profiles, 0)]:
+            profile_id = entry.name[:-len(".json")]
+            for suffix in (".json", ".folded"):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    with open(entry.path) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        profiles.sort(key=lambda p: p["created_at"], reverse=True)
+        return profiles
+
+    def read(self, profile_id: str) -> Optional[str]:
+        # Profile IDs are uuid hex, reject anything that could escape the directory
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.folded")) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles selected requests.
+
+    Only one request is profiled at a time; a request that would overlap an
+    active profile runs unprofiled. Requests are served on the event loop
+    thread, so samples taken while the request awaits can include other work
+    interleaved on the loop.
+    """
+
+    def __init__(self, app, store: ProfileStore, secret: Optional[str] = None,
+                 sample_rate: float = 0.0, interval: float = 0.005):
+        self.app = app
+        self.store = store
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._active = threading.Lock()
+
+    def _should_profile(self, scope) -> bool:
+        if self.secret:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return verify_profile_token(self.secret, value.decode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not self._active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def capture_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, capture_send)
+        finally:
+            sampler.stop()
+            duration_ms = (time.perf_counter() - started) * 1000
+            self._active.release()
+            # Directory creation, two file writes and eviction: keep them off the event loop
+            await run_in_threadpool(self.store.save, {
+                "id": uuid.uuid4().hex,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": status_code,
+                "duration_ms": round(duration_ms, 2),
+                "samples": sum(sampler.samples.values()),
+                "interval_ms": self.interval * 1000,
+                "created_at": datetime.utcnow().isoformat()
+            }, sampler.folded())
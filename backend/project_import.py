@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Bulk import of portfolio projects from NDJSON or CSV.
+
+Rows are read one at a time from the (optionally gzipped) file, validated
+against ProjectRecord and upserted by `slug` in unordered bulk_write batches,
+so memory use depends on the batch size, not the file size. Re-importing a
+file updates the projects it names and leaves the others alone; a field a
+row leaves out (an empty CSV cell, a missing JSON key) keeps its stored
+value, defaults only fill in new projects.
+
+Every invalid row is reported with its line number and the fields that
+failed; the rest of the file is still imported. Only the first
+MAX_REPORTED_ERRORS errors are listed, the total is always counted.
+
+CSV files have one column per field; `details.<name>` columns fill the
+details table shown on the project card (empty cells are skipped).
+
+When anything changed, the projects cache version is bumped so every worker
+rebuilds its cached `/api/projects` response. That includes a file that
+stops being readable half-way: the batches written before the bad byte stay,
+and the error says how far the import got.
+
+Usage: python project_import.py projects.csv --dry-run   # validate only
+       python project_import.py projects.ndjson.gz
+"""
+import argparse
+import codecs
+import csv
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ("ndjson", "csv")
+DETAILS_PREFIX = "details."
+CACHE_VERSION_ID = "projects"
+
+
+class ProjectImportError(ValueError):
+    """The upload can't be read at all (unknown format, not UTF-8, ...)
+
+    `report` is set when reading failed part-way through an import, with the
+    counts of what was written before it.
+    """
+    report: Optional[dict] = None
+
+
+class ProjectRecord(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    slug: str = Field(..., max_length=100, pattern=r"^[a-z0-9]+(-[a-z0-9]+)*$")
+    title: str = Field(..., min_length=1, max_length=200)
+    location: str = Field(..., min_length=1, max_length=100)
+    category: str = Field(..., min_length=1, max_length=100)
+    date: Optional[str] = Field(None, description="Completion date, YYYY-MM-DD")
+    image: Optional[str] = Field(None, max_length=2000, pattern=r"^https?://")
+    description: str = Field("", max_length=5000)
+    details: Dict[str, Union[int, float, str]] = Field(default_factory=dict)
+
+    @field_validator("date")
+    @classmethod
+    def valid_date(cls, value: Optional[str]) -> Optional[str]:
+        if value:
+            date.fromisoformat(value)
+        return value or None
+
+    @field_validator("details")
+    @classmethod
+    def bounded_details(cls, value: dict) -> dict:
+        if len(value) > 20:
+            raise ValueError("at most 20 details")
+        return value
+
+
+def detect_format(filename: Optional[str], format: Optional[str] = None) -> str:
+    if format:
+        if format not in FORMATS:
+            raise ProjectImportError("format must be ndjson or csv")
+        return format
+    name = re.sub(r"\.gz$", "", (filename or "").lower())
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    raise ProjectImportError("Can't tell the format from the file name; pass format=ndjson or csv")
+
+
+def open_text(raw: BinaryIO):
+    """Text stream over `raw`, gunzipping it when it starts with the gzip magic"""
+    magic = raw.read(2)
+    raw.seek(0)
+    if magic == b"\x1f\x8b":
+        raw = gzip.GzipFile(fileobj=raw, mode="rb")
+    # utf-8-sig drops the BOM spreadsheet programs put in front of CSV exports
+    return codecs.getreader("utf-8-sig")(raw, errors="strict")
+
+
+def read_rows(raw: BinaryIO, format: str) -> Iterator[Tuple[int, object]]:
+    """(line number, parsed row or an error message) for every record, lazily"""
+    text = open_text(raw)
+    try:
+        if format == "ndjson":
+            for line_number, line in enumerate(text, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, f"invalid JSON: {e}"
+            return
+
+        reader = csv.DictReader(text)
+        for row in reader:
+            # DictReader files cells beyond the header under None
+            if None in row:
+                yield reader.line_num, "more cells than header columns"
+                continue
+            record, details = {}, {}
+            for column, value in row.items():
+                value = (value or "").strip()
+                if not value:
+                    continue
+                if column.startswith(DETAILS_PREFIX):
+                    details[column[len(DETAILS_PREFIX):]] = value
+                else:
+                    record[column.strip()] = value
+            if details:
+                record["details"] = details
+            yield reader.line_num, record
+    except UnicodeDecodeError:
+        raise ProjectImportError("File is not UTF-8 encoded")
+    except (OSError, EOFError) as e:
+        # Truncated or corrupt gzip
+        raise ProjectImportError(f"Can't read file: {e}")
+
+
+def ensure_indexes(projects_collection) -> None:
+    # Projects created by hand before imports existed have no slug
+    projects_collection.create_index(
+        "slug", unique=True, name="slug_unique",
+        partialFilterExpression={"slug": {"$type": "string"}},
+    )
+
+
+def cache_version(versions_collection) -> int:
+    doc = versions_collection.find_one({"_id": CACHE_VERSION_ID})
+    return doc["version"] if doc else 0
+
+
+def bump_cache_version(versions_collection) -> int:
+    doc = versions_collection.find_one_and_update(
+        {"_id": CACHE_VERSION_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow().isoformat()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["version"]
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, line: int, errors: List[dict]) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _validation_errors(e: ValidationError) -> List[dict]:
+    return [
+        {"field": ".".join(str(part) for part in error["loc"]) or None, "message": error["msg"]}
+        for error in e.errors()
+    ]
+
+
+def _write_batch(projects_collection, batch: Dict[str, Tuple[int, ProjectRecord]], report: ImportReport) -> None:
+    now = datetime.utcnow().isoformat()
+    lines = []
+    # No updated_at in $set: a re-imported row that didn't change stays unmodified and doesn't bump the cache
+    operations = []
+    for line, record in batch.values():
+        lines.append(line)
+        # Only the fields the row gave overwrite a stored project; defaults are for new ones
+        fields = record.model_dump(exclude_unset=True)
+        defaults = {key: value for key, value in record.model_dump().items() if key not in fields}
+        operations.append(UpdateOne(
+            {"slug": record.slug},
+            {"$set": fields, "$setOnInsert": {**defaults, "created_at": now}},
+            upsert=True,
+        ))
+    try:
+        result = projects_collection.bulk_write(operations, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        result = e.details
+        for error in result["writeErrors"]:
+            report.error(lines[error["index"]], [{"field": None, "message": error["errmsg"]}])
+    report.inserted += result["nUpserted"]
+    report.updated += result["nModified"]
+    report.unchanged += result["nMatched"] - result["nModified"]
+
+
+def import_projects(projects_collection, versions_collection, raw: BinaryIO, format: str,
+                    batch_size: int = BATCH_SIZE, dry_run: bool = False) -> dict:
+    report = ImportReport()
+    # Keyed by slug: a project listed twice in one batch is written once, last row wins
+    batch: Dict[str, Tuple[int, ProjectRecord]] = {}
+    version = None
+    try:
+        for line, row in read_rows(raw, format):
+            report.rows += 1
+            if isinstance(row, str):
+                report.error(line, [{"field": None, "message": row}])
+                continue
+            if not isinstance(row, dict):
+                report.error(line, [{"field": None, "message": "row must be a JSON object"}])
+                continue
+            try:
+                record = ProjectRecord(**row)
+            except ValidationError as e:
+                report.error(line, _validation_errors(e))
+                continue
+            batch[record.slug] = (line, record)
+            if len(batch) >= batch_size:
+                if not dry_run:
+                    _write_batch(projects_collection, batch, report)
+                batch = {}
+        if batch and not dry_run:
+            _write_batch(projects_collection, batch, report)
+    except ProjectImportError as e:
+        if report.inserted or report.updated:
+            e.report = report.as_dict()
+            e.args = (f"{e} after {report.rows} rows; {report.inserted} inserted and "
+                      f"{report.updated} updated before that were kept",)
+        raise
+    finally:
+        # Batches already written are live whether or not the rest of the file could be read
+        if report.inserted or report.updated:
+            version = bump_cache_version(versions_collection)
+
+    result = report.as_dict()
+    result["dry_run"] = dry_run
+    if version is not None:
+        result["cache_version"] = version
+    return result
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Import portfolio projects from NDJSON or CSV")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file name")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="validate without writing")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_url).get_database()
+    ensure_indexes(db["projects"])
+    with open(args.path, "rb") as f:
+        report = import_projects(
+            db["projects"], db["cache_versions"], f, detect_format(args.path, args.format),
+            batch_size=args.batch_size, dry_run=args.dry_run,
+        )
+
+    print(f"{'🔎' if args.dry_run else '✅'} {report['rows']} rows: {report['inserted']} inserted, "
+          f"{report['updated']} updated, {report['unchanged']} unchanged, {report['failed']} failed")
+    for error in report["errors"]:
+        details = "; ".join(f"{e['field'] + ': ' if e['field'] else ''}{e['message']}" for e in error["errors"])
+        print(f"   line {error['line']}: {details}")
+    if report["errors_truncated"]:
+        print(f"   ... {report['failed'] - len(report['errors'])} more")
+    if "cache_version" in report:
+        print(f"   projects cache version {report['cache_version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Read routing for a replica set.
+
+Listing and catalog reads (projects, a customer's quotes and tickets, the
+profile) are served by secondaries, as long as they are no more than
+MONGO_MAX_STALENESS_SECONDS behind; everything else, and every write, stays
+on the primary. With no secondary in range the driver falls back to the
+primary (secondaryPreferred).
+
+Secondary reads lag, so a customer who just created a quote could miss it
+on the next page load. Writes that customers read back run in a causally
+consistent session, and the session's cluster/operation time goes back to
+the client as a signed `X-Causal-Token` header. The client sends it with its
+next reads; those run in a session advanced to that time, so the secondary
+waits until it has replicated the write before answering (afterClusterTime).
+Tokens are HMAC-signed so clients can't make secondaries wait for a
+made-up future time.
+
+On a standalone mongod (development) there is no cluster time: no token is
+issued and reads go to the only node anyway.
+
+Usage: python read_routing.py --check   # against a replica set in MONGO_URL
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import bson
+from bson.errors import BSONError
+from dotenv import load_dotenv
+from pymongo import MongoClient, monitoring
+from pymongo.client_session import ClientSession
+from pymongo.collection import Collection
+from pymongo.read_preferences import SecondaryPreferred
+
+CAUSAL_HEADER = "X-Causal-Token"
+
+# The server rejects maxStalenessSeconds below 90 (heartbeat + idle write period)
+MIN_MAX_STALENESS_SECONDS = 90
+
+
+class ReadRouter:
+    def __init__(self, client: MongoClient, secret: str, secondaries: bool = True,
+                 max_staleness_seconds: int = MIN_MAX_STALENESS_SECONDS):
+        self.client = client
+        self._secret = (secret or "").encode("utf-8")
+        self.secondaries = secondaries
+        self.read_preference = SecondaryPreferred(max_staleness=max(max_staleness_seconds, MIN_MAX_STALENESS_SECONDS))
+
+    def secondary(self, collection: Collection) -> Collection:
+        """`collection` reading from an in-range secondary (unchanged when routing is off)"""
+        if not self.secondaries:
+            return collection
+        return collection.with_options(read_preference=self.read_preference)
+
+    @contextmanager
+    def session(self, token: Optional[str] = None) -> Iterator[Optional[ClientSession]]:
+        """
+        Causally consistent session, advanced to `token` if it is valid.
+        Yields None when routing is off: reads go to the primary and need no session.
+        """
+        if not self.secondaries:
+            yield None
+            return
+        with self.client.start_session(causal_consistency=True) as session:
+            times = self._decode(token) if token else None
+            if times:
+                session.advance_cluster_time(times["clusterTime"])
+                session.advance_operation_time(times["operationTime"])
+            yield session
+
+    def token(self, session: Optional[ClientSession]) -> Optional[str]:
+        """Token for the writes made in `session`; None on a standalone or without a session"""
+        if session is None or session.cluster_time is None or session.operation_time is None:
+            return None
+        payload = base64.urlsafe_b64encode(bson.encode({
+            "clusterTime": session.cluster_time,
+            "operationTime": session.operation_time,
+        })).decode("ascii")
+        return f"{payload}.{self._sign(payload)}"
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self._secret, payload.encode("ascii"), hashlib.sha256).hexdigest()[:32]
+
+    def _decode(self, token: str) -> Optional[dict]:
+        payload, _, signature = token.partition(".")
+        try:
+            if not hmac.compare_digest(signature.encode("ascii"), self._sign(payload).encode("ascii")):
+                return None
+            times = bson.decode(base64.urlsafe_b64decode(payload.encode("ascii")))
+        except (ValueError, BSONError):
+            return None
+        if "clusterTime" not in times or "operationTime" not in times:
+            return None
+        return times
+
+
+class _ServedBy(monitoring.CommandListener):
+    """Records which server answered each find"""
+
+    def __init__(self):
+        self.servers = []
+
+    def started(self, event):
+        if event.command_name == "find":
+            self.servers.append(event.connection_id)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def check(mongo_url: str, rounds: int) -> bool:
+    """Write then immediately read back through a secondary, as two separate requests would"""
+    listener = _ServedBy()
+    client = MongoClient(mongo_url, event_listeners=[listener])
+    hello = client.admin.command("hello")
+    if "setName" not in hello:
+        print("❌ MONGO_URL is not a replica set")
+        return False
+    secondaries = {tuple(host.split(":")) for host in hello.get("hosts", [])} - {tuple(hello["primary"].split(":"))}
+    print(f"🗄️  Replica set {hello['setName']}: primary {hello['primary']}, {len(secondaries)} secondaries")
+
+    router = ReadRouter(client, secret=uuid.uuid4().hex)
+    collection = client.get_database()["read_routing_check"]
+    misses = 0
+    started = time.perf_counter()
+    try:
+        for number in range(rounds):
+            with router.session() as session:
+                collection.insert_one({"round": number}, session=session)
+                token = router.token(session)
+            with router.session(token) as session:
+                if router.secondary(collection).find_one({"round": number}, session=session) is None:
+                    misses += 1
+    finally:
+        collection.drop()
+    elapsed = (time.perf_counter() - started) * 1000
+
+    on_secondary = sum(1 for host, port in listener.servers if (host, str(port)) in secondaries)
+    print(f"   {rounds} write/read pairs in {elapsed:.0f} ms, {misses} reads missed their own write")
+    print(f"   {on_secondary}/{len(listener.servers)} reads served by a secondary")
+    ok = misses == 0 and (not secondaries or on_secondary == len(listener.servers))
+    print("✅ Read-your-writes holds on secondaries" if ok else "❌ Routing check failed")
+    return ok
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Check secondary reads and read-your-writes on a replica set")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    if not args.check:
+        parser.error("nothing to do (use --check)")
+    raise SystemExit(0 if check(args.mongo_url, args.rounds) else 1)
+
+
+if __name__ == "__main__":
+    main()
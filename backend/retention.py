@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Retention and cold archival for contacts and quotes.
+
+Each collection has a policy:
+
+  archive  documents older than `archive_after_days` are moved, in bounded
+           batches, into compressed monthly files
+           (`ARCHIVE_DIR/<collection>/<YYYY-MM>.ndjson.gz`, one gzip member per
+           batch) and deleted from the live collection. A small
+           `archive_index` collection maps each archived ID to its file and
+           member offset, so a single record can be read back without
+           decompressing the whole month.
+
+  expire   documents matching `expire_filter` get an `expire_at` date and
+           are deleted by this job once it has passed. Used where losing
+           the data is acceptable (spam). Not a TTL index: the TTL monitor
+           would delete behind the back of the listing counters.
+
+Every batch archived or deleted takes its documents off the listing
+counters (backoffice.py) with $inc, so a pass costs writes in proportion to
+what it removed. `--rebuild-counters` additionally recomputes every counter
+from the collections, which corrects drift from status changes made outside
+the API but aggregates over whole collections; run it when that is needed,
+not on every pass.
+
+Usage: python retention.py                      # one pass over every policy
+       python retention.py --dry-run            # report what would move
+       python retention.py --rebuild-counters   # pass, then recompute the listing counters
+"""
+import argparse
+import gzip
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import BulkWriteError
+
+import backoffice
+
+# Derived fields that are rebuilt on restore rather than archived
+DERIVED_FIELDS = ("search_terms", "search_prefixes")
+
+
+class RetentionPolicy:
+    def __init__(self, collection: str, archive_after_days: int, id_field: Optional[str] = None,
+                 archive_filter: Optional[dict] = None, expire_filter: Optional[dict] = None,
+                 expire_after_days: int = 30):
+        self.collection = collection
+        self.archive_after_days = archive_after_days
+        self.id_field = id_field
+        self.archive_filter = archive_filter or {}
+        self.expire_filter = expire_filter
+        self.expire_after_days = expire_after_days
+
+
+POLICIES: Dict[str, RetentionPolicy] = {
+    "contacts": RetentionPolicy(
+        "contacts",
+        archive_after_days=int(os.getenv("RETENTION_CONTACTS_DAYS", 365)),
+        archive_filter={"status": {"$ne": "spam"}},
+        expire_filter={"status": "spam"},
+        expire_after_days=int(os.getenv("RETENTION_SPAM_DAYS", 30)),
+    ),
+    "quotes": RetentionPolicy(
+        "quotes",
+        archive_after_days=int(os.getenv("RETENTION_QUOTES_DAYS", 730)),
+        id_field="quote_id",
+        # Open leads stay live however old they are
+        archive_filter={"status": {"$nin": ["pending", "contacted", "quoted"]}},
+    ),
+}
+
+
+def ensure_indexes(db) -> None:
+    for policy in POLICIES.values():
+        db[policy.collection].create_index([("expire_at", ASCENDING)], sparse=True)
+    db["archive_index"].create_index([("collection", ASCENDING), ("source_id", ASCENDING)], unique=True)
+    db["archive_index"].create_index([("collection", ASCENDING), ("business_id", ASCENDING)], sparse=True)
+
+
+def expiry_for(collection: str, document: dict) -> Optional[datetime]:
+    """`expire_at` for a new document if its policy lets it be deleted, else None"""
+    policy = POLICIES.get(collection)
+    if policy is None or not policy.expire_filter:
+        return None
+    if all(document.get(field) == value for field, value in policy.expire_filter.items()):
+        return datetime.utcnow() + timedelta(days=policy.expire_after_days)
+    return None
+
+
+def _append_member(path: str, docs: List[dict]) -> tuple:
+    """Append docs as one gzip member; return its (offset, length)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = "".join(json_util.dumps(doc, json_options=RELAXED_JSON_OPTIONS) + "\n" for doc in docs)
+    member = gzip.compress(lines.encode("utf-8"))
+    with open(path, "ab") as f:
+        offset = f.tell()
+        f.write(member)
+        f.flush()
+        os.fsync(f.fileno())
+    return offset, len(member)
+
+
+def archive_batch(db, policy: RetentionPolicy, archive_dir: str, cutoff: str, batch_size: int) -> int:
+    """Move one batch of expired documents to the archive; return how many moved"""
+    query = dict(policy.archive_filter, created_at={"$lt": cutoff})
+    projection = {field: 0 for field in DERIVED_FIELDS}
+    docs = list(db[policy.collection].find(query, projection).sort("created_at", ASCENDING).limit(batch_size))
+    if not docs:
+        return 0
+
+    by_month = defaultdict(list)
+    for doc in docs:
+        by_month[str(doc.get("created_at", ""))[:7] or "unknown"].append(doc)
+
+    index_entries = []
+    for month, month_docs in by_month.items():
+        path = os.path.join(archive_dir, policy.collection, f"{month}.ndjson.gz")
+        offset, length = _append_member(path, month_docs)
+        for doc in month_docs:
+            entry = {
+                "collection": policy.collection,
+                "source_id": str(doc["_id"]),
+                "month": month,
+                "file": os.path.relpath(path, archive_dir),
+                "offset": offset,
+                "length": length,
+                "archived_at": datetime.utcnow(),
+            }
+            if policy.id_field and doc.get(policy.id_field):
+                entry["business_id"] = doc[policy.id_field]
+            index_entries.append(entry)
+
+    # Index first, then delete: a crash in between leaves a duplicate, never a loss
+    try:
+        db["archive_index"].insert_many(index_entries, ordered=False)
+    except BulkWriteError as e:
+        if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+    db[policy.collection].delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+    backoffice.record_removal(db["listing_counters"], policy.collection, docs)
+    return len(docs)
+
+
+def expire_batch(db, policy: RetentionPolicy, batch_size: int) -> int:
+    """Stamp `expire_at` on a batch of deletable documents; delete_expired_batch removes them once it passes"""
+    if not policy.expire_filter:
+        return 0
+    query = dict(policy.expire_filter, expire_at={"$exists": False})
+    ids = [doc["_id"] for doc in db[policy.collection].find(query, {"_id": 1}).limit(batch_size)]
+    if not ids:
+        return 0
+    expire_at = datetime.utcnow() + timedelta(days=policy.expire_after_days)
+    db[policy.collection].update_many({"_id": {"$in": ids}}, {"$set": {"expire_at": expire_at}})
+    return len(ids)
+
+
+def delete_expired_batch(db, policy: RetentionPolicy, batch_size: int) -> int:
+    """Delete a batch of documents whose `expire_at` has passed and take them off the counters"""
+    if not policy.expire_filter:
+        return 0
+    query = {"expire_at": {"$lte": datetime.utcnow()}}
+    # Only the fields the counters are keyed on
+    projection = {field: 1 for field in backoffice.LISTINGS[policy.collection].equality_fields}
+    docs = list(db[policy.collection].find(query, projection).limit(batch_size))
+    if not docs:
+        return 0
+    db[policy.collection].delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+    backoffice.record_removal(db["listing_counters"], policy.collection, docs)
+    return len(docs)
+
+
+def run(db, archive_dir: str, batch_size: int = 500, max_batches: int = 100, dry_run: bool = False,
+        rebuild_counters: bool = False) -> dict:
+    """
+    One bounded retention pass. At most `max_batches` batches per policy, so a
+    large backlog is worked off over several runs without a long write burst.
+    """
+    report = {}
+    for policy in POLICIES.values():
+        cutoff = (datetime.utcnow() - timedelta(days=policy.archive_after_days)).isoformat()
+        if dry_run:
+            query = dict(policy.archive_filter, created_at={"$lt": cutoff})
+            report[policy.collection] = {
+                "would_archive": db[policy.collection].count_documents(query),
+                "would_delete": db[policy.collection].count_documents({"expire_at": {"$lte": datetime.utcnow()}}),
+            }
+            continue
+        archived = expired = deleted = 0
+        for _ in range(max_batches):
+            moved = archive_batch(db, policy, archive_dir, cutoff, batch_size)
+            archived += moved
+            if moved < batch_size:
+                break
+        for _ in range(max_batches):
+            stamped = expire_batch(db, policy, batch_size)
+            expired += stamped
+            if stamped < batch_size:
+                break
+        for _ in range(max_batches):
+            removed = delete_expired_batch(db, policy, batch_size)
+            deleted += removed
+            if removed < batch_size:
+                break
+        report[policy.collection] = {"archived": archived, "expiring": expired, "deleted": deleted}
+
+    if rebuild_counters and not dry_run:
+        report["listing_counters"] = {
+            "rebuilt": sum(
+                backoffice.rebuild_counters(db, db["listing_counters"], collection)
+                for collection in backoffice.LISTINGS
+            )
+        }
+    return report
+
+
+def fetch_archived(db, archive_dir: str, collection: str, record_id: str) -> Optional[dict]:
+    """Read one archived record back by `_id` or business ID (e.g. a quote_id)"""
+    entry = db["archive_index"].find_one({"collection": collection, "source_id": record_id})
+    if entry is None:
+        entry = db["archive_index"].find_one({"collection": collection, "business_id": record_id})
+    if entry is None:
+        return None
+
+    with open(os.path.join(archive_dir, entry["file"]), "rb") as f:
+        f.seek(entry["offset"])
+        member = f.read(entry["length"])
+    for line in gzip.decompress(member).decode("utf-8").splitlines():
+        doc = json_util.loads(line)
+        if str(doc["_id"]) == entry["source_id"]:
+            doc["_id"] = str(doc["_id"])
+            doc["archived_at"] = entry["archived_at"].isoformat()
+            return doc
+    return None
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Archive and expire old contacts and quotes")
+    parser.add_argument("--archive-dir", default=os.getenv("ARCHIVE_DIR", "/var/lib/sparksonic/archive"))
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-batches", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--rebuild-counters", action="store_true",
+                        help="recompute the listing counters afterwards (full-collection aggregations)")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_url).get_database()
+    ensure_indexes(db)
+    report = run(db, args.archive_dir, args.batch_size, args.max_batches, args.dry_run, args.rebuild_counters)
+    for collection, counts in report.items():
+        print(f"✅ {collection}: " + ", ".join(f"{key} {value}" for key, value in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Appointment scheduling for site visits.
+
+Each technician's day is a bitset of 30-minute slots (48 bits, bit n =
+n * 30 minutes after midnight), stored as one document per technician and
+day in `technician_days`:
+
+  {_id: "<technician>|<YYYY-MM-DD>", technician_id, day, busy: <Int64 mask>,
+   bookings: [{appointment_id, quote_id, service, start, slots, created_at}]}
+
+Free time is the technician's working hours with the busy bits cleared, and
+the start positions with `n` consecutive free slots come out of n shifts
+and ANDs, so availability over months is a few hundred small integers, not
+a scan of bookings.
+
+A booking is claimed with one conditional update: it only applies while
+the requested bits are still clear ($bitsAllClear) and sets them ($bit) and
+records the booking in the same write. Two submissions racing for the same
+slot can't both match; the loser tries the next technician or gets
+SlotTaken. Days without a document are claimed by upsert, where the
+unique _id turns a lost race into a DuplicateKeyError.
+
+Times are Luxembourg local time.
+
+Usage: python scheduling.py --bench [--technicians 12] [--days 120]
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from bson.int64 import Int64
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import DuplicateKeyError
+
+from geocoding import distance_km
+
+TIMEZONE = ZoneInfo("Europe/Luxembourg")
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# Site visit length per catalog service, minutes
+DURATIONS = {
+    "solar-panels": 120,
+    "heat-pumps": 120,
+    "ev-chargers": 60,
+    "renovation": 90,
+}
+DEFAULT_DURATION = 60
+
+# Monday..Friday 08:00-17:00 unless the technician document says otherwise
+DEFAULT_HOURS = {str(weekday): ["08:00", "17:00"] for weekday in range(5)}
+
+
+class SchedulingError(ValueError):
+    """Invalid date, time or service"""
+
+
+class SlotTaken(SchedulingError):
+    """Nobody is free for the requested slot any more"""
+
+
+def slot_index(value: str) -> int:
+    """'09:30' -> 19; only times on the slot grid are accepted"""
+    try:
+        hours, minutes = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise SchedulingError(f"Invalid time {value}")
+    if not (0 <= hours < 24 and minutes in range(0, 60, SLOT_MINUTES)):
+        raise SchedulingError(f"Times must be on the {SLOT_MINUTES}-minute grid")
+    return (hours * 60 + minutes) // SLOT_MINUTES
+
+
+def slot_time(index: int) -> str:
+    minutes = index * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def mask(start: int, length: int) -> int:
+    return ((1 << length) - 1) << start
+
+
+def duration_slots(service_id: Optional[str]) -> int:
+    return -(-DURATIONS.get(service_id, DEFAULT_DURATION) // SLOT_MINUTES)
+
+
+def working_mask(technician: dict, day: date) -> int:
+    hours = (technician.get("working_hours") or DEFAULT_HOURS).get(str(day.weekday()))
+    if not hours:
+        return 0
+    return mask(slot_index(hours[0]), slot_index(hours[1]) - slot_index(hours[0]))
+
+
+def validate_hours(hours: Dict[str, list]) -> Dict[str, list]:
+    """{"0": ["08:00", "17:00"], ...} keyed by weekday (0 = Monday); days left out are off"""
+    for weekday, span in hours.items():
+        if weekday not in {str(n) for n in range(7)}:
+            raise SchedulingError(f"Unknown weekday {weekday} (0 = Monday .. 6 = Sunday)")
+        if len(span) != 2 or slot_index(span[0]) >= slot_index(span[1]):
+            raise SchedulingError(f"Working hours for weekday {weekday} must be [start, end] with start before end")
+    return hours
+
+
+def free_starts(free: int, length: int) -> int:
+    """Bitset of the positions where `length` consecutive bits of `free` are set"""
+    starts = free
+    for shift in range(1, length):
+        starts &= free >> shift
+    return starts
+
+
+def local_today() -> date:
+    return datetime.now(TIMEZONE).date()
+
+
+class Scheduler:
+    def __init__(self, technicians_collection, days_collection, horizon_days: int = 90, lead_days: int = 1):
+        self.technicians = technicians_collection
+        self.days = days_collection
+        self.horizon_days = horizon_days
+        self.lead_days = lead_days
+
+    def ensure_indexes(self) -> None:
+        self.days.create_index([("day", ASCENDING), ("technician_id", ASCENDING)], name="day_technician")
+        self.days.create_index("bookings.appointment_id", name="appointment_id", sparse=True)
+        self.technicians.create_index("services", name="services")
+
+    def bookable_range(self, today: Optional[date] = None):
+        first = (today or local_today()) + timedelta(days=self.lead_days)
+        return first, first + timedelta(days=self.horizon_days - 1)
+
+    def technicians_for(self, service_id: Optional[str]) -> List[dict]:
+        # Technicians without a services list do every kind of visit
+        query = {"active": {"$ne": False}}
+        if service_id:
+            query["$or"] = [{"services": service_id}, {"services": {"$exists": False}}, {"services": []}]
+        return list(self.technicians.find(query, {"name": 1, "services": 1, "working_hours": 1, "base_location": 1}).sort("_id", ASCENDING))
+
+    def _busy(self, technician_ids: List[str], first: date, last: date) -> Dict[tuple, int]:
+        cursor = self.days.find(
+            {"day": {"$gte": first.isoformat(), "$lte": last.isoformat()}, "technician_id": {"$in": technician_ids}},
+            {"technician_id": 1, "day": 1, "busy": 1},
+        )
+        return {(doc["technician_id"], doc["day"]): int(doc.get("busy", 0)) for doc in cursor}
+
+    def availability(self, service_id: Optional[str], near: Optional[date] = None, limit: int = 5,
+                     today: Optional[date] = None) -> List[dict]:
+        """
+        The `limit` free slots closest to `near` (default: first bookable day),
+        nearest day first, earliest time first within a day.
+        """
+        first, last = self.bookable_range(today)
+        near = min(max(near or first, first), last)
+        technicians = self.technicians_for(service_id)
+        if not technicians:
+            return []
+        length = duration_slots(service_id)
+        busy = self._busy([t["_id"] for t in technicians], first, last)
+
+        # Days by distance from `near`, later day first on ties
+        days = sorted(
+            (first + timedelta(days=offset) for offset in range((last - first).days + 1)),
+            key=lambda day: (abs((day - near).days), day < near),
+        )
+        slots = []
+        for day in days:
+            free_by_start: Dict[int, int] = {}
+            for technician in technicians:
+                free = working_mask(technician, day) & ~busy.get((technician["_id"], day.isoformat()), 0)
+                starts = free_starts(free, length)
+                while starts:
+                    start = (starts & -starts).bit_length() - 1
+                    free_by_start[start] = free_by_start.get(start, 0) + 1
+                    starts &= starts - 1
+            for start in sorted(free_by_start):
+                slots.append({
+                    "date": day.isoformat(),
+                    "start": slot_time(start),
+                    "end": slot_time(start + length),
+                    "technicians_free": free_by_start[start],
+                })
+                if len(slots) >= limit:
+                    return slots
+        return slots
+
+    def _claim(self, technician_id: str, day: date, slot_mask: int, booking: dict) -> bool:
+        # A DuplicateKeyError means the day exists and didn't match: one of the bits is taken, or another
+        # booking created the day first. The second attempt sees the stored bits and settles which.
+        for _ in range(2):
+            try:
+                self.days.find_one_and_update(
+                    {"_id": f"{technician_id}|{day.isoformat()}", "busy": {"$bitsAllClear": Int64(slot_mask)}},
+                    {
+                        "$bit": {"busy": {"or": Int64(slot_mask)}},
+                        "$push": {"bookings": booking},
+                        "$setOnInsert": {"technician_id": technician_id, "day": day.isoformat()},
+                    },
+                    upsert=True,
+                    projection={"_id": 1},
+                )
+                return True
+            except DuplicateKeyError:
+                continue
+        return False
+
+    def book(self, service_id: Optional[str], day: date, start: str, quote_id: str,
+             near: Optional[dict] = None, today: Optional[date] = None) -> dict:
+        """
+        Claim the slot for a free technician, the one based nearest `near` (a GeoJSON
+        point) first, then the least busy; raises SlotTaken if nobody is free
+        """
+        first, last = self.bookable_range(today)
+        if not first <= day <= last:
+            raise SchedulingError(f"Appointments can be booked from {first.isoformat()} to {last.isoformat()}")
+        start_index = slot_index(start)
+        length = duration_slots(service_id)
+        if start_index + length > SLOTS_PER_DAY:
+            raise SchedulingError("Appointment would end after midnight")
+        slot_mask = mask(start_index, length)
+
+        technicians = [t for t in self.technicians_for(service_id) if working_mask(t, day) & slot_mask == slot_mask]
+        busy = self._busy([t["_id"] for t in technicians], day, day)
+        candidates = sorted(
+            (t for t in technicians if not busy.get((t["_id"], day.isoformat()), 0) & slot_mask),
+            key=lambda t: (
+                distance_km(near, t["base_location"]) if near and t.get("base_location") else float("inf"),
+                bin(busy.get((t["_id"], day.isoformat()), 0)).count("1"),
+            ),
+        )
+        booking = {
+            "appointment_id": f"APT-{str(uuid.uuid4())[:8].upper()}",
+            "quote_id": quote_id,
+            "service": service_id,
+            "start": start_index,
+            "slots": length,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        for technician in candidates:
+            if self._claim(technician["_id"], day, slot_mask, booking):
+                return {
+                    "appointment_id": booking["appointment_id"],
+                    "technician_id": technician["_id"],
+                    "technician_name": technician.get("name"),
+                    "date": day.isoformat(),
+                    "start": slot_time(start_index),
+                    "end": slot_time(start_index + length),
+                }
+        raise SlotTaken("This slot is no longer available")
+
+    def cancel(self, appointment_id: str) -> bool:
+        """Release a booking's slots; False if it doesn't exist (or was already cancelled)"""
+        doc = self.days.find_one({"bookings.appointment_id": appointment_id},
+                                 {"bookings": {"$elemMatch": {"appointment_id": appointment_id}}})
+        if not doc:
+            return False
+        booking = doc["bookings"][0]
+        result = self.days.update_one(
+            {"_id": doc["_id"], "bookings.appointment_id": appointment_id},
+            {
+                "$bit": {"busy": {"and": Int64(~mask(booking["start"], booking["slots"]))}},
+                "$pull": {"bookings": {"appointment_id": appointment_id}},
+            },
+        )
+        return result.modified_count == 1
+
+    def bookings(self, first: date, last: date) -> List[dict]:
+        """Every booking between two days, by day, time and technician"""
+        appointments = []
+        cursor = self.days.find(
+            {"day": {"$gte": first.isoformat(), "$lte": last.isoformat()}, "bookings.0": {"$exists": True}},
+            {"technician_id": 1, "day": 1, "bookings": 1},
+        ).sort([("day", ASCENDING), ("technician_id", ASCENDING)])
+        for doc in cursor:
+            for booking in sorted(doc["bookings"], key=lambda b: b["start"]):
+                appointments.append({
+                    "appointment_id": booking["appointment_id"],
+                    "quote_id": booking.get("quote_id"),
+                    "service": booking.get("service"),
+                    "technician_id": doc["technician_id"],
+                    "date": doc["day"],
+                    "start": slot_time(booking["start"]),
+                    "end": slot_time(booking["start"] + booking["slots"]),
+                })
+        return appointments
+
+
+def bench(db, technicians: int, days: int, queries: int) -> None:
+    """Fill scratch collections with months of random bookings and time availability lookups"""
+    scheduler = Scheduler(db["scheduling_bench_technicians"], db["scheduling_bench_days"], horizon_days=days)
+    scheduler.technicians.drop()
+    scheduler.days.drop()
+    try:
+        scheduler.ensure_indexes()
+        services = list(DURATIONS)
+        scheduler.technicians.insert_many([
+            {"_id": f"tech-{n:02d}", "name": f"Technician {n}", "services": random.sample(services, 2)}
+            for n in range(technicians)
+        ])
+        first, last = scheduler.bookable_range()
+        docs = []
+        for n in range(technicians):
+            for offset in range(days):
+                day = first + timedelta(days=offset)
+                # ~70% of working time booked
+                busy = sum(1 << slot for slot in range(16, 34) if random.random() < 0.7)
+                docs.append({"_id": f"tech-{n:02d}|{day.isoformat()}", "technician_id": f"tech-{n:02d}",
+                             "day": day.isoformat(), "busy": Int64(busy), "bookings": []})
+        scheduler.days.insert_many(docs)
+        print(f"📅 {technicians} technicians x {days} days ({len(docs)} day documents)")
+
+        timings = []
+        for _ in range(queries):
+            near = first + timedelta(days=random.randrange(days))
+            started = time.perf_counter()
+            scheduler.availability(random.choice(services), near, limit=5)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(f"   availability: p50 {timings[len(timings) // 2]:.1f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95)]:.1f} ms over {queries} queries")
+    finally:
+        scheduler.technicians.drop()
+        scheduler.days.drop()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Benchmark slot availability over synthetic bookings")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--technicians", type=int, default=12)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    args = parser.parse_args()
+    if not args.bench:
+        parser.error("nothing to do (use --bench)")
+    bench(MongoClient(args.mongo_url).get_database(), args.technicians, args.days, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Full-text search across quotes, tickets and contacts.
+
+Customers write in French, German and English, often mixed, and queries don't
+say which language they are in, so stemming happens here rather than in
+MongoDB: on insert every document gets two derived fields,
+
+    search_terms     accent-folded, stop-word-free, stemmed tokens
+    search_prefixes  leading 3+ character prefixes of the folded tokens
+
+which are covered by one text index per collection (language "none", terms
+weighted above prefixes). Mongo maintains the index incrementally and ranks
+matches by textScore; a partial last word like "char" still hits "charger"
+through the prefixes field.
+
+Usage: python search.py --backfill   # add search fields to existing documents
+"""
+import argparse
+import os
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+MIN_PREFIX = 3
+MAX_PREFIX = 10
+
+# Fields indexed per collection
+SEARCH_FIELDS: Dict[str, List[str]] = {
+    "quotes": ["description", "location", "service", "email", "quote_id"],
+    "tickets": ["subject", "description", "customer_email", "ticket_id"],
+    "contacts": ["name", "message", "service", "email"],
+}
+
+STOP_WORDS = {
+    # en
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "has", "have", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "our", "please", "the", "this", "to", "we", "with", "you", "your",
+    # fr
+    "au", "aux", "avec", "ce", "dans", "de", "des", "du", "en", "est", "et", "je", "la", "le", "les", "mon",
+    "nous", "notre", "par", "pas", "pour", "qui", "sur", "un", "une", "vous",
+    # de
+    "auf", "bitte", "das", "dem", "den", "der", "die", "ein", "eine", "einen", "fur", "ich",
+    "ist", "mit", "nicht", "unser", "unsere", "und", "von", "wir", "zu",
+}
+
+# Inflectional suffixes of FR/DE/EN, longest first; stripped once, keeping a stem of 3+ letters
+SUFFIXES = sorted([
+    "ements", "ement", "ations", "ation", "ungen", "ung", "ingen", "ing", "ieren", "iert", "ness",
+    "ments", "ment", "euses", "euse", "eurs", "eur", "ers", "er", "ies", "es", "en", "ed", "ly",
+    "e", "s", "n",
+], key=len, reverse=True)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Keeps the derived fields out of API responses
+SEARCH_PROJECTION = {"search_terms": 0, "search_prefixes": 0}
+
+
+def fold(text: str) -> str:
+    text = text.lower().replace("ß", "ss")
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(fold(text)) if token not in STOP_WORDS]
+
+
+def stem(token: str) -> str:
+    if token.isdigit():
+        return token
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def search_fields(collection: str, document: dict) -> dict:
+    """Derived fields to store alongside a document so it can be searched"""
+    text = " ".join(str(document.get(field) or "") for field in SEARCH_FIELDS[collection])
+    tokens = tokenize(text)
+    terms = sorted({stem(token) for token in tokens})
+    prefixes = sorted({
+        token[:length]
+        for token in tokens
+        for length in range(MIN_PREFIX, min(len(token), MAX_PREFIX) + 1)
+    })
+    return {"search_terms": " ".join(terms), "search_prefixes": " ".join(prefixes)}
+
+
+def ensure_indexes(db) -> None:
+    for collection in SEARCH_FIELDS:
+        db[collection].create_index(
+            [("search_terms", "text"), ("search_prefixes", "text")],
+            name="search_text",
+            weights={"search_terms": 3, "search_prefixes": 1},
+            default_language="none",
+            language_override="search_language",
+        )
+
+
+def build_query(query: str) -> Optional[str]:
+    """
+    Turn user input into a $text search string: stems of every word plus
+    the folded word itself, which matches indexed prefixes.
+    """
+    words = []
+    for token in tokenize(query):
+        words.append(stem(token))
+        if len(token) >= MIN_PREFIX:
+            words.append(token[:MAX_PREFIX])
+    return " ".join(dict.fromkeys(words)) or None
+
+
+def search(db, query: str, collections: Optional[List[str]] = None, limit: int = 20) -> List[dict]:
+    """Search several collections and merge the hits by relevance"""
+    text_query = build_query(query)
+    if text_query is None:
+        return []
+
+    hits = []
+    for collection in collections or list(SEARCH_FIELDS):
+        projection = dict(SEARCH_PROJECTION, score={"$meta": "textScore"})
+        cursor = (
+            db[collection].find({"$text": {"$search": text_query}}, projection)
+            .sort([("score", {"$meta": "textScore"})])
+            .limit(limit)
+        )
+        for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            hits.append({"collection": collection, "score": doc.pop("score"), "document": doc})
+
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    return hits[:limit]
+
+
+def backfill(db, collection: str, batch_size: int = 1000) -> int:
+    """Add search fields to documents that don't have them yet"""
+    fields = SEARCH_FIELDS[collection]
+    projection = {field: 1 for field in fields}
+    updated = 0
+    operations = []
+    for doc in db[collection].find({"search_terms": {"$exists": False}}, projection, batch_size=batch_size):
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": search_fields(collection, doc)}))
+        if len(operations) >= batch_size:
+            db[collection].bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    if operations:
+        db[collection].bulk_write(operations, ordered=False)
+        updated += len(operations)
+    return updated
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Maintain the search fields and index")
+    parser.add_argument("--backfill", action="store_true", help="add search fields to existing documents")
+    parser.add_argument("--query", help="run a search and print the hits")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_url).get_database()
+    ensure_indexes(db)
+    if args.backfill:
+        for collection in SEARCH_FIELDS:
+            print(f"✅ {collection}: {backfill(db, collection)} documents updated")
+    if args.query:
+        for hit in search(db, args.query):
+            print(f"{hit['score']:.2f}  {hit['collection']:<9} {hit['document'].get('description') or hit['document'].get('message')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 import random
 import os
 from dotenv import load_dotenv
+from data_pools import review_texts, first_names, last_names
 
 load_dotenv()
 
@@ -17,39 +18,6 @@ client = MongoClient(MONGO_URL)
 db = client.get_database()
 reviews_cache = db["reviews_cache"]
 
-# Sample review texts
-review_texts = [
-    "Excellent service! Very professional team. Highly recommend for solar panel installation.",
-    "Great experience with the EV charger installation. Quick and efficient work.",
-    "Professional electricians, fair pricing, and excellent customer service.",
-    "Solar panels installed perfectly. The team was knowledgeable and respectful.",
-    "Best electrical service in Luxembourg! Very satisfied with the heat pump installation.",
-    "Quick response time and quality work. Will definitely use again.",
-    "Fantastic job on our home automation system. Everything works perfectly.",
-    "Very impressed with the professionalism and attention to detail.",
-    "Fair prices and excellent workmanship. Highly recommended!",
-    "The team was punctual, professional, and did an amazing job.",
-    "Outstanding service from start to finish. Very happy with the solar installation.",
-    "Great communication throughout the project. Exceeded expectations.",
-    "Professional team that knows what they're doing. Five stars!",
-    "Excellent electrical work. Clean, efficient, and professional.",
-    "Highly recommend for any electrical needs. Top-notch service!",
-    "Very satisfied with the EV charger installation. Works perfectly.",
-    "Professional, courteous, and skilled technicians. Great job!",
-    "Best experience we've had with any contractor. Highly professional.",
-    "Quality work at reasonable prices. Will use again for sure.",
-    "Impressed with the level of expertise and professionalism.",
-]
-
-# Sample names
-first_names = ["Jean", "Marie", "Michel", "Sophie", "Laurent", "Anne", "Pierre", "Nathalie", "François", "Catherine",
-               "Thomas", "Julie", "Nicolas", "Isabelle", "Alexandre", "Patricia", "Olivier", "Christine", "Philippe", "Sylvie",
-               "David", "Martine", "Luc", "Monique", "André", "Françoise", "Marc", "Brigitte", "Paul", "Valérie"]
-
-last_names = ["Muller", "Schmidt", "Weber", "Meyer", "Wagner", "Becker", "Schulz", "Hoffmann", "Schmitt", "Koch",
-              "Bauer", "Richter", "Klein", "Wolf", "Schroeder", "Neumann", "Schwarz", "Zimmermann", "Braun", "Krüger",
-              "Hartmann", "Lange", "Werner", "Schmitz", "Krause", "Meier", "Lehmann", "Huber", "Mayer", "Herrmann"]
-
 # Profile photo URLs (using a placeholder service)
 def get_profile_photo():
     gender = random.choice(['men', 'women'])
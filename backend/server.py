@@ -1,41 +1,75 @@
-from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Form, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Form, BackgroundTasks, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure, PyMongoError
+from bson import ObjectId
+from bson.errors import InvalidId
 import os
+import hashlib
+import json
+import time
 import smtplib
 import ssl
 import socket
 import requests
 import uuid
+import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
+from idempotency import IdempotencyMiddleware, ensure_indexes as ensure_idempotency_indexes
+from profiling import ProfilingMiddleware, ProfileStore
+from memory_diagnostics import (
+    MemoryBudgetMiddleware, MemoryDiagnostics, MemoryDiagnosticsError, SnapshotNotFound, TracingOff,
+)
+from structured_logging import RequestIdMiddleware, dropped_records, setup_logging
+from circuit_breaker import CircuitBreaker
+from health import HealthMonitor
+import backoffice
+import search
+import export
+import retention
+from spam_filter import NearDuplicateIndex, SpamFilter
+from notifications import NotificationDigest, ensure_indexes as ensure_notification_indexes
+from catalog import CATALOG_PATH, ServiceCatalog
+import images
+import project_import
+import estimator
+import scheduling
+import geocoding
+import staff
+from read_routing import CAUSAL_HEADER, ReadRouter
+from deadlines import DeadlineExceeded, DeadlineMiddleware, detached, expired as deadline_expired, timeout as deadline_timeout
+from password_hashing import build_context as build_password_context
 
 # Load environment variables
 load_dotenv()
 
+# Logging Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1.0))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+log_listener = setup_logging(LOG_LEVEL, LOG_DEBUG_SAMPLE_RATE, LOG_QUEUE_SIZE)
+logger = logging.getLogger("sparksonic")
+
 # Initialize FastAPI
 app = FastAPI(title="Sparksonic API", version="1.0.0")
 
-# CORS Configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000", os.getenv("FRONTEND_URL", "http://localhost:3000"), "https://sparksonic.lu"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 # MongoDB Connection
 MONGO_URL = os.getenv("MONGO_URL")
 client = MongoClient(MONGO_URL)
 db = client.get_database()
+# Read routing (opt-in): listings go to secondaries within the staleness bound; writes return a causal token
+MONGO_READ_SECONDARIES = os.getenv("MONGO_READ_SECONDARIES", "false").lower() == "true"
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", 90))
 
 # Collections
 users_collection = db["users"]
@@ -43,17 +77,164 @@ quotes_collection = db["quotes"]
 tickets_collection = db["tickets"]
 contacts_collection = db["contacts"]
 projects_collection = db["projects"]
+cache_versions_collection = db["cache_versions"]
 reviews_cache_collection = db["reviews_cache"]
+idempotency_collection = db["idempotency_keys"]
+listing_counters_collection = db["listing_counters"]
+notification_queue_collection = db["notification_queue"]
+notification_schedule_collection = db["notification_schedule"]
+technicians_collection = db["technicians"]
+technician_days_collection = db["technician_days"]
+
+# Archive Configuration (see retention.py)
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "/var/lib/sparksonic/archive")
+
+# Spam Filter Configuration
+spam_filter = SpamFilter(
+    NearDuplicateIndex(
+        window_seconds=float(os.getenv("SPAM_WINDOW_SECONDS", 3600)),
+        threshold=float(os.getenv("SPAM_DUPLICATE_THRESHOLD", 0.8)),
+        flood_size=int(os.getenv("SPAM_FLOOD_SIZE", 5)),
+    ),
+    max_links=int(os.getenv("SPAM_MAX_LINKS", 2)),
+)
+
+# Service Catalog (validated and rendered per locale at import; a broken catalog stops startup)
+service_catalog = ServiceCatalog(os.getenv("SERVICE_CATALOG_PATH", CATALOG_PATH))
+SERVICES_CACHE_SECONDS = int(os.getenv("SERVICES_CACHE_SECONDS", 300))
+
+# Projects listing, cached per worker until an import bumps the version (or the TTL catches hand edits)
+PROJECTS_CACHE_SECONDS = int(os.getenv("PROJECTS_CACHE_SECONDS", 60))
+PROJECTS_LIMIT = int(os.getenv("PROJECTS_LIMIT", 12))
+projects_cache = {"version": None, "built_at": 0.0, "body": b"", "etag": ""}
+
+# Offline Geocoding (places table indexed at import; a malformed table stops startup)
+GEOCODER_PLACES_PATH = os.getenv("GEOCODER_PLACES_PATH") or geocoding.PLACES_PATH
+GEOCODER_POSTAL_CODES_PATH = os.getenv("GEOCODER_POSTAL_CODES_PATH") or geocoding.POSTAL_CODES_PATH
+GEOCODER_MIN_SCORE = float(os.getenv("GEOCODER_MIN_SCORE", geocoding.MIN_FUZZY_SCORE))
+geocoder = geocoding.Geocoder(GEOCODER_PLACES_PATH, GEOCODER_MIN_SCORE, GEOCODER_POSTAL_CODES_PATH)
+
+# Appointment Scheduling (site visits bookable from today + lead days, for the next horizon days)
+SCHEDULING_HORIZON_DAYS = int(os.getenv("SCHEDULING_HORIZON_DAYS", 90))
+SCHEDULING_LEAD_DAYS = int(os.getenv("SCHEDULING_LEAD_DAYS", 1))
+scheduler = scheduling.Scheduler(
+    technicians_collection, technician_days_collection,
+    horizon_days=SCHEDULING_HORIZON_DAYS, lead_days=SCHEDULING_LEAD_DAYS,
+)
+# Booking a visit needs an account; each account holds at most this many upcoming visits
+MAX_OPEN_APPOINTMENTS = int(os.getenv("MAX_OPEN_APPOINTMENTS", 2))
+
+# Image Derivatives Configuration
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "/var/cache/sparksonic/images")
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", 1024))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+image_pipeline = images.ImagePipeline(
+    images.DiskCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_MB * 1024 * 1024),
+    workers=IMAGE_WORKERS,
+)
+
+# Idempotency Configuration
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+
+# Replay stored responses for retried submissions (added before CORS so replays get CORS headers)
+app.add_middleware(
+    IdempotencyMiddleware,
+    collection=idempotency_collection,
+    paths=["/api/quotes", "/api/contact", "/api/tickets"],
+)
+
+# Request Deadlines (frontend gives up after 10 s; None = no deadline, for streams and probes)
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", 8))
+REQUEST_MAX_CONCURRENCY = int(os.getenv("REQUEST_MAX_CONCURRENCY", 0))
+REQUEST_MAX_QUEUE_WAIT = float(os.getenv("REQUEST_MAX_QUEUE_WAIT", 1))
+
+app.add_middleware(
+    DeadlineMiddleware,
+    default_budget=REQUEST_BUDGET_SECONDS,
+    budgets={
+        "/api/health": None,
+        "/api/admin/export": None,
+        "/api/reviews": 5,
+        "/api/images": 20,
+        "/api/admin/import": None,
+    },
+    max_concurrency=REQUEST_MAX_CONCURRENCY,
+    max_queue_wait=REQUEST_MAX_QUEUE_WAIT,
+)
+
+# CORS Configuration
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000", os.getenv("FRONTEND_URL", "http://localhost:3000"), "https://sparksonic.lu"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=[CAUSAL_HEADER],
+)
+
+# Request ID for log correlation
+app.add_middleware(RequestIdMiddleware)
+
+# Profiling Configuration (off unless a secret or sample rate is set)
+PROFILING_SECRET = os.getenv("PROFILING_SECRET")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "/tmp/sparksonic-profiles")
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", 50))
+profile_store = ProfileStore(PROFILING_DIR, PROFILING_MAX_PROFILES)
+
+if PROFILING_SECRET or PROFILING_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        secret=PROFILING_SECRET,
+        sample_rate=PROFILING_SAMPLE_RATE,
+    )
+
+# Memory Diagnostics (tracemalloc; off unless MEMORY_DIAGNOSTICS=true, it slows every allocation)
+MEMORY_DIAGNOSTICS = os.getenv("MEMORY_DIAGNOSTICS", "false").lower() == "true"
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", 5))
+MEMORY_MAX_SNAPSHOTS = int(os.getenv("MEMORY_MAX_SNAPSHOTS", 5))
+MEMORY_REQUEST_BUDGET_MB = float(os.getenv("MEMORY_REQUEST_BUDGET_MB", 0))
+memory_diagnostics = MemoryDiagnostics(
+    enabled=MEMORY_DIAGNOSTICS,
+    frames=MEMORY_TRACE_FRAMES,
+    max_snapshots=MEMORY_MAX_SNAPSHOTS,
+    request_budget_bytes=int(MEMORY_REQUEST_BUDGET_MB * 1024 * 1024),
+)
+memory_diagnostics.start()
+
+if MEMORY_DIAGNOSTICS:
+    app.add_middleware(MemoryBudgetMiddleware, diagnostics=memory_diagnostics)
+
+# Password Hashing (cost calibrated at startup to PASSWORD_HASH_TARGET_MS unless PASSWORD_HASH_COST is set)
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", 250))
+PASSWORD_HASH_COST = int(os.getenv("PASSWORD_HASH_COST")) if os.getenv("PASSWORD_HASH_COST") else None
+# Same on every host, so hosts that calibrate differently don't rehash each other's hashes
+PASSWORD_HASH_MIN_COST = int(os.getenv("PASSWORD_HASH_MIN_COST")) if os.getenv("PASSWORD_HASH_MIN_COST") else None
+ARGON2_MEMORY_KIB = int(os.getenv("ARGON2_MEMORY_KIB", 19456))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 1))
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_password_context(
+    PASSWORD_HASH_SCHEME,
+    target_ms=PASSWORD_HASH_TARGET_MS,
+    cost=PASSWORD_HASH_COST,
+    memory_kib=ARGON2_MEMORY_KIB,
+    parallelism=ARGON2_PARALLELISM,
+    min_cost=PASSWORD_HASH_MIN_COST,
+)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # JWT Configuration
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 10080))
 
+# Causal tokens are signed with the JWT secret
+read_router = ReadRouter(client, JWT_SECRET_KEY, MONGO_READ_SECONDARIES, MONGO_MAX_STALENESS_SECONDS)
+
 # SMTP Configuration
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
@@ -62,10 +243,28 @@ SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 SMTP_FROM_EMAIL = os.getenv("SMTP_FROM_EMAIL")
 SMTP_TO_EMAIL = os.getenv("SMTP_TO_EMAIL")
 SMTP_ENABLED = os.getenv("SMTP_ENABLED", "false").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 5))
+
+# Staff notification digests (0 sends one email per submission)
+NOTIFICATION_DIGEST_SECONDS = float(os.getenv("NOTIFICATION_DIGEST_SECONDS", 0))
+NOTIFICATION_IMMEDIATE_PRIORITIES = {
+    priority.strip().lower() for priority in os.getenv("NOTIFICATION_IMMEDIATE_PRIORITIES", "high").split(",") if priority.strip()
+}
 
 # Google API Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_PLACE_ID = os.getenv("GOOGLE_PLACE_ID")
+GOOGLE_PLACES_URL = os.getenv("GOOGLE_PLACES_URL", "https://maps.googleapis.com/maps/api/place/details/json")
+GOOGLE_TIMEOUT = float(os.getenv("GOOGLE_TIMEOUT", 10))
+google_circuit = CircuitBreaker(
+    "google_places",
+    failure_threshold=int(os.getenv("GOOGLE_CIRCUIT_FAILURE_THRESHOLD", 5)),
+    reset_timeout=float(os.getenv("GOOGLE_CIRCUIT_RESET_SECONDS", 60)),
+)
+
+# Health Probe Configuration
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 10))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", 3))
 
 # ===========================
 # Pydantic Models
@@ -81,25 +280,54 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+# Free-text limits for public forms; also bounds the work of the spam check
+MAX_MESSAGE_LENGTH = 5000
+
 class ContactForm(BaseModel):
-    name: str
+    name: str = Field(..., max_length=200)
     email: EmailStr
     phone: Optional[str] = None
-    message: str
+    message: str = Field(..., max_length=MAX_MESSAGE_LENGTH)
     service: Optional[str] = None
 
+class EstimateInputs(BaseModel):
+    roof_area_m2: Optional[float] = Field(None, gt=0, le=5000)
+    annual_consumption_kwh: Optional[float] = Field(None, gt=0, le=1000000)
+    floor_area_m2: Optional[float] = Field(None, gt=0, le=10000)
+    current_heating: Optional[str] = None
+    insulation: Optional[str] = None
+    annual_km: Optional[float] = Field(None, gt=0, le=200000)
+
+class QuoteEstimateRequest(EstimateInputs):
+    service: str
+
+class AppointmentChoice(BaseModel):
+    date: str = Field(..., description="YYYY-MM-DD, from /api/appointments/availability")
+    start: str = Field(..., description="HH:MM")
+
 class QuoteRequest(BaseModel):
     service: str
-    description: str
+    description: str = Field(..., max_length=MAX_MESSAGE_LENGTH)
     location: str
     preferred_date: Optional[str] = None
     phone: str
     email: EmailStr
+    estimate_inputs: Optional[EstimateInputs] = None
+    appointment: Optional[AppointmentChoice] = None
+
+class TechnicianUpdate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    email: Optional[EmailStr] = None
+    services: List[str] = Field(default_factory=list, description="Catalog service IDs; empty means all")
+    working_hours: Optional[Dict[str, List[str]]] = Field(None, description='{"0": ["08:00", "17:00"], ...}, 0 = Monday')
+    base: Optional[str] = Field(None, max_length=200, description="Town the technician starts from, for routing")
+    active: bool = True
 
 class TicketCreate(BaseModel):
     subject: str
     description: str
     priority: str = "medium"
+    location: Optional[str] = Field(None, max_length=200, description="Where the installation is, if on site")
 
 class TicketUpdate(BaseModel):
     status: Optional[str] = None
@@ -115,6 +343,17 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def rehash_password_if_needed(user_id, plain_password: str, hashed_password: str) -> None:
+    """Upgrade a hash made with an old scheme or cost; runs after a successful login"""
+    if not pwd_context.needs_update(hashed_password):
+        return
+    # Only replace the hash that was verified, in case the password changed meanwhile
+    users_collection.update_one(
+        {"_id": user_id, "password": hashed_password},
+        {"$set": {"password": hash_password(plain_password)}}
+    )
+    logger.info("Password rehashed", extra={"scheme": PASSWORD_HASH_SCHEME})
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -133,19 +372,48 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
             detail="Invalid authentication credentials"
         )
 
+def optional_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[dict]:
+    """The token's payload for a signed-in caller, None for an anonymous one; a bad token is still a 401"""
+    if credentials is None:
+        return None
+    return verify_token(credentials)
+
+def find_customer(email: str, session=None, projection: Optional[dict] = None) -> Optional[dict]:
+    """Customer by email from a secondary; falls back to the primary for an account it hasn't replicated yet"""
+    user = read_router.secondary(users_collection).find_one({"email": email}, projection, session=session)
+    if user is None and read_router.secondaries:
+        user = users_collection.find_one({"email": email}, projection)
+    return user
+
+def set_causal_token(response: Response, session) -> None:
+    """Let the client's next reads wait for the writes made in `session`"""
+    token = read_router.token(session)
+    if token:
+        response.headers[CAUSAL_HEADER] = token
+
+def verify_admin(payload: dict = Depends(verify_token)) -> dict:
+    # The role lives on the user document (granted with staff.py), so a
+    # registered look-alike email or a stale token grants nothing
+    user = users_collection.find_one({"email": payload.get("sub")}, {"roles": 1})
+    if not staff.is_admin(user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return payload
+
 def send_email(to_email: str, subject: str, body: str, html: bool = True) -> bool:
     """Send email via SMTP - non-blocking with timeout"""
     
     # If SMTP is disabled, just log the email
     if not SMTP_ENABLED:
-        print(f"[EMAIL LOG] To: {to_email}")
-        print(f"[EMAIL LOG] Subject: {subject}")
-        print(f"[EMAIL LOG] Body: {body[:200]}...")
+        logger.info("Email not sent (SMTP disabled)", extra={"to_email": to_email, "subject": subject})
+        logger.debug("Email body", extra={"to_email": to_email, "body": body[:200]})
         return True
     
     try:
         # Log email attempt
-        print(f"Attempting to send email to {to_email}: {subject}")
+        logger.info("Sending email", extra={"to_email": to_email, "subject": subject})
         
         message = MIMEMultipart("alternative")
         message["Subject"] = subject
@@ -160,21 +428,155 @@ def send_email(to_email: str, subject: str, body: str, html: bool = True) -> boo
         message.attach(part)
 
         context = ssl.create_default_context()
-        # Increased timeout and added error handling
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context, timeout=5) as server:
+        # Within the request deadline if there is one (background sends are detached from it)
+        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context, timeout=deadline_timeout(SMTP_TIMEOUT)) as server:
             server.login(SMTP_USERNAME, SMTP_PASSWORD)
             server.sendmail(SMTP_FROM_EMAIL, to_email, message.as_string())
         
-        print(f"Email sent successfully to {to_email}")
+        logger.info("Email sent", extra={"to_email": to_email})
         return True
     except socket.timeout:
-        print(f"SMTP timeout for {to_email} - email queued for retry")
+        logger.warning("SMTP timeout", extra={"to_email": to_email})
         return False
     except Exception as e:
-        print(f"Email error for {to_email}: {str(e)}")
+        logger.error("Email error", extra={"to_email": to_email, "error": str(e)})
         # Return False but don't block the response
         return False
 
+notification_digest = NotificationDigest(
+    notification_queue_collection,
+    notification_schedule_collection,
+    send=lambda subject, body: send_email(SMTP_TO_EMAIL, subject, body),
+    window_seconds=NOTIFICATION_DIGEST_SECONDS or 900,
+)
+
+# Same-sender near-duplicates: a double submit or a repeat customer, so staff decide
+REVIEW_NOTE = "Similar to a recent submission from the same sender; check before replying"
+
+def submission_status(verdict, status: str) -> str:
+    if verdict.needs_review:
+        return "review"
+    return "spam" if verdict.is_spam else status
+
+def review_subject(verdict, subject: str) -> str:
+    return f"[Review] {subject}" if verdict.needs_review else subject
+
+def staff_notice_due(verdict, sender: str) -> bool:
+    """Repeats from one sender are stored for review but notify staff once per digest window"""
+    return not verdict.needs_review or notification_digest.once_per_window(f"review:{sender.lower()}")
+
+def notify_staff(background_tasks: BackgroundTasks, kind: str, subject: str, body: str, title: str,
+                 fields: list, message: str, immediate: bool = False) -> None:
+    """Email staff right away, or queue the notification for the next digest"""
+    if NOTIFICATION_DIGEST_SECONDS <= 0 or immediate:
+        background_tasks.add_task(detached(send_email), SMTP_TO_EMAIL, subject, body)
+    else:
+        notification_digest.enqueue(kind, title, fields, message)
+
+# ===========================
+# Health Checks
+# ===========================
+
+def check_mongo() -> None:
+    client.admin.command("ping")
+
+def check_smtp() -> dict:
+    if not SMTP_ENABLED:
+        return {"enabled": False}
+    # TCP connect only; a full SMTP handshake per probe round would be wasteful
+    with socket.create_connection((SMTP_SERVER, SMTP_PORT), timeout=HEALTH_CHECK_TIMEOUT):
+        pass
+    return {"enabled": True}
+
+def check_google_circuit() -> dict:
+    snapshot = google_circuit.snapshot()
+    if snapshot["state"] == "open":
+        raise RuntimeError("Google Places circuit is open")
+    return snapshot
+
+log_drops = {"reported": 0}
+
+def check_logging() -> dict:
+    """Degraded while log records are being dropped on a full queue (the log pipe backed up)"""
+    dropped = dropped_records()
+    new, log_drops["reported"] = dropped - log_drops["reported"], dropped
+    if new:
+        logger.warning("Log records dropped", extra={"dropped": new, "dropped_total": dropped})
+        raise RuntimeError(f"{new} log records dropped since the last check ({dropped} in total)")
+    return {"dropped_total": dropped}
+
+health_monitor = HealthMonitor(interval=HEALTH_CHECK_INTERVAL, timeout=HEALTH_CHECK_TIMEOUT)
+health_monitor.add_check("mongo", check_mongo)
+health_monitor.add_check("smtp", check_smtp, critical=False)
+health_monitor.add_check("google", check_google_circuit, critical=False)
+health_monitor.add_check("logging", check_logging, critical=False)
+
+# ===========================
+# Deadline Errors
+# ===========================
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request, exc: DeadlineExceeded):
+    logger.warning("Request deadline exceeded", extra={"path": request.url.path, "error": str(exc)})
+    return JSONResponse({"detail": "Request took too long"}, status_code=504)
+
+@app.exception_handler(PyMongoError)
+async def mongo_error_handler(request, exc: PyMongoError):
+    # 504 only when the request's own budget ran out; a timeout with time to spare means Mongo is unwell
+    if exc.timeout and deadline_expired():
+        logger.warning("Database call exceeded request deadline", extra={"path": request.url.path, "error": str(exc)})
+        return JSONResponse({"detail": "Request took too long"}, status_code=504)
+    # No reachable primary/secondary or a dropped connection: worth retrying shortly
+    if isinstance(exc, ConnectionFailure):
+        logger.error("Database unavailable", extra={"path": request.url.path, "error": str(exc)})
+        return JSONResponse({"detail": "Database unavailable"}, status_code=503, headers={"Retry-After": "5"})
+    raise exc
+
+# ===========================
+# Startup
+# ===========================
+
+@app.on_event("startup")
+async def create_indexes():
+    # Don't keep the worker from starting if Mongo is down; readiness reports it
+    try:
+        ensure_idempotency_indexes(idempotency_collection, IDEMPOTENCY_TTL_SECONDS)
+        backoffice.ensure_indexes(db)
+        search.ensure_indexes(db)
+        project_import.ensure_indexes(projects_collection)
+        scheduler.ensure_indexes()
+        geocoding.ensure_indexes(db)
+        retention.ensure_indexes(db)
+        ensure_notification_indexes(notification_queue_collection, notification_schedule_collection)
+    except PyMongoError as e:
+        logger.error("Index creation failed", extra={"error": str(e)})
+
+@app.on_event("startup")
+async def start_health_monitor():
+    health_monitor.start()
+
+@app.on_event("shutdown")
+async def stop_health_monitor():
+    await health_monitor.stop()
+
+@app.on_event("shutdown")
+async def stop_image_workers():
+    image_pipeline.shutdown()
+
+@app.on_event("startup")
+async def start_notification_digest():
+    if NOTIFICATION_DIGEST_SECONDS > 0:
+        notification_digest.start()
+
+@app.on_event("shutdown")
+async def stop_notification_digest():
+    # Queued entries stay in Mongo and go out with the next digest from any worker
+    await notification_digest.stop()
+
+@app.on_event("shutdown")
+async def flush_logs():
+    log_listener.stop()
+
 # ===========================
 # API Endpoints
 # ===========================
@@ -183,12 +585,26 @@ def send_email(to_email: str, subject: str, body: str, html: bool = True) -> boo
 async def health_check():
     return {"status": "healthy", "service": "Sparksonic API"}
 
+@app.get("/api/health/live")
+async def liveness_probe():
+    result = health_monitor.liveness()
+    return JSONResponse(result, status_code=200 if result["status"] == "alive" else 503)
+
+@app.get("/api/health/ready")
+async def readiness_probe():
+    """
+    Serve cached dependency checks; probes never hit Mongo, SMTP or Google.
+    Degraded (non-critical check failing) still returns 200.
+    """
+    result = health_monitor.readiness()
+    return JSONResponse(result, status_code=503 if result["status"] == "unready" else 200)
+
 # ===========================
 # Authentication Endpoints
 # ===========================
 
 @app.post("/api/auth/register")
-async def register(user: UserRegister, background_tasks: BackgroundTasks):
+async def register(user: UserRegister, background_tasks: BackgroundTasks, response: Response):
     # Check if user exists
     if users_collection.find_one({"email": user.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -207,7 +623,9 @@ async def register(user: UserRegister, background_tasks: BackgroundTasks):
         "updated_at": datetime.utcnow().isoformat()
     }
     
-    users_collection.insert_one(user_data)
+    with read_router.session() as session:
+        users_collection.insert_one(user_data, session=session)
+        set_causal_token(response, session)
     
     # Send welcome email in background
     email_body = f"""
@@ -222,7 +640,7 @@ async def register(user: UserRegister, background_tasks: BackgroundTasks):
         </body>
     </html>
     """
-    background_tasks.add_task(send_email, user.email, "Welcome to Sparksonic", email_body)
+    background_tasks.add_task(detached(send_email), user.email, "Welcome to Sparksonic", email_body)
     
     return {
         "message": "Registration successful",
@@ -230,11 +648,13 @@ async def register(user: UserRegister, background_tasks: BackgroundTasks):
     }
 
 @app.post("/api/auth/login")
-async def login(user: UserLogin):
+async def login(user: UserLogin, background_tasks: BackgroundTasks):
     db_user = users_collection.find_one({"email": user.email})
     
     if not db_user or not verify_password(user.password, db_user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    background_tasks.add_task(detached(rehash_password_if_needed), db_user["_id"], user.password, db_user["password"])
     
     token = create_access_token({"sub": user.email, "customer_id": db_user["customer_id"]})
     
@@ -246,8 +666,9 @@ async def login(user: UserLogin):
     }
 
 @app.get("/api/auth/me")
-async def get_current_user(payload: dict = Depends(verify_token)):
-    user = users_collection.find_one({"email": payload["sub"]}, {"password": 0})
+async def get_current_user(request: Request, payload: dict = Depends(verify_token)):
+    with read_router.session(request.headers.get(CAUSAL_HEADER)) as session:
+        user = find_customer(payload["sub"], session, {"password": 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -260,6 +681,9 @@ async def get_current_user(payload: dict = Depends(verify_token)):
 
 @app.post("/api/contact")
 async def submit_contact(contact: ContactForm, background_tasks: BackgroundTasks):
+    # Screen before storing anything or touching SMTP
+    verdict = await run_in_threadpool(spam_filter.check, "contact", contact.message, contact.email)
+
     # Save to database
     contact_data = {
         "name": contact.name,
@@ -267,16 +691,33 @@ async def submit_contact(contact: ContactForm, background_tasks: BackgroundTasks
         "phone": contact.phone,
         "message": contact.message,
         "service": contact.service,
-        "status": "new",
+        "status": submission_status(verdict, "new"),
         "created_at": datetime.utcnow().isoformat()
     }
+    if verdict.is_spam:
+        contact_data["spam_reasons"] = verdict.reasons
+        expire_at = retention.expiry_for("contacts", contact_data)
+        if expire_at:
+            contact_data["expire_at"] = expire_at
+    contact_data.update(search.search_fields("contacts", contact_data))
     contacts_collection.insert_one(contact_data)
+    backoffice.record_insert(listing_counters_collection, "contacts", contact_data)
+
+    # Flagged submissions are stored but never mailed; the sender sees the usual reply
+    if verdict.is_spam and not verdict.needs_review:
+        logger.info("Contact flagged as spam", extra={"reasons": verdict.reasons})
+        return {"message": "Contact form submitted successfully"}
+    if not await run_in_threadpool(staff_notice_due, verdict, contact.email):
+        logger.info("Repeat contact stored for review", extra={"reasons": verdict.reasons})
+        return {"message": "Contact form submitted successfully"}
     
     # Send emails in background
+    review_html = f"<p><strong>Review:</strong> {REVIEW_NOTE}</p>" if verdict.needs_review else ""
     email_body = f"""
     <html>
         <body>
             <h2>New Contact Form Submission</h2>
+            {review_html}
             <p><strong>Name:</strong> {contact.name}</p>
             <p><strong>Email:</strong> {contact.email}</p>
             <p><strong>Phone:</strong> {contact.phone or 'Not provided'}</p>
@@ -286,7 +727,16 @@ async def submit_contact(contact: ContactForm, background_tasks: BackgroundTasks
         </body>
     </html>
     """
-    background_tasks.add_task(send_email, SMTP_TO_EMAIL, f"New Contact: {contact.name}", email_body)
+    notify_staff(
+        background_tasks, "contact", review_subject(verdict, f"New Contact: {contact.name}"), email_body,
+        title=contact.name,
+        fields=[("Email", contact.email), ("Phone", contact.phone), ("Service", contact.service or "General Inquiry"),
+                ("Review", REVIEW_NOTE if verdict.needs_review else None)],
+        message=contact.message,
+    )
+    # A likely double submit: the customer already has their confirmation
+    if verdict.needs_review:
+        return {"message": "Contact form submitted successfully"}
     
     # Send confirmation to customer
     customer_email = f"""
@@ -300,7 +750,7 @@ async def submit_contact(contact: ContactForm, background_tasks: BackgroundTasks
         </body>
     </html>
     """
-    background_tasks.add_task(send_email, contact.email, "Thank you for contacting Sparksonic", customer_email)
+    background_tasks.add_task(detached(send_email), contact.email, "Thank you for contacting Sparksonic", customer_email)
     
     return {"message": "Contact form submitted successfully"}
 
@@ -308,9 +758,128 @@ async def submit_contact(contact: ContactForm, background_tasks: BackgroundTasks
 # Quote Endpoints
 # ===========================
 
+def estimate_quote(service: str, inputs: dict) -> dict:
+    service_id = service_catalog.resolve_id(service)
+    if service_id is None:
+        raise estimator.EstimateError(f"Unknown service {service}")
+    return estimator.estimate(service_id, inputs)
+
+@app.post("/api/quotes/estimate")
+async def estimate_quote_endpoint(request: QuoteEstimateRequest):
+    """Indicative price, subsidy and payback ranges; nothing is stored"""
+    try:
+        return estimate_quote(request.service, request.model_dump(exclude={"service"}, exclude_none=True))
+    except estimator.EstimateError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def parse_day(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid date {value} (expected YYYY-MM-DD)")
+
+def check_booking_allowed(service: str, payload: Optional[dict]) -> str:
+    """Catalog ID of the service to book; refuses anonymous callers and unknown services"""
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Sign in to book a site visit")
+    service_id = service_catalog.resolve_id(service)
+    if service_id is None:
+        raise HTTPException(status_code=422, detail=f"Unknown service {service}")
+    return service_id
+
+def reserve_visit(email: str, quote_id: str, day: str) -> None:
+    """
+    Take one of the account's MAX_OPEN_APPOINTMENTS places for a visit on `day`.
+    The check and the push are one conditional update, so parallel submissions
+    can't all get past the cap; places of visits that are over are freed first.
+    """
+    users_collection.update_one(
+        {"email": email},
+        {"$pull": {"visit_reservations": {"date": {"$lt": scheduling.local_today().isoformat()}}}},
+    )
+    reserved = users_collection.find_one_and_update(
+        {"email": email, f"visit_reservations.{MAX_OPEN_APPOINTMENTS - 1}": {"$exists": False}},
+        {"$push": {"visit_reservations": {"quote_id": quote_id, "date": day}}},
+        projection={"_id": 1},
+    )
+    if reserved is None:
+        if users_collection.count_documents({"email": email}, limit=1) == 0:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Account not found")
+        raise HTTPException(status_code=429, detail=(
+            f"You already have {MAX_OPEN_APPOINTMENTS} site visits booked; "
+            "we'll get in touch about this request without booking another"
+        ))
+
+def release_visit(email: str, quote_id: str) -> None:
+    users_collection.update_one({"email": email}, {"$pull": {"visit_reservations": {"quote_id": quote_id}}})
+
+def book_appointment(service_id: str, choice: AppointmentChoice, quote_id: str, near: Optional[dict],
+                     booked_by: str) -> dict:
+    day = parse_day(choice.date)
+    reserve_visit(booked_by, quote_id, day.isoformat())
+    try:
+        appointment = scheduler.book(service_id, day, choice.start, quote_id, near=near)
+    except scheduling.SlotTaken as e:
+        release_visit(booked_by, quote_id)
+        # Someone else got there first: offer the nearest slots still open
+        raise HTTPException(status_code=409, detail={
+            "message": str(e),
+            "alternatives": scheduler.availability(service_id, day, limit=5),
+        })
+    except scheduling.SchedulingError as e:
+        release_visit(booked_by, quote_id)
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception:
+        release_visit(booked_by, quote_id)
+        raise
+    appointment["booked_by"] = booked_by
+    return appointment
+
+def nearest_technician(service: str, point: dict) -> Optional[dict]:
+    """Active technician for the service based nearest the job"""
+    ranked = geocoding.nearest(point, scheduler.technicians_for(service_catalog.resolve_id(service)), "base_location")
+    if not ranked:
+        return None
+    distance, technician = ranked[0]
+    return {"technician_id": technician["_id"], "name": technician.get("name"), "distance_km": round(distance, 1)}
+
+def describe_geo(geo: dict) -> str:
+    match = geo.get("geo_match")
+    if not match:
+        return "not placed"
+    if match.get("postal_code_conflict"):
+        return f"{match['place']}, {match['country']} - check postal code {match['postal_code']}"
+    return f"{match['place']}, {match['country']}" + (" - check spelling" if match["method"] == "fuzzy" else "")
+
+def describe_appointment(appointment: Optional[dict]) -> Optional[str]:
+    if not appointment:
+        return None
+    return (f"{appointment['date']} {appointment['start']}-{appointment['end']}"
+            f" ({appointment.get('technician_name') or appointment['technician_id']})")
+
 @app.post("/api/quotes")
-async def create_quote(quote: QuoteRequest, background_tasks: BackgroundTasks):
+async def create_quote(quote: QuoteRequest, background_tasks: BackgroundTasks, response: Response,
+                       payload: Optional[dict] = Depends(optional_token)):
+    # Anyone can ask for a quote; holding a technician's time takes an account, and only a few visits each
+    booking_service = check_booking_allowed(quote.service, payload) if quote.appointment else None
+    verdict = await run_in_threadpool(spam_filter.check, "quote", quote.description, quote.email)
     quote_id = f"QT-{str(uuid.uuid4())[:8].upper()}"
+
+    # Attach an instant estimate when the customer gave inputs for one; a lead is never rejected over it
+    estimate = None
+    estimate_inputs = quote.estimate_inputs.model_dump(exclude_none=True) if quote.estimate_inputs else {}
+    if estimate_inputs:
+        try:
+            estimate = estimate_quote(quote.service, estimate_inputs)
+        except estimator.EstimateError:
+            pass
+
+    geo = geocoding.geo_fields(geocoder, quote.location)
+
+    # Claim the chosen site visit slot before storing the quote; spam never holds a technician's time
+    appointment = None
+    if quote.appointment and not verdict.is_spam:
+        appointment = book_appointment(booking_service, quote.appointment, quote_id, geo.get("geo"), payload["sub"])
     
     quote_data = {
         "quote_id": quote_id,
@@ -320,50 +889,134 @@ async def create_quote(quote: QuoteRequest, background_tasks: BackgroundTasks):
         "preferred_date": quote.preferred_date,
         "phone": quote.phone,
         "email": quote.email,
-        "status": "pending",
+        "status": submission_status(verdict, "pending"),
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat()
     }
+    if verdict.is_spam:
+        quote_data["spam_reasons"] = verdict.reasons
+    if estimate:
+        quote_data["estimate"] = estimate
+    if appointment:
+        quote_data["appointment"] = appointment
+    quote_data.update(geo)
+    # Route the lead to the technician based nearest the job (or the one booked for the visit)
+    assigned = None
+    if appointment:
+        assigned = {"technician_id": appointment["technician_id"], "name": appointment.get("technician_name")}
+    elif geo and not verdict.is_spam:
+        assigned = nearest_technician(quote.service, geo["geo"])
+    if assigned:
+        quote_data["assigned_technician"] = assigned
     
-    quotes_collection.insert_one(quote_data)
+    quote_data.update(search.search_fields("quotes", quote_data))
+    try:
+        with read_router.session() as session:
+            quotes_collection.insert_one(quote_data, session=session)
+            set_causal_token(response, session)
+    except Exception:
+        if appointment:
+            scheduler.cancel(appointment["appointment_id"])
+            release_visit(appointment["booked_by"], quote_id)
+        raise
+    backoffice.record_insert(listing_counters_collection, "quotes", quote_data)
+
+    if verdict.is_spam and not verdict.needs_review:
+        logger.info("Quote flagged as spam", extra={"quote_id": quote_id, "reasons": verdict.reasons})
+        return {"message": "Quote request submitted", "quote_id": quote_id}
     
+    result = {"message": "Quote request submitted", "quote_id": quote_id}
+    if appointment:
+        result["appointment"] = {key: appointment[key] for key in ("appointment_id", "date", "start", "end")}
+    if not await run_in_threadpool(staff_notice_due, verdict, quote.email):
+        logger.info("Repeat quote stored for review", extra={"quote_id": quote_id, "reasons": verdict.reasons})
+        return result
+
     # Send email notification in background
+    review_html = f"<p><strong>Review:</strong> {REVIEW_NOTE}</p>" if verdict.needs_review else ""
     email_body = f"""
     <html>
         <body>
             <h2>New Quote Request</h2>
+            {review_html}
             <p><strong>Quote ID:</strong> {quote_id}</p>
             <p><strong>Service:</strong> {quote.service}</p>
-            <p><strong>Location:</strong> {quote.location}</p>
+            <p><strong>Location:</strong> {quote.location} ({describe_geo(geo)})</p>
+            <p><strong>Nearest technician:</strong> {assigned['name'] if assigned else 'Not assigned'}</p>
             <p><strong>Phone:</strong> {quote.phone}</p>
             <p><strong>Email:</strong> {quote.email}</p>
+            <p><strong>Estimate:</strong> {estimator.describe(estimate) if estimate else 'Not available'}</p>
+            <p><strong>Site visit:</strong> {describe_appointment(appointment) or 'Not booked'}</p>
             <p><strong>Description:</strong></p>
             <p>{quote.description}</p>
         </body>
     </html>
     """
-    background_tasks.add_task(send_email, SMTP_TO_EMAIL, f"New Quote Request: {quote_id}", email_body)
-    
-    return {"message": "Quote request submitted", "quote_id": quote_id}
+    notify_staff(
+        background_tasks, "quote", review_subject(verdict, f"New Quote Request: {quote_id}"), email_body,
+        title=quote_id,
+        fields=[("Service", quote.service), ("Location", f"{quote.location} ({describe_geo(geo)})"),
+                ("Technician", assigned['name'] if assigned else None), ("Phone", quote.phone),
+                ("Email", quote.email), ("Preferred date", quote.preferred_date),
+                ("Estimate", estimator.describe(estimate) if estimate else None),
+                ("Site visit", describe_appointment(appointment)),
+                ("Review", REVIEW_NOTE if verdict.needs_review else None)],
+        message=quote.description,
+    )
+    return result
 
 @app.get("/api/quotes/user")
-async def get_user_quotes(payload: dict = Depends(verify_token)):
-    user = users_collection.find_one({"email": payload["sub"]})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    quotes = list(quotes_collection.find({"email": user["email"]}))
+async def get_user_quotes(request: Request, payload: dict = Depends(verify_token)):
+    with read_router.session(request.headers.get(CAUSAL_HEADER)) as session:
+        user = find_customer(payload["sub"], session)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        quotes = list(read_router.secondary(quotes_collection).find(
+            {"email": user["email"]}, search.SEARCH_PROJECTION, session=session
+        ))
     for quote in quotes:
         quote["_id"] = str(quote["_id"])
     
     return quotes
 
+# ===========================
+# Appointment Endpoints
+# ===========================
+
+@app.get("/api/appointments/availability")
+async def get_availability(
+    service: str,
+    date: Optional[str] = Query(None, description="YYYY-MM-DD; slots nearest this day first (default: first bookable day)"),
+    limit: int = Query(5, ge=1, le=50)
+):
+    """Free site visit slots for a service, sized to the visit it needs"""
+    service_id = service_catalog.resolve_id(service)
+    if service_id is None:
+        raise HTTPException(status_code=404, detail=f"Unknown service {service}")
+    first, last = scheduler.bookable_range()
+    return {
+        "service": service_id,
+        "bookable_from": first.isoformat(),
+        "bookable_to": last.isoformat(),
+        "slots": scheduler.availability(service_id, parse_day(date) if date else None, limit),
+    }
+
+@app.get("/api/geocode")
+async def geocode_location(q: str = Query(..., min_length=2, max_length=200)):
+    """Where a free-text location is, as the quote form will store it (offline, no external calls)"""
+    match = geocoder.geocode(q)
+    if match is None:
+        raise HTTPException(status_code=404, detail="Location not recognised")
+    return match
+
 # ===========================
 # Ticket Endpoints
 # ===========================
 
 @app.post("/api/tickets")
-async def create_ticket(ticket: TicketCreate, background_tasks: BackgroundTasks, payload: dict = Depends(verify_token)):
+async def create_ticket(ticket: TicketCreate, background_tasks: BackgroundTasks, response: Response,
+                        payload: dict = Depends(verify_token)):
     user = users_collection.find_one({"email": payload["sub"]})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -381,8 +1034,15 @@ async def create_ticket(ticket: TicketCreate, background_tasks: BackgroundTasks,
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat()
     }
+    if ticket.location:
+        ticket_data["location"] = ticket.location
+        ticket_data.update(geocoding.geo_fields(geocoder, ticket.location))
     
-    tickets_collection.insert_one(ticket_data)
+    ticket_data.update(search.search_fields("tickets", ticket_data))
+    with read_router.session() as session:
+        tickets_collection.insert_one(ticket_data, session=session)
+        set_causal_token(response, session)
+    backoffice.record_insert(listing_counters_collection, "tickets", ticket_data)
     
     # Send email notification in background
     email_body = f"""
@@ -398,17 +1058,26 @@ async def create_ticket(ticket: TicketCreate, background_tasks: BackgroundTasks,
         </body>
     </html>
     """
-    background_tasks.add_task(send_email, SMTP_TO_EMAIL, f"New Ticket: {ticket_id}", email_body)
+    notify_staff(
+        background_tasks, "ticket", f"New Ticket: {ticket_id}", email_body,
+        title=f"{ticket_id}: {ticket.subject}",
+        fields=[("Customer", f"{user['full_name']} ({user['customer_id']})"), ("Priority", ticket.priority)],
+        message=ticket.description,
+        immediate=ticket.priority.lower() in NOTIFICATION_IMMEDIATE_PRIORITIES,
+    )
     
     return {"message": "Ticket created", "ticket_id": ticket_id}
 
 @app.get("/api/tickets/user")
-async def get_user_tickets(payload: dict = Depends(verify_token)):
-    user = users_collection.find_one({"email": payload["sub"]})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    tickets = list(tickets_collection.find({"customer_email": user["email"]}))
+async def get_user_tickets(request: Request, payload: dict = Depends(verify_token)):
+    with read_router.session(request.headers.get(CAUSAL_HEADER)) as session:
+        user = find_customer(payload["sub"], session)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        tickets = list(read_router.secondary(tickets_collection).find(
+            {"customer_email": user["email"]}, search.SEARCH_PROJECTION, session=session
+        ))
     for ticket in tickets:
         ticket["_id"] = str(ticket["_id"])
     
@@ -425,13 +1094,23 @@ async def get_google_reviews():
     Returns the latest reviews directly from Google.
     Note: Google Places API returns up to 5 most relevant reviews.
     """
+    # Skip Google entirely while its circuit is open
+    google_timeout = deadline_timeout(GOOGLE_TIMEOUT)
+    if not google_circuit.allow():
+        return {
+            "rating": 5.0,
+            "total_reviews": 54,
+            "reviews": []
+        }
+
     try:
         # Fetch fresh data from Google API
-        url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={GOOGLE_PLACE_ID}&fields=name,rating,reviews,user_ratings_total&key={GOOGLE_API_KEY}"
-        response = requests.get(url, timeout=10)
+        url = f"{GOOGLE_PLACES_URL}?place_id={GOOGLE_PLACE_ID}&fields=name,rating,reviews,user_ratings_total&key={GOOGLE_API_KEY}"
+        response = requests.get(url, timeout=google_timeout)
         data = response.json()
         
         if data.get("status") == "OK":
+            google_circuit.record_success()
             result = data.get("result", {})
             return {
                 "rating": result.get("rating", 5.0),
@@ -440,13 +1119,15 @@ async def get_google_reviews():
             }
         else:
             # Return fallback data if API fails
+            google_circuit.record_failure()
             return {
                 "rating": 5.0,
                 "total_reviews": 54,
                 "reviews": []
             }
     except Exception as e:
-        print(f"[ERROR] Google Reviews error: {str(e)}")
+        google_circuit.record_failure()
+        logger.error("Google Reviews error", extra={"error": str(e)})
         return {
             "rating": 5.0,
             "total_reviews": 54,
@@ -459,113 +1140,494 @@ async def refresh_reviews_cache():
     Manually refresh the reviews cache.
     This endpoint can be called to force update the reviews.
     """
+    google_timeout = deadline_timeout(GOOGLE_TIMEOUT)
+    # Same breaker as /api/reviews: a manual refresh must not keep hammering a failing API
+    if not google_circuit.allow():
+        raise HTTPException(status_code=503, detail="Google API unavailable (circuit open), try again later")
+
     try:
-        url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={GOOGLE_PLACE_ID}&fields=name,rating,reviews,user_ratings_total&key={GOOGLE_API_KEY}"
-        response = requests.get(url, timeout=10)
+        url = f"{GOOGLE_PLACES_URL}?place_id={GOOGLE_PLACE_ID}&fields=name,rating,reviews,user_ratings_total&key={GOOGLE_API_KEY}"
+        response = requests.get(url, timeout=google_timeout)
         data = response.json()
-        
-        if data.get("status") == "OK":
-            result = data.get("result", {})
-            reviews_data = {
-                "type": "google_reviews",
-                "rating": result.get("rating", 5.0),
-                "total_reviews": result.get("user_ratings_total", 0),
-                "reviews": result.get("reviews", []),
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            
-            # Update cache
-            reviews_cache_collection.update_one(
-                {"type": "google_reviews"},
-                {"$set": reviews_data},
-                upsert=True
-            )
-            
-            return {
-                "message": "Reviews cache refreshed successfully",
-                "total_reviews": reviews_data["total_reviews"],
-                "reviews_count": len(reviews_data["reviews"])
-            }
-        else:
-            raise HTTPException(status_code=400, detail=f"Google API error: {data.get('status')}")
-            
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        google_circuit.record_failure()
+        logger.error("Google Reviews refresh error", extra={"error": str(e)})
+        raise HTTPException(status_code=502, detail="Google API request failed")
+
+    if data.get("status") != "OK":
+        google_circuit.record_failure()
+        raise HTTPException(status_code=400, detail=f"Google API error: {data.get('status')}")
+
+    google_circuit.record_success()
+    result = data.get("result", {})
+    reviews_data = {
+        "type": "google_reviews",
+        "rating": result.get("rating", 5.0),
+        "total_reviews": result.get("user_ratings_total", 0),
+        "reviews": result.get("reviews", []),
+        "updated_at": datetime.utcnow().isoformat()
+    }
+
+    # Update cache
+    reviews_cache_collection.update_one(
+        {"type": "google_reviews"},
+        {"$set": reviews_data},
+        upsert=True
+    )
+
+    return {
+        "message": "Reviews cache refreshed successfully",
+        "total_reviews": reviews_data["total_reviews"],
+        "reviews_count": len(reviews_data["reviews"])
+    }
 
 # ===========================
 # Projects Endpoints
 # ===========================
 
-@app.get("/api/projects")
-async def get_projects():
-    projects = list(projects_collection.find().limit(12))
+def build_projects() -> list:
+    # Catalog content, edited by staff only: bounded staleness is fine without a session
+    cursor = read_router.secondary(projects_collection).find().sort([("date", -1), ("_id", -1)]).limit(PROJECTS_LIMIT)
+    projects = list(cursor)
+    formats = images.available_formats()
     for project in projects:
         project["_id"] = str(project["_id"])
+        digest = project.pop("image_digest", None) or {}
+        if project.get("image"):
+            # Versioned derivative URLs; the frontend picks a preset per layout and a format per browser.
+            # The version is known once the current image has been fetched (see get_project_image)
+            query = f"?v={images.image_version(digest['sha256'])}" if digest.get("url") == project["image"] else ""
+            project["image_variants"] = {
+                fmt: {
+                    preset: f"/api/images/projects/{project['_id']}/{preset}.{fmt}{query}"
+                    for preset in images.PRESETS
+                }
+                for fmt in formats
+            }
     return projects
 
+@app.get("/api/projects")
+async def get_projects(request: Request):
+    """Most recent projects; served from the worker's cache until the projects cache version changes"""
+    # Read from the same secondary as the projects: a member that has the bump has the imported rows
+    version = project_import.cache_version(read_router.secondary(cache_versions_collection))
+    if projects_cache["version"] != version or time.monotonic() - projects_cache["built_at"] > PROJECTS_CACHE_SECONDS:
+        body = json.dumps(jsonable_encoder(build_projects()), separators=(",", ":")).encode("utf-8")
+        projects_cache.update({
+            "version": version,
+            "built_at": time.monotonic(),
+            "body": body,
+            "etag": f'"{hashlib.sha256(body).hexdigest()[:16]}"',
+        })
+    headers = {"Cache-Control": "no-cache", "ETag": projects_cache["etag"]}
+    if request.headers.get("if-none-match") == projects_cache["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(projects_cache["body"], media_type="application/json", headers=headers)
+
+@app.get("/api/images/projects/{project_id}/{variant}")
+async def get_project_image(project_id: str, variant: str, v: Optional[str] = None):
+    """Resized WebP/AVIF derivative of a project image, e.g. `card.webp`"""
+    try:
+        preset, fmt = images.parse_variant(variant)
+        project = projects_collection.find_one({"_id": ObjectId(project_id)}, {"image": 1, "image_digest": 1})
+    except (images.ImageError, InvalidId):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if not project or not project.get("image"):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    try:
+        # An open handle: the file may be evicted from the cache while it streams
+        handle, digest = await image_pipeline.open(project["image"], preset, fmt)
+    except (images.ImageError, requests.RequestException, OSError) as e:
+        logger.warning("Image derivative failed", extra={"project_id": project_id, "variant": variant, "error": str(e)})
+        raise HTTPException(status_code=502, detail="Image source unavailable")
+
+    current = {"url": project["image"], "sha256": digest}
+    if project.get("image_digest") != current:
+        # New content behind this image: give the listing URLs a new ?v=
+        projects_collection.update_one({"_id": project["_id"], "image": project["image"]}, {"$set": {"image_digest": current}})
+        project_import.bump_cache_version(cache_versions_collection)
+
+    if v == images.image_version(digest):
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = "public, max-age=300"
+    headers = {"Cache-Control": cache_control, "Content-Length": str(os.fstat(handle.fileno()).st_size)}
+    return StreamingResponse(images.iter_file(handle), media_type=images.FORMATS[fmt][1], headers=headers)
+
 # ===========================
 # Services Endpoint
 # ===========================
 
+@app.get("/api/services/manifest")
+async def get_services_manifest():
+    """Current bundle version per locale, for builds that pin `?v=`"""
+    return JSONResponse(service_catalog.manifest(), headers={"Cache-Control": f"public, max-age={SERVICES_CACHE_SECONDS}"})
+
 @app.get("/api/services")
-async def get_services():
-    services = [
-        {
-            "id": "solar-panels",
-            "name": "Solar Panels",
-            "icon": "solar",
-            "description": "Professional solar panel installation for residential and commercial properties."
-        },
-        {
-            "id": "ev-chargers",
-            "name": "EV Chargers",
-            "icon": "ev",
-            "description": "Electric vehicle charging station installation with Creos subsidy support."
-        },
-        {
-            "id": "heat-pumps",
-            "name": "Heat Pumps",
-            "icon": "heat",
-            "description": "Energy-efficient heat pump systems for sustainable heating and cooling."
-        },
-        {
-            "id": "energy-audits",
-            "name": "Energy Audits",
-            "icon": "audit",
-            "description": "Comprehensive energy assessments to optimize your property's efficiency."
-        },
-        {
-            "id": "electrician",
-            "name": "Electrician Services",
-            "icon": "electric",
-            "description": "Licensed electrical services for installations, repairs, and maintenance."
-        },
-        {
-            "id": "air-conditioning",
-            "name": "Air Conditioning",
-            "icon": "ac",
-            "description": "Professional AC installation and maintenance services."
-        },
-        {
-            "id": "home-automation",
-            "name": "Home Automation",
-            "icon": "automation",
-            "description": "Smart home solutions for modern living."
-        },
-        {
-            "id": "security-systems",
-            "name": "Security & Alarm Systems",
-            "icon": "security",
-            "description": "Advanced security and alarm systems for your property."
-        },
-        {
-            "id": "maintenance",
-            "name": "Maintenance Services",
-            "icon": "maintenance",
-            "description": "Regular maintenance and support for all electrical systems."
-        }
-    ]
-    return services
+async def get_services(request: Request, lang: Optional[str] = None, v: Optional[str] = None):
+    """
+    Precomputed catalog bundle for `?lang=` or Accept-Language. A request
+    naming the current version is cacheable forever; anything else gets a
+    short max-age and revalidates against the ETag.
+    """
+    bundle = service_catalog.bundle(lang, request.headers.get("accept-language"))
+    if v == bundle.version:
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = f"public, max-age={SERVICES_CACHE_SECONDS}"
+    headers = {
+        "Cache-Control": cache_control,
+        "ETag": bundle.etag,
+        "Content-Language": bundle.locale,
+        "Vary": "Accept-Language",
+    }
+    if request.headers.get("if-none-match") == bundle.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(bundle.body, media_type="application/json", headers=headers)
+
+# ===========================
+# Admin: Back-office Listings
+# ===========================
+
+def run_listing(collection: str, filters: dict, created_from, created_to, sort, order, limit, cursor) -> dict:
+    try:
+        return backoffice.list_documents(
+            db, listing_counters_collection, collection, filters,
+            created_from=created_from, created_to=created_to,
+            sort=sort, order=order, limit=limit, cursor=cursor,
+            projection=search.SEARCH_PROJECTION
+        )
+    except backoffice.ListingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/admin/contacts")
+async def admin_list_contacts(
+    status: Optional[str] = None,
+    service: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    limit: int = Query(50, ge=1, le=backoffice.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    payload: dict = Depends(verify_admin)
+):
+    return run_listing("contacts", {"status": status, "service": service},
+                       created_from, created_to, sort, order, limit, cursor)
+
+@app.get("/api/admin/quotes")
+async def admin_list_quotes(
+    status: Optional[str] = None,
+    service: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    limit: int = Query(50, ge=1, le=backoffice.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    payload: dict = Depends(verify_admin)
+):
+    return run_listing("quotes", {"status": status, "service": service},
+                       created_from, created_to, sort, order, limit, cursor)
+
+@app.get("/api/admin/tickets")
+async def admin_list_tickets(
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    limit: int = Query(50, ge=1, le=backoffice.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    payload: dict = Depends(verify_admin)
+):
+    return run_listing("tickets", {"status": status, "priority": priority},
+                       created_from, created_to, sort, order, limit, cursor)
+
+@app.post("/api/admin/counters/rebuild")
+async def admin_rebuild_counters(payload: dict = Depends(verify_admin)):
+    """
+    Recompute listing totals from the collections.
+    Run after bulk loads or status changes made directly in Mongo.
+    """
+    return {
+        collection: backoffice.rebuild_counters(db, listing_counters_collection, collection)
+        for collection in backoffice.LISTINGS
+    }
+
+# ===========================
+# Admin: Search
+# ===========================
+
+@app.get("/api/admin/search")
+async def admin_search(
+    q: str = Query(..., min_length=1, max_length=200),
+    collections: Optional[str] = Query(None, description="Comma-separated subset of quotes,tickets,contacts"),
+    limit: int = Query(20, ge=1, le=100),
+    payload: dict = Depends(verify_admin)
+):
+    selected = None
+    if collections:
+        selected = [c.strip() for c in collections.split(",") if c.strip()]
+        unknown = set(selected) - set(search.SEARCH_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Cannot search {', '.join(sorted(unknown))}")
+    return search.search(db, q, selected, limit)
+
+# ===========================
+# Admin: Appointments
+# ===========================
+
+@app.get("/api/admin/technicians")
+async def admin_list_technicians(payload: dict = Depends(verify_admin)):
+    return list(technicians_collection.find().sort("_id", 1))
+
+@app.put("/api/admin/technicians/{technician_id}")
+async def admin_put_technician(technician_id: str, technician: TechnicianUpdate, payload: dict = Depends(verify_admin)):
+    """Create or replace a technician; bookings already made are kept"""
+    unknown = [service for service in technician.services if service_catalog.resolve_id(service) != service]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown services {', '.join(unknown)}")
+    try:
+        if technician.working_hours is not None:
+            scheduling.validate_hours(technician.working_hours)
+    except scheduling.SchedulingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    document = technician.model_dump(exclude_none=True)
+    if technician.base:
+        match = geocoder.geocode(technician.base)
+        if match is None:
+            raise HTTPException(status_code=400, detail=f"Can't place {technician.base}")
+        document["base_location"] = match["point"]
+    document["updated_at"] = datetime.utcnow().isoformat()
+    technicians_collection.replace_one({"_id": technician_id}, document, upsert=True)
+    return {"_id": technician_id, **document}
+
+@app.get("/api/admin/appointments")
+async def admin_list_appointments(
+    date_from: Optional[str] = Query(None, description="YYYY-MM-DD, default today"),
+    date_to: Optional[str] = Query(None, description="YYYY-MM-DD, default two weeks after date_from"),
+    payload: dict = Depends(verify_admin)
+):
+    first = parse_day(date_from) if date_from else scheduling.local_today()
+    last = parse_day(date_to) if date_to else first + timedelta(days=13)
+    if last < first or (last - first).days > 366:
+        raise HTTPException(status_code=400, detail="date_to must be after date_from and within a year of it")
+    return scheduler.bookings(first, last)
+
+@app.delete("/api/admin/appointments/{appointment_id}")
+async def admin_cancel_appointment(appointment_id: str, payload: dict = Depends(verify_admin)):
+    """Free the slot; the quote keeps its appointment record, marked cancelled"""
+    if not scheduler.cancel(appointment_id):
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    quote = quotes_collection.find_one_and_update(
+        {"appointment.appointment_id": appointment_id},
+        {"$set": {"appointment.cancelled_at": datetime.utcnow().isoformat(), "updated_at": datetime.utcnow().isoformat()}},
+        projection={"quote_id": 1, "appointment.booked_by": 1},
+    )
+    if quote and quote["appointment"].get("booked_by"):
+        release_visit(quote["appointment"]["booked_by"], quote["quote_id"])
+    logger.info("Appointment cancelled", extra={"appointment_id": appointment_id, "admin": payload["sub"]})
+    return {"message": "Appointment cancelled"}
+
+# ===========================
+# Admin: Nearby
+# ===========================
+
+# Statuses still being worked on; retention.py archives quotes outside them
+OPEN_STATUSES = {
+    "quotes": ["pending", "contacted", "quoted"],
+    "tickets": ["open", "in_progress"],
+}
+
+@app.get("/api/admin/nearby/{collection}")
+async def admin_nearby(
+    collection: str,
+    near: str = Query(..., min_length=2, max_length=200, description="Town or postal code, e.g. Esch-sur-Alzette"),
+    radius_km: float = Query(15, gt=0, le=200),
+    status: Optional[str] = None,
+    open_only: bool = Query(False, alias="open"),
+    limit: int = Query(50, ge=1, le=backoffice.MAX_PAGE_SIZE),
+    payload: dict = Depends(verify_admin)
+):
+    """Quotes or tickets located within `radius_km` of a place, nearest first (2dsphere index on `geo`)"""
+    if collection not in OPEN_STATUSES:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    match = geocoder.geocode(near)
+    if match is None:
+        raise HTTPException(status_code=400, detail=f"Can't place {near}")
+    query = geocoding.within_query(match["point"], radius_km)
+    if status:
+        query["status"] = status
+    elif open_only:
+        query["status"] = {"$in": OPEN_STATUSES[collection]}
+    documents = list(db[collection].find(query, search.SEARCH_PROJECTION).limit(limit))
+    for doc in documents:
+        doc["_id"] = str(doc["_id"])
+        doc["distance_km"] = round(geocoding.distance_km(match["point"], doc["geo"]), 1)
+    return {"near": match, "radius_km": radius_km, "results": documents}
+
+# ===========================
+# Admin: Import
+# ===========================
+
+@app.post("/api/admin/import/projects")
+async def admin_import_projects(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="ndjson or csv; default from the file name"),
+    dry_run: bool = False,
+    payload: dict = Depends(verify_admin)
+):
+    """
+    Upsert portfolio projects by slug from an NDJSON or CSV upload (optionally gzipped).
+    The upload is spooled to disk and read row by row; invalid rows are reported, not fatal.
+    """
+    try:
+        import_format = project_import.detect_format(file.filename, format)
+        report = await run_in_threadpool(
+            project_import.import_projects, projects_collection, cache_versions_collection,
+            file.file, import_format, dry_run=dry_run,
+        )
+    except project_import.ProjectImportError as e:
+        if e.report:
+            logger.warning("Projects partly imported", extra={
+                "upload": file.filename,
+                "admin": payload["sub"],
+                **{key: e.report[key] for key in ("rows", "inserted", "updated", "failed")},
+            })
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await file.close()
+    logger.info("Projects imported", extra={
+        "upload": file.filename,
+        "admin": payload["sub"],
+        "dry_run": dry_run,
+        **{key: report[key] for key in ("rows", "inserted", "updated", "failed")},
+    })
+    return report
+
+# ===========================
+# Admin: Export
+# ===========================
+
+@app.get("/api/admin/export/{collection}")
+async def admin_export(
+    collection: str,
+    format: str = "ndjson",
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    after_id: Optional[str] = Query(None, description="Resume after this _id (the last one received)"),
+    after_created_at: Optional[str] = Query(None, description="created_at of that row, for date-range exports"),
+    gzip: bool = False,
+    payload: dict = Depends(verify_admin)
+):
+    """
+    Stream a collection in constant memory, one chunk per cursor batch.
+    Every row includes its _id and created_at, so a broken download can resume
+    with after_id (and after_created_at when a date range is set).
+    """
+    if collection not in export.EXPORT_FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    try:
+        start_after = export.parse_after_id(after_id)
+        created_from = export.parse_date(created_from, "created_from")
+        created_to = export.parse_date(created_to, "created_to")
+        after_created_at = export.parse_date(after_created_at, "after_created_at")
+        if start_after is not None and (created_from or created_to) and after_created_at is None:
+            # Resolve before streaming starts, so a bad resume point is a 400 rather than a cut-off body
+            after_created_at = export.created_at_of(db, collection, start_after)
+    except export.ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"{collection}.{format}" + (".gz" if gzip else "")
+    chunks = export.stream_export(
+        db, collection, format,
+        created_from=created_from, created_to=created_to,
+        after_id=start_after, after_created_at=after_created_at, compress=gzip,
+        include_header=start_after is None
+    )
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# ===========================
+# Admin: Archive
+# ===========================
+
+@app.get("/api/admin/archive/{collection}/{record_id}")
+async def admin_get_archived(collection: str, record_id: str, payload: dict = Depends(verify_admin)):
+    """Fetch an archived contact or quote by _id (or quote_id)"""
+    if collection not in retention.POLICIES:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    record = retention.fetch_archived(db, ARCHIVE_DIR, collection, record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Archived record not found")
+    return record
+
+# ===========================
+# Admin: Profiling Endpoints
+# ===========================
+
+@app.get("/api/admin/profiles")
+async def list_profiles(payload: dict = Depends(verify_admin)):
+    return await run_in_threadpool(profile_store.list)
+
+@app.get("/api/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, payload: dict = Depends(verify_admin)):
+    """
+    Return a captured profile in collapsed-stack format.
+    Pipe it into flamegraph.pl or load it in speedscope.
+    """
+    folded = await run_in_threadpool(profile_store.read, profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return folded
+
+# ===========================
+# Admin: Memory Diagnostics
+# ===========================
+
+async def memory_diagnostics_call(func, *args):
+    # Snapshots and diffs walk every traced allocation (seconds on a large heap); keep them off the event loop
+    try:
+        return await run_in_threadpool(func, *args)
+    except SnapshotNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TracingOff as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except MemoryDiagnosticsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/admin/memory")
+async def admin_memory_routes(payload: dict = Depends(verify_admin)):
+    """Traced and resident memory, plus peak allocation per route"""
+    return memory_diagnostics.routes()
+
+@app.post("/api/admin/memory/snapshots")
+async def admin_take_memory_snapshot(label: Optional[str] = None, payload: dict = Depends(verify_admin)):
+    return await memory_diagnostics_call(memory_diagnostics.take_snapshot, label)
+
+@app.get("/api/admin/memory/snapshots")
+async def admin_list_memory_snapshots(payload: dict = Depends(verify_admin)):
+    return memory_diagnostics.list_snapshots()
+
+@app.get("/api/admin/memory/snapshots/{snapshot_id}")
+async def admin_memory_snapshot_top(snapshot_id: str, key_type: str = "lineno",
+                                    limit: int = Query(25, ge=1, le=200), payload: dict = Depends(verify_admin)):
+    """Largest allocations in a snapshot, grouped by `key_type` (lineno, filename or traceback)"""
+    return await memory_diagnostics_call(memory_diagnostics.top, snapshot_id, key_type, limit)
+
+@app.get("/api/admin/memory/diff")
+async def admin_memory_diff(from_id: str, to_id: Optional[str] = None, key_type: str = "lineno",
+                            limit: int = Query(25, ge=1, le=200), payload: dict = Depends(verify_admin)):
+    """Allocation growth between two snapshots, or from `from_id` to now"""
+    return await memory_diagnostics_call(memory_diagnostics.diff, from_id, to_id, key_type, limit)
 
 if __name__ == "__main__":
     import uvicorn
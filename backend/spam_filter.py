@@ -0,0 +1,177 @@
+"""
+Near-duplicate and spam detection for contact and quote submissions.
+
+Runs before anything is stored or mailed. Two cheap stages:
+
+  heuristics   link stuffing (many URLs, HTML/BBCode links) in the message
+  near-dupes   MinHash signatures of word shingles, bucketed with LSH in a
+               rolling in-memory index. A submission whose estimated Jaccard
+               similarity to one seen within the window reaches the threshold
+               is a duplicate if it comes from the same sender, or part of a
+               flood once `flood_size` similar ones arrived from anyone.
+               Messages shorter than FLOOD_MIN_WORDS only count as same-sender
+               duplicates, so short generic requests ("please call me back")
+               from different people are never flagged.
+
+A same-sender near-duplicate on its own may be a repeat customer rather
+than spam, so that verdict asks for review (`needs_review`) instead of
+dropping the submission. Only the first MAX_WORDS words are shingled, which
+keeps a check well under a millisecond however long the text is.
+
+The index lives in the worker process, so duplicates spread over several
+workers can slip through; it catches the common cases (double-clicks, bots
+hammering one connection).
+"""
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+from search import fold
+
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+SHINGLE_SIZE = 3
+FLOOD_MIN_WORDS = 8
+MAX_WORDS = 300
+MASK_64 = (1 << 64) - 1
+
+_URL_RE = re.compile(r"https?://|www\.", re.IGNORECASE)
+_MARKUP_LINK_RE = re.compile(r"<a\s+href|\[url[=\]]", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class SpamVerdict:
+    def __init__(self, reasons: List[str]):
+        self.reasons = reasons
+
+    @property
+    def is_spam(self) -> bool:
+        return bool(self.reasons)
+
+    @property
+    def needs_review(self) -> bool:
+        """Flagged only for resembling the sender's own recent submission"""
+        return self.reasons == ["near_duplicate"]
+
+
+def link_reasons(text: str, max_links: int = 2) -> List[str]:
+    reasons = []
+    links = len(_URL_RE.findall(text))
+    if links > max_links:
+        reasons.append("too_many_links")
+    if _MARKUP_LINK_RE.search(text):
+        reasons.append("markup_links")
+    words = len(text.split())
+    # Short messages that are mostly links
+    if links and words and links / words > 0.25:
+        reasons.append("link_density")
+    return reasons
+
+
+class NearDuplicateIndex:
+    """
+    Rolling MinHash/LSH index. Entries older than `window_seconds` (or beyond
+    `max_entries`) are evicted on each check.
+    """
+
+    def __init__(self, window_seconds: float = 3600.0, threshold: float = 0.8, flood_size: int = 5,
+                 max_entries: int = 50000, seed: int = 1):
+        self.window_seconds = window_seconds
+        self.threshold = threshold
+        self.flood_size = flood_size
+        self.max_entries = max_entries
+        rng = random.Random(seed)
+        # Multiply-add hash family: (a * h + b) mod 2^64 with odd a
+        self._params = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(NUM_HASHES)]
+        self._entries: deque = deque()  # (timestamp, entry_id, band_keys)
+        self._buckets: Dict[tuple, Set[int]] = {}
+        self._signatures: Dict[int, tuple] = {}  # entry_id -> (signature, sender)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def signature(self, words: List[str]) -> Optional[tuple]:
+        if not words:
+            return None
+        if len(words) < SHINGLE_SIZE:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+        # One hash per shingle, then a cheap universal hash per "permutation"
+        hashes = [hash(shingle) & MASK_64 for shingle in shingles]
+        return tuple(min((a * h + b) & MASK_64 for h in hashes) for a, b in self._params)
+
+    def _band_keys(self, signature: tuple, namespace: str) -> List[tuple]:
+        return [(namespace, band) + signature[band * ROWS:(band + 1) * ROWS] for band in range(BANDS)]
+
+    def _evict(self, now: float) -> None:
+        while self._entries and (now - self._entries[0][0] > self.window_seconds
+                                 or len(self._entries) > self.max_entries):
+            _, entry_id, band_keys = self._entries.popleft()
+            self._signatures.pop(entry_id, None)
+            for key in band_keys:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(entry_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def check_and_add(self, text: str, sender: str, now: Optional[float] = None,
+                      namespace: str = "") -> Optional[str]:
+        """
+        Return "near_duplicate", "flood" or None for `text`; remember it either way.
+        Texts are only compared within their `namespace`.
+        """
+        words = _WORD_RE.findall(fold(text))[:MAX_WORDS]
+        signature = self.signature(words)
+        if signature is None:
+            return None
+        can_flood = len(words) >= FLOOD_MIN_WORDS
+        now = time.monotonic() if now is None else now
+        band_keys = self._band_keys(signature, namespace)
+        min_matches = self.threshold * NUM_HASHES
+
+        with self._lock:
+            self._evict(now)
+            candidates = set()
+            for key in band_keys:
+                candidates |= self._buckets.get(key, set())
+
+            verdict = None
+            similar = 0
+            for candidate in candidates:
+                other_signature, other_sender = self._signatures[candidate]
+                if sum(a == b for a, b in zip(signature, other_signature)) < min_matches:
+                    continue
+                if other_sender == sender:
+                    verdict = "near_duplicate"
+                    break
+                similar += 1
+                if can_flood and similar + 1 >= self.flood_size:
+                    verdict = "flood"
+                    break
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._signatures[entry_id] = (signature, sender)
+            self._entries.append((now, entry_id, band_keys))
+            for key in band_keys:
+                self._buckets.setdefault(key, set()).add(entry_id)
+        return verdict
+
+
+class SpamFilter:
+    def __init__(self, index: NearDuplicateIndex, max_links: int = 2):
+        self.index = index
+        self.max_links = max_links
+
+    def check(self, kind: str, text: str, sender: str) -> SpamVerdict:
+        """`kind` keeps contact messages and quote descriptions in separate namespaces"""
+        reasons = link_reasons(text, self.max_links)
+        duplicate = self.index.check_and_add(text, sender.lower(), namespace=kind)
+        if duplicate:
+            reasons.append(duplicate)
+        return SpamVerdict(reasons)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Staff roles for /api/admin.
+
+Admin access comes from a `roles` list stored on the user document, never
+from the email in the token: registration doesn't prove ownership of an
+address, so anyone could sign up as a staff email. Roles are granted out of
+band, by someone with database access, once the account exists:
+
+Usage: python staff.py grant contact@sparksonic.lu
+       python staff.py revoke contact@sparksonic.lu
+       python staff.py list
+"""
+import argparse
+import os
+from datetime import datetime
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+ADMIN_ROLE = "admin"
+
+
+def is_admin(user: dict) -> bool:
+    return ADMIN_ROLE in (user or {}).get("roles", ())
+
+
+def grant(users, email: str, role: str = ADMIN_ROLE) -> bool:
+    """Give an existing account `role`; False if there is no such account"""
+    result = users.update_one(
+        {"email": email},
+        {"$addToSet": {"roles": role}, "$set": {"updated_at": datetime.utcnow().isoformat()}}
+    )
+    return result.matched_count == 1
+
+
+def revoke(users, email: str, role: str = ADMIN_ROLE) -> bool:
+    result = users.update_one(
+        {"email": email},
+        {"$pull": {"roles": role}, "$set": {"updated_at": datetime.utcnow().isoformat()}}
+    )
+    return result.matched_count == 1
+
+
+def holders(users, role: str = ADMIN_ROLE) -> list:
+    return [user["email"] for user in users.find({"roles": role}, {"email": 1}).sort("email", 1)]
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Grant or revoke staff roles")
+    parser.add_argument("action", choices=["grant", "revoke", "list"])
+    parser.add_argument("email", nargs="?")
+    parser.add_argument("--role", default=ADMIN_ROLE)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL"))
+    args = parser.parse_args()
+    if args.action != "list" and not args.email:
+        parser.error(f"{args.action} needs an email")
+
+    users = MongoClient(args.mongo_url).get_database()["users"]
+    if args.action == "list":
+        for email in holders(users, args.role):
+            print(email)
+        return
+    changed = (grant if args.action == "grant" else revoke)(users, args.email, args.role)
+    if not changed:
+        raise SystemExit(f"❌ No account registered for {args.email}")
+    print(f"✅ {args.action} {args.role}: {args.email}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Unit tests for the backend modules. Run from backend/:
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+
+Mongo is replaced by mongomock; nothing here needs a running server.
+"""
+import os
+import sys
+
+import mongomock
+import pytest
+from pymongo.collection import Collection
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# server.py connects lazily; nothing listens here, so a stray real query fails fast
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:1/sparksonic_test?serverSelectionTimeoutMS=300")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """server.py with every module-level collection swapped for mongomock"""
+    import server as module
+
+    db = mongomock.MongoClient().get_database("sparksonic_test")
+    monkeypatch.setattr(module, "db", db)
+    for name, value in list(vars(module).items()):
+        if name.endswith("_collection") and isinstance(value, Collection):
+            monkeypatch.setattr(module, name, db[value.name])
+    # Objects built at import time keep their own references
+    for holder in (module.scheduler, module.notification_digest):
+        for name, value in list(vars(holder).items()):
+            if isinstance(value, Collection):
+                monkeypatch.setattr(holder, name, db[value.name])
+    monkeypatch.setattr(module.read_router, "secondaries", False)
+    return module
+
+
+@pytest.fixture
+def client(server):
+    from fastapi.testclient import TestClient
+
+    # Not used as a context manager, so startup hooks (indexes, refreshers) don't run
+    return TestClient(server.app)
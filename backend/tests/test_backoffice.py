@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+import backoffice
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    for i in range(7):
+        doc = {
+            "status": "new" if i % 2 else "read",
+            "service": "solar",
+            "created_at": (START + timedelta(hours=i // 2)).isoformat(),
+        }
+        db.contacts.insert_one(doc)
+        backoffice.record_insert(db.listing_counters, "contacts", doc)
+    return db
+
+
+def listing(db, **kwargs):
+    # mongomock can't use the declared hint indexes; ordering and filtering are what's under test
+    return backoffice.list_documents(db, db.listing_counters, "contacts", kwargs.pop("filters", {}), **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def no_hint(monkeypatch):
+    monkeypatch.setattr(mongomock.collection.Cursor, "hint", lambda self, index: self, raising=False)
+
+
+def test_keyset_pages_cover_every_document_once_across_equal_timestamps(db):
+    seen, cursor = [], None
+    while True:
+        page = listing(db, limit=2, cursor=cursor)
+        seen += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert len({doc["_id"] for doc in seen}) == 7
+    keys = [(doc["created_at"], doc["_id"]) for doc in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_totals_come_from_estimate_counters_or_nothing(db):
+    assert listing(db)["total_source"] == "estimate"
+    filtered = listing(db, filters={"status": "new"})
+    assert (filtered["total"], filtered["total_source"]) == (3, "counter")
+    dated = listing(db, created_from=(START + timedelta(hours=1)).isoformat())
+    assert dated["total"] is None and len(dated["items"]) == 5
+
+
+def test_invalid_parameters_raise_listing_error(db):
+    with pytest.raises(backoffice.ListingError):
+        listing(db, cursor="not-a-cursor")
+    with pytest.raises(backoffice.ListingError):
+        listing(db, sort="updated_at")
+    with pytest.raises(backoffice.ListingError):
+        listing(db, created_from="yesterday")
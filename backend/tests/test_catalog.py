@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from catalog import CATALOG_PATH, CatalogError, ServiceCatalog, write_bundles
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return ServiceCatalog()
+
+
+@pytest.mark.parametrize("lang, accept_language, locale", [
+    (None, None, "en"),
+    ("fr", "de", "fr"),
+    ("FR-lu", None, "fr"),
+    ("it", "de-LU,de;q=0.9", "de"),
+    (None, "it, fr;q=0.5, de;q=0.8", "de"),
+    (None, "fr;q=0.7, de;q=0.7", "fr"),       # equal weights: first listed wins
+    (None, "de;q=0, fr;q=bad", "en"),         # refused and unparseable entries don't count
+    (None, "*", "en"),
+])
+def test_negotiate(catalog, lang, accept_language, locale):
+    assert catalog.negotiate(lang, accept_language) == locale
+
+
+def test_resolve_id_accepts_ids_and_localized_names(catalog):
+    assert catalog.resolve_id("solar-panels") == "solar-panels"
+    assert catalog.resolve_id("  Panneaux solaires ") == "solar-panels"
+    assert catalog.resolve_id("solarmodule") == "solar-panels"
+    assert catalog.resolve_id("gardening") is None
+    assert catalog.resolve_id(None) is None
+
+
+def test_bundles_are_versioned_by_content(catalog, tmp_path):
+    bundle = catalog.bundle("de")
+    services = json.loads(bundle.body)
+
+    assert services[0]["name"] == "Solarmodule"
+    assert catalog.manifest()["versions"]["de"] == bundle.version
+    assert len(set(catalog.manifest()["versions"].values())) == len(catalog.locales)
+    assert any(path.endswith(f"services.de.{bundle.version}.json") for path in write_bundles(catalog, str(tmp_path)))
+
+
+def test_missing_translation_is_rejected(tmp_path):
+    with open(CATALOG_PATH, encoding="utf-8") as f:
+        raw = json.load(f)
+    del raw["services"][0]["description"]["de"]
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(raw), encoding="utf-8")
+
+    with pytest.raises(CatalogError, match="no de translation"):
+        ServiceCatalog(str(path))
+
+
+def test_services_endpoint_caches_pinned_versions(server, client):
+    bundle = server.service_catalog.bundle("fr")
+
+    pinned = client.get(f"/api/services?lang=fr&v={bundle.version}")
+    assert pinned.headers["cache-control"].endswith("immutable")
+    assert pinned.headers["content-language"] == "fr"
+
+    revalidated = client.get("/api/services", headers={"Accept-Language": "fr-LU", "If-None-Match": bundle.etag})
+    assert revalidated.status_code == 304
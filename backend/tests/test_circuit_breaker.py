@@ -0,0 +1,66 @@
+import pytest
+import requests
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def test_opens_after_threshold_and_lets_one_trial_through(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("circuit_breaker.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+@pytest.fixture
+def google(server, monkeypatch):
+    breaker = CircuitBreaker("google_places", failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(server, "google_circuit", breaker)
+    calls = []
+
+    def get(url, timeout):
+        calls.append(url)
+        raise requests.ConnectionError("unreachable")
+
+    monkeypatch.setattr(server.requests, "get", get)
+    return breaker, calls
+
+
+def test_refresh_records_failures_and_stops_calling_when_open(client, google):
+    breaker, calls = google
+
+    assert client.post("/api/reviews/refresh").status_code == 502
+    assert client.post("/api/reviews/refresh").status_code == 502
+    assert breaker.state == OPEN
+
+    response = client.post("/api/reviews/refresh")
+    assert response.status_code == 503
+    assert len(calls) == 2
+
+
+def test_refresh_success_closes_the_circuit(server, client, google, monkeypatch):
+    breaker, _ = google
+    breaker.record_failure()
+
+    class Reply:
+        @staticmethod
+        def json():
+            return {"status": "OK", "result": {"rating": 4.9, "user_ratings_total": 60, "reviews": [{"text": "Great"}]}}
+
+    monkeypatch.setattr(server.requests, "get", lambda url, timeout: Reply())
+    response = client.post("/api/reviews/refresh")
+
+    assert response.status_code == 200
+    assert response.json()["reviews_count"] == 1
+    assert breaker.failures == 0
+    assert server.reviews_cache_collection.find_one({"type": "google_reviews"})["total_reviews"] == 60
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+from pymongo.errors import ExecutionTimeout, ServerSelectionTimeoutError
+
+import deadlines
+from deadlines import DeadlineExceeded, deadline_var
+
+
+@pytest.fixture
+def deadline():
+    """Set the current request's deadline `seconds` from now"""
+    tokens = []
+
+    def set_deadline(seconds):
+        tokens.append(deadline_var.set(time.monotonic() + seconds))
+
+    yield set_deadline
+    for token in reversed(tokens):
+        deadline_var.reset(token)
+
+
+def test_outside_a_request_nothing_is_capped():
+    assert deadlines.remaining() is None
+    assert deadlines.timeout(10) == 10
+    assert deadlines.cap(3) == 3
+    assert not deadlines.expired()
+    deadlines.check()
+
+
+def test_calls_are_shortened_to_the_budget(deadline):
+    deadline(2)
+
+    assert deadlines.timeout(10) <= 2
+    assert deadlines.timeout(1) == 1
+    assert 1.5 < deadlines.cap(5) <= 2
+    assert not deadlines.expired()
+
+
+def test_spent_budget(deadline):
+    deadline(0.01)
+
+    assert deadlines.expired()
+    assert deadlines.cap(5) <= 0.01
+    with pytest.raises(DeadlineExceeded):
+        deadlines.timeout(10)
+
+
+def test_detached_work_runs_without_the_deadline(deadline):
+    deadline(0.01)
+    assert deadlines.detached(deadlines.remaining)() is None
+
+
+@pytest.mark.parametrize("offset, divisor", [(-2, 1), (-2, 1e-3), (-2, 1e-6)])
+def test_request_start_accepts_seconds_ms_and_us(offset, divisor):
+    started = time.time() + offset
+    value = f"t={started / divisor:.0f}" if divisor != 1 else f"{started:.3f}"
+
+    assert deadlines._request_start(value.encode()) == pytest.approx(started, abs=1)
+
+
+def test_request_start_ignores_nonsense():
+    assert deadlines._request_start(b"soon") is None
+    assert deadlines._request_start(b"12") is None
+
+
+class Request:
+    class url:
+        path = "/api/quotes"
+
+
+def handle(server, exc):
+    try:
+        return asyncio.run(server.mongo_error_handler(Request, exc)).status_code
+    except type(exc):
+        return 500
+
+
+def test_mongo_timeouts_are_504_only_when_the_deadline_expired(server, deadline):
+    unreachable = ServerSelectionTimeoutError("No servers found")
+    slow_query = ExecutionTimeout("operation exceeded time limit", code=50)
+
+    # Down database, plenty of budget left: retryable, not the client's deadline
+    deadline(5)
+    assert handle(server, unreachable) == 503
+    assert handle(server, slow_query) == 500
+
+    deadline(0)
+    assert handle(server, unreachable) == 504
+    assert handle(server, slow_query) == 504
@@ -0,0 +1,74 @@
+import pytest
+
+import estimator
+
+
+def test_solar_ranges_are_ordered_and_subsidised():
+    result = estimator.estimate("solar-panels", {"roof_area_m2": 40, "annual_consumption_kwh": 5000})
+
+    for field in ("gross_price", "net_price", "annual_savings", "payback_years"):
+        assert result[field]["low"] <= result[field]["typical"] <= result[field]["high"]
+    assert result["net_price"]["high"] < result["gross_price"]["high"]
+    assert result["system"]["size_kwp"]["high"] <= estimator.TABLES["solar"]["max_kwp"]
+    assert result["tables_version"] == estimator.TABLES_VERSION
+    assert result["scenarios"] == 3 * 5 * 7 * 3 * 3 * 7
+
+
+def test_solar_needs_a_usable_roof():
+    with pytest.raises(estimator.EstimateError):
+        estimator.estimate("solar-panels", {})
+    with pytest.raises(estimator.EstimateError, match="too small"):
+        estimator.estimate("solar-panels", {"roof_area_m2": 5})
+
+
+def test_heat_pump_savings_grow_with_worse_insulation():
+    poor = estimator.estimate("heat-pumps", {"floor_area_m2": 150, "insulation": "poor"})
+    good = estimator.estimate("heat-pumps", {"floor_area_m2": 150, "insulation": "good"})
+
+    assert poor["annual_savings"]["typical"] > good["annual_savings"]["typical"]
+    assert poor["inputs"]["current_heating"] == "oil"
+
+
+def test_heat_pump_rejects_unknown_choices():
+    with pytest.raises(estimator.EstimateError, match="current_heating"):
+        estimator.estimate("heat-pumps", {"current_heating": "coal"})
+
+
+def test_payback_that_never_happens_is_reported_as_none():
+    # Cheap gas against a low-SCOP heat pump: some scenarios never save money
+    result = estimator.estimate("heat-pumps", {"current_heating": "gas", "insulation": "good"})
+
+    assert result["payback_years"]["low"] is not None
+    assert result["payback_years"]["high"] is None
+    assert estimator.describe(result).endswith("n/a years")
+
+
+def test_unsupported_service():
+    with pytest.raises(estimator.EstimateError):
+        estimator.estimate("electrical-work", {"roof_area_m2": 40})
+
+
+@pytest.fixture
+def quote(server, monkeypatch):
+    monkeypatch.setattr(server, "NOTIFICATION_DIGEST_SECONDS", 0)
+    monkeypatch.setattr(server, "send_email", lambda *args, **kwargs: True)
+    return {"service": "solar-panels", "description": "New roof installation", "location": "Luxembourg",
+            "phone": "+352 621 000 000", "email": "lead@example.lu"}
+
+
+def test_quotes_are_only_estimated_with_inputs(server, client, quote):
+    without = client.post("/api/quotes", json=quote).json()["quote_id"]
+    with_inputs = client.post("/api/quotes", json=dict(
+        quote, email="other@example.lu", estimate_inputs={"roof_area_m2": 40}
+    )).json()["quote_id"]
+
+    assert "estimate" not in server.quotes_collection.find_one({"quote_id": without})
+    assert server.quotes_collection.find_one({"quote_id": with_inputs})["estimate"]["service"] == "solar-panels"
+
+
+def test_empty_estimate_inputs_are_no_inputs(server, client, quote):
+    quote_id = client.post("/api/quotes", json=dict(
+        quote, service="heat-pumps", estimate_inputs={"floor_area_m2": None}
+    )).json()["quote_id"]
+
+    assert "estimate" not in server.quotes_collection.find_one({"quote_id": quote_id})
@@ -0,0 +1,76 @@
+import json
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+import export
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # mongomock doesn't know the back-office index names; the order is what's under test
+    monkeypatch.setattr(mongomock.collection.Cursor, "hint", lambda self, index: self, raising=False)
+    db = mongomock.MongoClient().db
+    start = datetime(2024, 1, 1)
+    # Inserted out of date order, with ties, so _id order and created_at order differ
+    for hours in (5, 1, 3, 1, 4, 2, 1):
+        db.quotes.insert_one({"quote_id": f"QT-{hours}", "created_at": (start + timedelta(hours=hours)).isoformat()})
+    return db
+
+
+def rows(batches):
+    return [(doc["created_at"], doc["_id"]) for batch in batches for doc in batch]
+
+
+def test_date_range_export_is_in_created_at_order(db):
+    exported = rows(export.iter_batches(db, "quotes", "2024-01-01T01:00:00", "2024-01-01T05:00:00", batch_size=2))
+
+    assert exported == sorted(exported)
+    assert len(exported) == 6
+
+
+@pytest.mark.parametrize("pass_created_at", [True, False])
+def test_date_range_export_resumes_after_the_last_row(db, pass_created_at):
+    full = rows(export.iter_batches(db, "quotes", "2024-01-01T00:00:00"))
+    last_created_at, last_id = full[2]
+
+    resumed = rows(export.iter_batches(
+        db, "quotes", "2024-01-01T00:00:00", after_id=last_id,
+        after_created_at=last_created_at if pass_created_at else None,
+    ))
+
+    assert resumed == full[3:]
+
+
+def test_resume_from_an_unknown_row_needs_its_created_at(db):
+    with pytest.raises(export.ExportError):
+        list(export.iter_batches(db, "quotes", "2024-01-01T00:00:00", after_id=ObjectId()))
+
+
+def test_full_export_resumes_by_id(db):
+    full = rows(export.iter_batches(db, "quotes"))
+    assert [row[1] for row in full] == sorted(row[1] for row in full)
+
+    assert rows(export.iter_batches(db, "quotes", after_id=full[3][1])) == full[4:]
+
+
+def test_export_to_file_resumes_a_date_range_export(db, tmp_path):
+    path = str(tmp_path / "quotes.ndjson")
+    first = export.export_to_file(db, "quotes", "ndjson", path, created_from="2024-01-01T00:00:00")
+    with open(path) as f:
+        written = [json.loads(line)["_id"] for line in f]
+
+    # Pretend the run stopped after the third row
+    with open(path, "rb") as f:
+        offset = len(b"".join(f.readlines()[:3]))
+    third = db.quotes.find_one({"_id": ObjectId(written[2])})
+    with open(path + ".resume", "w") as f:
+        json.dump({"after_id": written[2], "after_created_at": third["created_at"], "offset": offset}, f)
+
+    resumed = export.export_to_file(db, "quotes", "ndjson", path, created_from="2024-01-01T00:00:00", resume=True)
+
+    with open(path) as f:
+        assert [json.loads(line)["_id"] for line in f] == written
+    assert (first, resumed) == (7, 4)
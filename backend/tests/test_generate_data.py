@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import mongomock
+import pytest
+
+import generate_data
+
+
+def make_ctx(end):
+    return {
+        "seed": 7,
+        "users": 100,
+        "bursts": generate_data.burst_days(7),
+        "end": end,
+        "password_hash": "hash",
+    }
+
+
+def test_batches_are_deterministic_and_bounded_by_end():
+    end = datetime(2024, 6, 1)
+    first = generate_data.build_batch("tickets", 0, 0, 200, make_ctx(end))
+    again = generate_data.build_batch("tickets", 0, 0, 200, make_ctx(end))
+
+    assert first == again
+    assert all(doc["created_at"] <= end.isoformat() for doc in first)
+    assert all(doc["search_terms"] for doc in first)
+
+
+def test_build_batch_works_without_a_worker_initializer():
+    # build_batch must not depend on state only the pool initializer sets
+    docs = generate_data.build_batch("quotes", 3, 1000, 10, make_ctx(datetime(2020, 1, 1)))
+
+    assert [doc["quote_id"] for doc in docs] == [f"QT-{i:08X}" for i in range(1000, 1010)]
+    assert max(doc["created_at"] for doc in docs) <= "2020-01-01T00:00:00"
+
+
+def test_refuses_to_add_to_non_empty_collections(monkeypatch, capsys):
+    client = mongomock.MongoClient("mongodb://localhost/sparksonic_test")
+    client.get_database().quotes.insert_one({"quote_id": "QT-00000000"})
+    monkeypatch.setattr(generate_data, "MongoClient", lambda url: client)
+    monkeypatch.setattr("sys.argv", ["generate_data.py", "--mongo-url", "mongodb://localhost/sparksonic_test",
+                                     "--collections", "users", "quotes"])
+
+    with pytest.raises(SystemExit) as exit_info:
+        generate_data.main()
+
+    assert exit_info.value.code == 2
+    assert "quotes already hold documents" in capsys.readouterr().err
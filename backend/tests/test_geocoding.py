@@ -0,0 +1,151 @@
+import pytest
+
+import geocoding
+
+
+@pytest.fixture(scope="module")
+def geocoder():
+    return geocoding.Geocoder()
+
+
+def place(geocoder, text):
+    match = geocoder.geocode(text)
+    return match and (match["place"], match["method"], match["postal_code"])
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("rue du Kiem 8070 Bertrange", ("Bertrange", "name", "8070")),
+    ("Esch 2020", ("Esch-sur-Alzette", "name", "2020")),
+    ("12 rue de la Gare, L-4131 Esch", ("Esch-sur-Alzette", "name", "4131")),
+    ("Diddeleng", ("Dudelange", "name", None)),
+    ("6790 Aubange", ("Aubange", "postal_code", "6790")),
+    ("6791", ("Athus", "postal_code", "6791")),
+    ("F-57100", ("Thionville", "postal_code", "57100")),
+    ("Diekrich", ("Diekirch", "fuzzy", None)),
+    ("Thionvile", ("Thionville", "fuzzy", None)),
+])
+def test_geocode_examples(geocoder, text, expected):
+    assert place(geocoder, text) == expected
+
+
+def test_nothing_to_place(geocoder):
+    assert geocoder.geocode("") is None
+    assert geocoder.geocode("zzzz qqqq") is None
+
+
+def test_bundled_table_has_no_luxembourg_postal_ranges(geocoder):
+    # Luxembourg codes come per locality from postal_codes.csv, never from guessed ranges
+    assert "LU" not in geocoder._postal
+    assert geocoder.geocode("Differdange 4501")["postal_code"] == "4501"
+
+
+@pytest.fixture
+def ranged(tmp_path):
+    path = tmp_path / "places.csv"
+    path.write_text(
+        "country,postal_codes,name,commune,region,lat,lon,aliases\n"
+        "LU,8001-8099,Strassen,Strassen,Luxembourg,49.6203,6.0733,\n"
+        "LU,,Bertrange,Bertrange,Luxembourg,49.6111,6.0500,Bartreng\n"
+        "LU,4501-4599,Differdange,Differdange,Esch-sur-Alzette,49.5242,5.8914,\n"
+        "LU,,Oberkorn,Differdange,Esch-sur-Alzette,49.5119,5.8942,\n",
+        encoding="utf-8",
+    )
+    return geocoding.Geocoder(str(path))
+
+
+def test_named_town_beats_a_code_from_another_commune(ranged):
+    match = ranged.geocode("rue du Kiem 8070 Bertrange")
+
+    assert (match["place"], match["method"], match["postal_code"]) == ("Bertrange", "name", "8070")
+    assert match["postal_code_conflict"] is True
+
+
+def test_code_alone_or_with_a_locality_of_its_commune(ranged):
+    assert place(ranged, "8070") == ("Strassen", "postal_code", "8070")
+    assert place(ranged, "L-4501 Oberkorn") == ("Oberkorn", "postal_code", "4501")
+    assert "postal_code_conflict" not in ranged.geocode("L-4501 Oberkorn")
+
+
+@pytest.fixture
+def coded(tmp_path):
+    path = tmp_path / "postal_codes.csv"
+    path.write_text(
+        "# comment\n"
+        "country,postal_code,locality\n"
+        "LU,4131,Esch-sur-Alzette\n"
+        "LU,8080,Bertrange\n"
+        "LU,8080,Strassen\n",
+        encoding="utf-8",
+    )
+    return geocoding.Geocoder(postal_codes_path=str(path))
+
+
+def test_per_locality_codes_place_the_text(coded):
+    assert place(coded, "L-4131") == ("Esch-sur-Alzette", "postal_code", "4131")
+    assert place(coded, "12 rue de la Gare, L-4131 Esch") == ("Esch-sur-Alzette", "postal_code", "4131")
+    # A code two localities share is settled by the one named
+    assert place(coded, "8080 Strassen") == ("Strassen", "postal_code", "8080")
+    assert place(coded, "8080 Bertrange") == ("Bertrange", "postal_code", "8080")
+    assert "postal_code_conflict" not in coded.geocode("8080 Strassen")
+
+
+def test_code_rows_must_name_a_known_place(tmp_path):
+    path = tmp_path / "postal_codes.csv"
+    path.write_text("country,postal_code,locality\nLU,9999,Atlantis\n", encoding="utf-8")
+
+    with pytest.raises(geocoding.GeocodingError, match="row 2"):
+        geocoding.Geocoder(postal_codes_path=str(path))
+
+
+def test_import_writes_known_localities_once(geocoder, tmp_path):
+    source = tmp_path / "official.csv"
+    source.write_text(
+        "code_postal;localite;rue\n"
+        "L-4131;Esch-sur-Alzette;Rue de la Gare\n"
+        "4131;Esch-sur-Alzette;Rue du Brill\n"
+        "8080;Bartreng;Rue du Kiem\n"
+        "9999;Atlantis;Rue de la Mer\n",
+        encoding="utf-8",
+    )
+    destination = tmp_path / "postal_codes.csv"
+
+    written, unknown = geocoding.import_postal_codes(geocoder, str(source), str(destination))
+
+    assert (written, unknown) == (2, ["Atlantis"])
+    imported = geocoding.Geocoder(postal_codes_path=str(destination))
+    assert place(imported, "L-8080") == ("Bertrange", "postal_code", "8080")
+
+
+def test_overlapping_ranges_are_rejected(tmp_path):
+    path = tmp_path / "places.csv"
+    path.write_text(
+        "country,postal_codes,name,commune,region,lat,lon,aliases\n"
+        "LU,8001-8099,Strassen,Strassen,Luxembourg,49.6203,6.0733,\n"
+        "LU,8050-8060,Bertrange,Bertrange,Luxembourg,49.6111,6.0500,\n",
+        encoding="utf-8",
+    )
+
+    with pytest.raises(geocoding.GeocodingError, match="overlap"):
+        geocoding.Geocoder(str(path))
+
+
+def test_within_query_is_a_nearest_first_radius_filter():
+    point = {"type": "Point", "coordinates": [5.9806, 49.4958]}
+
+    assert geocoding.within_query(point, 15) == {
+        "geo": {"$nearSphere": {"$geometry": point, "$maxDistance": 15000}}
+    }
+
+
+def test_nearest_orders_by_distance_and_skips_unplaced(geocoder):
+    esch = geocoder.geocode("Esch")["point"]
+    documents = [
+        {"_id": "trier", "base_location": geocoder.geocode("Trier")["point"]},
+        {"_id": "nowhere"},
+        {"_id": "dudelange", "base_location": geocoder.geocode("Dudelange")["point"]},
+    ]
+
+    ranked = geocoding.nearest(esch, documents, "base_location")
+
+    assert [doc["_id"] for _, doc in ranked] == ["dudelange", "trier"]
+    assert 5 < ranked[0][0] < 10
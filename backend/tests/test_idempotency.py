@@ -0,0 +1,84 @@
+import mongomock
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from idempotency import IdempotencyMiddleware
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def client(calls):
+    app = FastAPI()
+
+    @app.post("/api/things")
+    async def create_thing(payload: dict, response: Response):
+        calls.append(payload)
+        response.headers["X-Causal-Token"] = f"token-{len(calls)}"
+        if payload.get("fail"):
+            response.status_code = 503
+        return {"number": len(calls)}
+
+    app.add_middleware(IdempotencyMiddleware, collection=mongomock.MongoClient().db.keys, paths=["/api/things"])
+    return TestClient(app)
+
+
+def test_retry_replays_stored_response(client, calls):
+    first = client.post("/api/things", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+    second = client.post("/api/things", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+
+    assert len(calls) == 1
+    assert second.status_code == first.status_code == 200
+    assert second.json() == first.json() == {"number": 1}
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+
+
+def test_replay_keeps_causal_token(client):
+    first = client.post("/api/things", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+    second = client.post("/api/things", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+
+    assert second.headers["x-causal-token"] == first.headers["x-causal-token"] == "token-1"
+
+
+def test_key_reused_with_different_body_is_rejected(client, calls):
+    client.post("/api/things", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+    response = client.post("/api/things", json={"a": 2}, headers={"Idempotency-Key": "k1"})
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+def test_keys_are_scoped_to_authorization(client, calls):
+    client.post("/api/things", json={"a": 1}, headers={"Idempotency-Key": "k1", "Authorization": "Bearer one"})
+    response = client.post("/api/things", json={"a": 1}, headers={"Idempotency-Key": "k1", "Authorization": "Bearer two"})
+
+    assert len(calls) == 2
+    assert "idempotent-replayed" not in response.headers
+
+
+def test_server_errors_release_the_key(client, calls):
+    client.post("/api/things", json={"fail": True}, headers={"Idempotency-Key": "k1"})
+    response = client.post("/api/things", json={"fail": True}, headers={"Idempotency-Key": "k1"})
+
+    assert len(calls) == 2
+    assert "idempotent-replayed" not in response.headers
+
+
+def test_requests_without_key_pass_through(client, calls):
+    client.post("/api/things", json={"a": 1})
+    client.post("/api/things", json={"a": 1})
+
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("key", ["   ", "x" * 256])
+def test_invalid_key_is_rejected(client, calls, key):
+    response = client.post("/api/things", json={"a": 1}, headers={"Idempotency-Key": key})
+
+    assert response.status_code == 400
+    assert calls == []
@@ -0,0 +1,132 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+import images
+
+
+def png(color, size=(800, 400)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, "PNG")
+    return out.getvalue()
+
+
+class Source:
+    """Stands in for requests.get; serves whatever `data` currently is"""
+
+    def __init__(self, data):
+        self.data = data
+        self.fetches = 0
+
+    def __call__(self, url, timeout, stream):
+        self.fetches += 1
+        data = self.data
+
+        class Reply:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                yield data
+
+        return Reply()
+
+
+@pytest.fixture
+def source(monkeypatch):
+    source = Source(png("red"))
+    monkeypatch.setattr(images.requests, "get", source)
+    return source
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    pipeline = images.ImagePipeline(images.DiskCache(str(tmp_path), 50 * 1024 * 1024))
+    # Render in threads; worker processes add nothing to these tests
+    pipeline._pool = ThreadPoolExecutor(max_workers=2)
+    yield pipeline
+    pipeline.shutdown()
+
+
+def test_derivatives_are_keyed_on_source_content(pipeline, source, monkeypatch):
+    url = "https://cdn.example/project.png"
+    path, digest = asyncio.run(pipeline.derivative(url, "thumb", "webp"))
+    pipeline.cache.release(path)
+    with Image.open(path) as image:
+        assert image.width == images.PRESETS["thumb"]
+
+    # Same URL, new image behind it: noticed once the source is re-checked
+    source.data = png("blue")
+    monkeypatch.setattr(images, "SOURCE_MAX_AGE", 0)
+    new_path, new_digest = asyncio.run(pipeline.derivative(url, "thumb", "webp"))
+    pipeline.cache.release(new_path)
+
+    assert new_digest != digest and new_path != path
+    assert images.image_version(new_digest) != images.image_version(digest)
+
+
+def test_fresh_sources_are_not_fetched_again(pipeline, source):
+    for preset in ("thumb", "card"):
+        path, _ = asyncio.run(pipeline.derivative("https://cdn.example/a.png", preset, "webp"))
+        pipeline.cache.release(path)
+
+    assert source.fetches == 1
+
+
+def test_eviction_skips_pinned_files(tmp_path):
+    cache = images.DiskCache(str(tmp_path), max_bytes=250)
+    pinned = cache.put("a", b"x" * 100)
+    cache.release(cache.put("b", b"x" * 100))
+    os.utime(pinned, (0, 0))  # the least recently used one
+
+    cache.release(cache.put("c", b"x" * 100))
+
+    assert os.path.exists(pinned)
+    assert not os.path.exists(cache.path("b"))
+    cache.release(pinned)
+    cache.release(cache.put("d", b"x" * 100))
+    assert not os.path.exists(pinned)
+
+
+def test_open_handle_survives_eviction(pipeline, source):
+    handle, _ = asyncio.run(pipeline.open("https://cdn.example/a.png", "card", "webp"))
+    size = os.fstat(handle.fileno()).st_size
+    for root, _, files in os.walk(pipeline.cache.directory):
+        for name in files:
+            os.remove(os.path.join(root, name))
+
+    assert len(b"".join(images.iter_file(handle))) == size
+    assert handle.closed
+
+
+def test_listing_versions_follow_the_served_content(server, client, pipeline, source, monkeypatch):
+    monkeypatch.setattr(server, "image_pipeline", pipeline)
+    project_id = server.projects_collection.insert_one(
+        {"title": "Roof", "date": "2024-05-01", "image": "https://cdn.example/roof.png"}
+    ).inserted_id
+
+    def card_url():
+        project = client.get("/api/projects").json()[0]
+        assert "image_digest" not in project
+        return project["image_variants"]["webp"]["card"]
+
+    # Not fetched yet: no version to pin
+    assert "?v=" not in card_url()
+    first = client.get(f"/api/images/projects/{project_id}/card.webp")
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=300"
+    assert int(first.headers["content-length"]) == len(first.content)
+
+    pinned = card_url()
+    assert "?v=" in pinned
+    assert client.get(pinned).headers["cache-control"].endswith("immutable")
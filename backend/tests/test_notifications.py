@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+import notifications
+from notifications import NotificationDigest, render_digest
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def digest(db, sent=None, ok=True, window_seconds=900):
+    def send(subject, body):
+        if sent is not None:
+            sent.append((subject, body))
+        return ok
+    return NotificationDigest(db.notification_queue, db.notification_schedule, send, window_seconds)
+
+
+def entry(kind, title, minute, message=""):
+    return {"kind": kind, "title": title, "fields": [["Email", "anne@example.lu"]], "message": message,
+            "created_at": datetime(2026, 3, 2, 9, minute)}
+
+
+def test_render_groups_by_kind_and_escapes():
+    subject, body = render_digest([
+        entry("contact", "Anne", 0),
+        entry("ticket", "<script>", 5, "x" * (notifications.MAX_MESSAGE_CHARS + 10)),
+        entry("contact", "Ben", 10),
+    ])
+
+    assert subject == "Sparksonic digest: 1 support tickets, 2 contact messages"
+    assert body.index("Support Tickets (1)") < body.index("Contact Messages (2)")
+    assert "<script>" not in body and "&lt;script&gt;" in body
+    assert "x" * notifications.MAX_MESSAGE_CHARS + "…" in body
+    assert "2026-03-02 09:00 – 09:10 UTC" in body
+
+
+def test_one_worker_per_window(db):
+    first, second = digest(db), digest(db)
+    now = datetime(2026, 3, 2, 9, 0)
+
+    assert first._acquire_window(now)
+    assert not second._acquire_window(now)
+    assert not first._acquire_window(now + timedelta(minutes=10))
+    # The next window is due a little early (0.9 x window) so a slow loop doesn't skip one
+    assert second._acquire_window(now + timedelta(seconds=900 * 0.9))
+
+
+def test_claims_never_overlap_and_stale_claims_are_taken_over(db):
+    first, second = digest(db), digest(db)
+    for title in ("Anne", "Ben"):
+        first.enqueue("contact", title, [("Email", "x@example.lu"), ("Phone", None)])
+    now = datetime.utcnow()
+
+    batch, entries = first._claim(now)
+    assert [e["title"] for e in entries] == ["Anne", "Ben"]
+    assert entries[0]["fields"] == [["Email", "x@example.lu"]]
+    assert second._claim(now)[1] == []
+
+    # A worker that died mid-flush leaves its claim; after three windows it's taken over
+    later = now + timedelta(seconds=900 * 3 + 1)
+    other_batch, taken = second._claim(later)
+    assert other_batch != batch
+    assert len(taken) == 2
+
+
+def test_failed_send_releases_the_claim(db):
+    failing = digest(db, ok=False)
+    failing.enqueue("quote", "QT-1", [])
+
+    assert failing.flush(force=True) == 0
+    assert db.notification_queue.find_one()["batch"] is None
+    assert "claimed_at" not in db.notification_queue.find_one()
+
+    sent = []
+    assert digest(db, sent).flush(force=True) == 1
+    assert sent[0][0] == "Sparksonic digest: 1 quote requests"
+    assert db.notification_queue.count_documents({}) == 0
+
+
+def test_flush_sends_large_queues_in_several_digests(db, monkeypatch):
+    monkeypatch.setattr(notifications, "MAX_ENTRIES_PER_DIGEST", 2)
+    sent = []
+    worker = digest(db, sent)
+    for n in range(5):
+        worker.enqueue("contact", f"C{n}", [])
+
+    assert worker.flush() == 5
+    assert len(sent) == 3
+    # Same window: another flush doesn't run
+    worker.enqueue("contact", "late", [])
+    assert worker.flush() == 0
+
+
+def test_once_per_window_is_per_key(db):
+    worker = digest(db)
+    now = datetime(2026, 3, 2, 9, 0)
+
+    assert worker.once_per_window("review:anne@example.lu", now)
+    assert not worker.once_per_window("review:anne@example.lu", now + timedelta(minutes=5))
+    assert worker.once_per_window("review:ben@example.lu", now)
+    assert worker.once_per_window("review:anne@example.lu", now + timedelta(minutes=15))
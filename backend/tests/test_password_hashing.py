@@ -0,0 +1,64 @@
+import pytest
+
+import password_hashing
+from password_hashing import BCRYPT_MAX_ROUNDS, BCRYPT_MIN_ROUNDS, build_context, calibrate
+
+
+def host(ms_at_floor):
+    """A host where one bcrypt hash at the floor takes `ms_at_floor`, doubling per round"""
+    def timed_hash(context, samples=3):
+        rounds = context.to_dict()["bcrypt__default_rounds"]
+        return ms_at_floor * 2 ** (rounds - BCRYPT_MIN_ROUNDS)
+    return timed_hash
+
+
+@pytest.mark.parametrize("ms_at_floor, expected", [(60, 12), (500, BCRYPT_MIN_ROUNDS), (0.001, BCRYPT_MAX_ROUNDS)])
+def test_calibrated_cost_stays_within_bounds(monkeypatch, ms_at_floor, expected):
+    monkeypatch.setattr(password_hashing, "_timed_hash", host(ms_at_floor))
+
+    assert calibrate("bcrypt", 250) == expected
+
+
+def test_fixed_cost_skips_calibration(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("calibrated")
+    monkeypatch.setattr(password_hashing, "calibrate", fail)
+
+    context = build_context("bcrypt", cost=11)
+
+    assert context.hash("secret").startswith("$2b$11$")
+
+
+def test_hosts_that_calibrate_differently_accept_each_others_hashes(monkeypatch):
+    monkeypatch.setattr(password_hashing, "_timed_hash", host(120))
+    slow = build_context("bcrypt", target_ms=250)
+    monkeypatch.setattr(password_hashing, "_timed_hash", host(30))
+    fast = build_context("bcrypt", target_ms=250)
+    assert slow.to_dict()["bcrypt__default_rounds"] < fast.to_dict()["bcrypt__default_rounds"]
+
+    slow_hash = build_context("bcrypt", cost=BCRYPT_MIN_ROUNDS).hash("secret")
+    fast_hash = build_context("bcrypt", cost=BCRYPT_MIN_ROUNDS + 1).hash("secret")
+    for context in (slow, fast):
+        assert not context.needs_update(slow_hash)
+        assert not context.needs_update(fast_hash)
+
+
+def test_hashes_below_the_minimum_are_upgraded_never_downgraded():
+    old = build_context("bcrypt", cost=BCRYPT_MIN_ROUNDS).hash("secret")
+    stronger = build_context("bcrypt", cost=BCRYPT_MIN_ROUNDS + 2).hash("secret")
+    context = build_context("bcrypt", cost=BCRYPT_MIN_ROUNDS + 1)
+
+    assert context.needs_update(old)
+    assert not context.needs_update(stronger)
+    assert context.verify("secret", old)
+
+    # A configured minimum below the cost keeps older hashes that still meet it
+    assert not build_context("bcrypt", cost=BCRYPT_MIN_ROUNDS + 1, min_cost=BCRYPT_MIN_ROUNDS).needs_update(old)
+
+
+def test_other_scheme_hashes_are_verified_and_upgraded():
+    argon2_hash = build_context("argon2", cost=2).hash("secret")
+    context = build_context("bcrypt", cost=BCRYPT_MIN_ROUNDS)
+
+    assert context.verify("secret", argon2_hash)
+    assert context.needs_update(argon2_hash)
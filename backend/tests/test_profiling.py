@@ -0,0 +1,44 @@
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+from profiling import ProfileStore, ProfilingMiddleware
+
+
+def test_profiles_are_saved_off_the_event_loop(tmp_path, monkeypatch):
+    store = ProfileStore(str(tmp_path / "profiles"), max_profiles=10)
+    save = store.save
+    saving_threads, loop_threads = [], []
+
+    def recording_save(metadata, folded):
+        saving_threads.append(threading.current_thread())
+        save(metadata, folded)
+
+    monkeypatch.setattr(store, "save", recording_save)
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        loop_threads.append(threading.current_thread())
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, store=store, sample_rate=1.0)
+    client = TestClient(app)
+    for _ in range(3):
+        assert client.get("/ping").status_code == 200
+
+    assert len(saving_threads) == 3
+    assert not set(saving_threads) & set(loop_threads)
+    profiles = store.list()
+    assert [profile["path"] for profile in profiles] == ["/ping"] * 3
+    assert store.read(profiles[0]["id"]) is not None
+
+
+def test_signed_tokens_expire():
+    token = profiling.sign_profile_token("secret", 2_000_000_000)
+
+    assert profiling.verify_profile_token("secret", token)
+    assert not profiling.verify_profile_token("other", token)
+    assert not profiling.verify_profile_token("secret", profiling.sign_profile_token("secret", 1))
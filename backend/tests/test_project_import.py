@@ -0,0 +1,125 @@
+import gzip
+import io
+import json
+
+import mongomock
+import pytest
+from pydantic import ValidationError
+
+import project_import
+from project_import import ProjectRecord
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def ndjson(*rows):
+    return io.BytesIO("".join(json.dumps(row) + "\n" for row in rows).encode())
+
+
+def project(slug="heat-pump-esch", **fields):
+    return {"slug": slug, "title": "Heat pump", "location": "Esch", "category": "Heat pumps", **fields}
+
+
+def run(db, raw, format="ndjson", **kwargs):
+    return project_import.import_projects(db.projects, db.cache_versions, raw, format, **kwargs)
+
+
+def test_record_strips_and_checks_fields():
+    record = ProjectRecord(**project(title="  Heat pump  ", date="2024-05-01"))
+
+    assert record.title == "Heat pump"
+    assert record.date == "2024-05-01"
+    with pytest.raises(ValidationError):
+        ProjectRecord(**project(date="01/05/2024"))
+    with pytest.raises(ValidationError):
+        ProjectRecord(**project(slug="Not A Slug"))
+    with pytest.raises(ValidationError):
+        ProjectRecord(**project(colour="red"))
+    with pytest.raises(ValidationError):
+        ProjectRecord(**project(details={f"k{i}": i for i in range(21)}))
+
+
+def test_read_rows_parses_csv_details_and_skips_empty_cells():
+    raw = io.BytesIO(
+        "﻿slug,title,location,category,description,details.kW\n"
+        "solar-mamer,Solar,Mamer,Solar,,9.6\n"
+        "too-many,Solar,Mamer,Solar,,1,extra\n".encode()
+    )
+
+    rows = list(project_import.read_rows(raw, "csv"))
+
+    assert rows[0] == (2, {"slug": "solar-mamer", "title": "Solar", "location": "Mamer",
+                           "category": "Solar", "details": {"kW": "9.6"}})
+    assert rows[1] == (3, "more cells than header columns")
+
+
+def test_read_rows_reads_gzipped_ndjson_and_reports_bad_lines():
+    raw = io.BytesIO(gzip.compress(b'{"slug": "a"}\n\nnot json\n'))
+
+    rows = list(project_import.read_rows(raw, "ndjson"))
+
+    assert rows[0] == (1, {"slug": "a"})
+    assert rows[1][0] == 3 and rows[1][1].startswith("invalid JSON")
+
+
+def test_reimport_keeps_fields_the_row_leaves_out(db):
+    run(db, ndjson(project(description="Installed in 3 days", image="https://img/1.jpg")))
+
+    report = run(db, ndjson(project(title="Heat pump, 12 kW")))
+
+    stored = db.projects.find_one({"slug": "heat-pump-esch"})
+    assert report["updated"] == 1
+    assert stored["title"] == "Heat pump, 12 kW"
+    assert stored["description"] == "Installed in 3 days"
+    assert stored["image"] == "https://img/1.jpg"
+
+
+def test_new_projects_get_the_defaults(db):
+    run(db, ndjson(project()))
+
+    stored = db.projects.find_one({"slug": "heat-pump-esch"})
+    assert stored["description"] == ""
+    assert stored["details"] == {}
+    assert stored["date"] is None
+    assert "created_at" in stored
+
+
+def test_invalid_rows_are_reported_and_the_rest_imported(db):
+    report = run(db, ndjson(project(), project(slug="bad slug"), [1, 2]))
+
+    assert report["inserted"] == 1
+    assert report["failed"] == 2
+    assert [error["line"] for error in report["errors"]] == [2, 3]
+    assert report["cache_version"] == 1
+
+
+def test_unreadable_tail_keeps_written_batches_and_bumps_the_cache(db):
+    head = "".join(json.dumps(project(slug=f"p-{i}")) + "\n" for i in range(3)).encode()
+    raw = io.BytesIO(head + b'{"slug": "\xff"}\n')
+
+    with pytest.raises(project_import.ProjectImportError) as e:
+        run(db, raw, batch_size=2)
+
+    assert db.projects.count_documents({}) == 2
+    assert e.value.report["inserted"] == 2
+    assert "2 inserted" in str(e.value)
+    assert project_import.cache_version(db.cache_versions) == 1
+
+
+def test_unreadable_file_with_nothing_written_leaves_the_cache(db):
+    with pytest.raises(project_import.ProjectImportError) as e:
+        run(db, io.BytesIO(b'{"slug": "\xff"}\n'))
+
+    assert e.value.report is None
+    assert project_import.cache_version(db.cache_versions) == 0
+
+
+def test_dry_run_writes_nothing(db):
+    report = run(db, ndjson(project()), dry_run=True)
+
+    assert report["dry_run"] is True
+    assert db.projects.count_documents({}) == 0
+    assert "cache_version" not in report
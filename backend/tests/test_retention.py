@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+import backoffice
+import retention
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    # Recent enough that a retention pass doesn't archive them
+    created_at = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    for i in range(7):
+        doc = {"status": "new" if i % 2 else "read", "service": "solar", "created_at": created_at}
+        db.contacts.insert_one(doc)
+        backoffice.record_insert(db.listing_counters, "contacts", doc)
+    return db
+
+
+def counter(db, **filters):
+    return db.listing_counters.find_one({"_id": backoffice._counter_id("contacts", filters)})["count"]
+
+
+def test_retention_deletes_expired_spam_and_decrements_counters(db):
+    spam = {"status": "spam", "service": "solar", "created_at": datetime.utcnow().isoformat(),
+            "expire_at": datetime.utcnow() - timedelta(minutes=1)}
+    db.contacts.insert_one(spam)
+    backoffice.record_insert(db.listing_counters, "contacts", spam)
+    assert counter(db, status="spam") == 1
+
+    removed = retention.delete_expired_batch(db, retention.POLICIES["contacts"], 100)
+
+    assert removed == 1
+    assert db.contacts.count_documents({"status": "spam"}) == 0
+    assert counter(db, status="spam") == 0
+    assert counter(db) == 7
+
+
+def test_retention_pass_rebuilds_counters_after_outside_changes(db, tmp_path):
+    db.contacts.update_many({"status": "read"}, {"$set": {"status": "answered"}})
+
+    assert "listing_counters" not in retention.run(db, str(tmp_path))
+    report = retention.run(db, str(tmp_path), rebuild_counters=True)
+
+    assert report["contacts"]["archived"] == 0
+    assert report["listing_counters"]["rebuilt"] > 0
+    assert counter(db, status="answered") == 4
+    assert db.listing_counters.find_one({"_id": backoffice._counter_id("contacts", {"status": "read"})}) is None
+
+
+def test_archiving_decrements_counters(db, tmp_path):
+    old = {"status": "answered", "service": "solar", "created_at": "2020-01-01T00:00:00"}
+    db.contacts.insert_one(old)
+    backoffice.record_insert(db.listing_counters, "contacts", old)
+
+    report = retention.run(db, str(tmp_path))
+
+    assert report["contacts"]["archived"] == 1
+    assert counter(db, status="answered") == 0
+    assert counter(db) == 7
+    assert retention.fetch_archived(db, str(tmp_path), "contacts", str(old["_id"]))["status"] == "answered"
+
+
+def test_rebuild_writes_fresh_counts_before_pruning(db):
+    counters = db.listing_counters
+    delete_many = counters.delete_many
+    totals_seen = []
+
+    class Counters:
+        def __getattr__(self, name):
+            return getattr(counters, name)
+
+        def delete_many(self, query):
+            totals_seen.append(counter(db))
+            return delete_many(query)
+
+    db.contacts.update_many({"status": "read"}, {"$set": {"status": "answered"}})
+    backoffice.rebuild_counters(db, Counters(), "contacts")
+
+    # Listings never see a missing total while stale counters are pruned
+    assert totals_seen == [7]
+    assert counter(db, status="answered") == 4
@@ -0,0 +1,194 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import scheduling
+from spam_filter import SpamVerdict
+from scheduling import Scheduler, free_starts, mask
+
+DAY = date(2026, 3, 2)
+
+
+class Days:
+    """The one conditional upsert _claim makes; mongomock has neither $bitsAllClear nor $bit"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find_one_and_update(self, filter, update, upsert=False, projection=None):
+        doc = self.docs.get(filter["_id"])
+        if doc is not None and int(doc["busy"]) & int(filter["busy"]["$bitsAllClear"]):
+            doc = None
+            if upsert:
+                raise DuplicateKeyError("E11000 duplicate key error")
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self.docs[filter["_id"]] = {"_id": filter["_id"], "busy": 0, "bookings": [], **update["$setOnInsert"]}
+        doc["busy"] = int(doc["busy"]) | int(update["$bit"]["busy"]["or"])
+        doc["bookings"].append(update["$push"]["bookings"])
+        return {"_id": doc["_id"]}
+
+
+@pytest.fixture
+def scheduler():
+    return Scheduler(None, Days())
+
+
+def test_free_starts_needs_the_whole_run_free():
+    free = 0b0111_0011
+
+    assert free_starts(free, 1) == free
+    assert free_starts(free, 2) == 0b0011_0001
+    assert free_starts(free, 3) == 0b0001_0000
+    assert free_starts(free, 4) == 0
+
+
+def test_free_starts_over_a_working_day():
+    working = scheduling.working_mask({}, DAY)
+    busy = mask(scheduling.slot_index("10:00"), 2)
+
+    starts = free_starts(working & ~busy, 4)
+
+    times = [scheduling.slot_time(n) for n in range(scheduling.SLOTS_PER_DAY) if starts >> n & 1]
+    assert times[:3] == ["08:00", "11:00", "11:30"]
+    assert times[-1] == "15:00"
+
+
+def test_claim_creates_the_day_and_sets_the_bits(scheduler):
+    assert scheduler._claim("tech-1", DAY, mask(16, 4), {"appointment_id": "APT-1"})
+
+    doc = scheduler.days.docs[f"tech-1|{DAY.isoformat()}"]
+    assert doc["busy"] == mask(16, 4)
+    assert doc["technician_id"] == "tech-1"
+    assert [b["appointment_id"] for b in doc["bookings"]] == ["APT-1"]
+
+
+def test_claim_refuses_overlapping_slots_and_allows_adjacent_ones(scheduler):
+    scheduler._claim("tech-1", DAY, mask(16, 4), {"appointment_id": "APT-1"})
+
+    assert not scheduler._claim("tech-1", DAY, mask(18, 4), {"appointment_id": "APT-2"})
+    assert scheduler._claim("tech-1", DAY, mask(20, 2), {"appointment_id": "APT-3"})
+    assert scheduler._claim("tech-1", DAY + timedelta(days=1), mask(18, 4), {"appointment_id": "APT-4"})
+
+    doc = scheduler.days.docs[f"tech-1|{DAY.isoformat()}"]
+    assert doc["busy"] == mask(16, 6)
+    assert [b["appointment_id"] for b in doc["bookings"]] == ["APT-1", "APT-3"]
+
+
+def test_claim_retries_a_day_created_concurrently(scheduler):
+    days = scheduler.days
+    update = days.find_one_and_update
+    raced = []
+
+    def racing(filter, *args, **kwargs):
+        # The first attempt loses the upsert race to a booking elsewhere in the day
+        if not raced:
+            raced.append(True)
+            days.docs[filter["_id"]] = {"_id": filter["_id"], "busy": mask(30, 2), "bookings": []}
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return update(filter, *args, **kwargs)
+
+    days.find_one_and_update = racing
+
+    assert scheduler._claim("tech-1", DAY, mask(16, 4), {"appointment_id": "APT-1"})
+    assert days.docs[f"tech-1|{DAY.isoformat()}"]["busy"] == mask(16, 4) | mask(30, 2)
+
+
+def test_book_checks_the_bookable_range():
+    scheduler = Scheduler(None, None, horizon_days=30, lead_days=1)
+
+    with pytest.raises(scheduling.SchedulingError, match="from"):
+        scheduler.book("ev-chargers", DAY, "09:00", "QT-1", today=DAY)
+    with pytest.raises(scheduling.SchedulingError, match="grid"):
+        scheduler.book("ev-chargers", DAY + timedelta(days=1), "09:10", "QT-1", today=DAY)
+
+
+@pytest.fixture
+def quote(server, monkeypatch):
+    monkeypatch.setattr(server, "NOTIFICATION_DIGEST_SECONDS", 0)
+    monkeypatch.setattr(server, "send_email", lambda *args, **kwargs: True)
+    day = server.scheduler.bookable_range()[0]
+    return {"service": "ev-chargers", "description": "Wallbox in the garage", "location": "Luxembourg",
+            "phone": "+352 621 000 000", "email": "lead@example.lu",
+            "appointment": {"date": day.isoformat(), "start": "09:00"}}
+
+
+def auth(server, email="lead@example.lu"):
+    return {"Authorization": f"Bearer {server.create_access_token({'sub': email, 'customer_id': 'CUST-1'})}"}
+
+
+def test_booking_needs_an_account(server, client, quote):
+    response = client.post("/api/quotes", json=quote)
+
+    assert response.status_code == 401
+    assert server.quotes_collection.count_documents({}) == 0
+    # Without a visit the quote form stays open to everyone
+    assert client.post("/api/quotes", json=dict(quote, appointment=None)).status_code == 200
+
+
+def test_booking_an_unknown_service_is_rejected(server, client, quote):
+    response = client.post("/api/quotes", json=dict(quote, service="plumbing"), headers=auth(server))
+
+    assert response.status_code == 422
+    assert server.quotes_collection.count_documents({}) == 0
+
+
+@pytest.fixture
+def booking(server, monkeypatch, quote):
+    """Scheduler stand-in (mongomock has no $bit) slow enough for submissions to overlap"""
+    server.users_collection.insert_one({"email": "lead@example.lu", "customer_id": "CUST-1"})
+    # The same description over and over would be held for review and never booked
+    monkeypatch.setattr(server.spam_filter, "check", lambda kind, text, sender: SpamVerdict([]))
+
+    def book(service_id, day, start, quote_id, near=None, today=None):
+        time.sleep(0.05)
+        return {"appointment_id": f"APT-{quote_id}", "technician_id": "tech-1", "technician_name": "Anna",
+                "date": day.isoformat(), "start": start, "end": "10:00"}
+
+    monkeypatch.setattr(server.scheduler, "book", book)
+    monkeypatch.setattr(server.scheduler, "cancel", lambda appointment_id: True)
+    return quote
+
+
+def reservations(server):
+    return server.users_collection.find_one({"email": "lead@example.lu"}).get("visit_reservations", [])
+
+
+def test_parallel_bookings_never_exceed_the_cap(server, client, booking):
+    headers = auth(server)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        codes = list(pool.map(lambda _: client.post("/api/quotes", json=booking, headers=headers).status_code, range(6)))
+
+    assert sorted(codes) == [200] * server.MAX_OPEN_APPOINTMENTS + [429] * (6 - server.MAX_OPEN_APPOINTMENTS)
+    assert len(reservations(server)) == server.MAX_OPEN_APPOINTMENTS
+    assert server.quotes_collection.count_documents({"appointment": {"$exists": True}}) == server.MAX_OPEN_APPOINTMENTS
+
+
+def test_cancelled_failed_and_past_visits_give_their_place_back(server, client, booking, monkeypatch):
+    headers = auth(server)
+    admin = auth(server, "staff@sparksonic.lu")
+    server.users_collection.insert_one({"email": "staff@sparksonic.lu", "customer_id": "CUST-STAFF", "roles": ["admin"]})
+    first = client.post("/api/quotes", json=booking, headers=headers).json()
+    client.post("/api/quotes", json=booking, headers=headers)
+    assert client.post("/api/quotes", json=booking, headers=headers).status_code == 429
+
+    cancelled = client.delete(f"/api/admin/appointments/{first['appointment']['appointment_id']}", headers=admin)
+    assert cancelled.status_code == 200
+    assert len(reservations(server)) == 1
+
+    def taken(*args, **kwargs):
+        raise scheduling.SlotTaken("This slot is no longer available")
+    monkeypatch.setattr(server.scheduler, "book", taken)
+    monkeypatch.setattr(server.scheduler, "availability", lambda *args, **kwargs: [])
+    assert client.post("/api/quotes", json=booking, headers=headers).status_code == 409
+    assert len(reservations(server)) == 1
+
+    server.users_collection.update_one({"email": "lead@example.lu"},
+                                       {"$set": {"visit_reservations.0.date": "2020-01-01"}})
+    server.reserve_visit("lead@example.lu", "QT-NEXT", booking["appointment"]["date"])
+    server.reserve_visit("lead@example.lu", "QT-LAST", booking["appointment"]["date"])
+    assert [r["quote_id"] for r in reservations(server)] == ["QT-NEXT", "QT-LAST"]
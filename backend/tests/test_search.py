@@ -0,0 +1,45 @@
+import pytest
+
+import search
+
+
+@pytest.mark.parametrize("text, folded", [
+    ("Élévation", "elevation"),
+    ("Straße", "strasse"),
+    ("Wärmepumpe ÜBER", "warmepumpe uber"),
+    ("Lëtzebuerg", "letzebuerg"),
+])
+def test_fold_strips_accents_and_case(text, folded):
+    assert search.fold(text) == folded
+
+
+def test_tokenize_drops_stop_words_of_all_three_languages():
+    assert search.tokenize("The heat pump für das Haus, pour la maison!") == ["heat", "pump", "haus", "maison"]
+
+
+@pytest.mark.parametrize("token, stemmed", [
+    ("chargers", "charg"),
+    ("installation", "install"),
+    ("heizungen", "heiz"),
+    ("pompes", "pomp"),
+    ("bus", "bus"),       # stem would be shorter than 3 letters
+    ("2024", "2024"),     # numbers are never stemmed
+])
+def test_stem_strips_one_suffix(token, stemmed):
+    assert search.stem(token) == stemmed
+
+
+def test_search_fields_share_stems_and_prefixes_across_inflections():
+    fields = search.search_fields("quotes", {"description": "Installation de bornes de recharge", "service": "ev-charger"})
+    terms = fields["search_terms"].split()
+    prefixes = fields["search_prefixes"].split()
+
+    assert search.stem("installations") in terms
+    assert "rec" in prefixes and "recharge" in prefixes
+    assert "de" not in terms
+    assert all(search.MIN_PREFIX <= len(prefix) <= search.MAX_PREFIX for prefix in prefixes)
+
+
+def test_build_query_adds_the_partial_word_for_prefix_matches():
+    assert search.build_query("Chargeurs") == "charg chargeurs"
+    assert search.build_query("le la et") is None
@@ -0,0 +1,107 @@
+import pytest
+
+from spam_filter import MAX_WORDS, NearDuplicateIndex, SpamFilter, link_reasons
+
+MESSAGE = "We would like solar panels on the roof of our house in Esch and a battery for the evenings"
+
+
+def test_link_heuristics():
+    assert link_reasons("Call me back please") == []
+    assert "too_many_links" in link_reasons("http://a.example http://b.example www.c.example and more words here")
+    assert "markup_links" in link_reasons('great <a href="http://x.example">deal</a> for your company today')
+    assert "link_density" in link_reasons("see http://x.example")
+
+
+def test_same_sender_repeat_needs_review_rather_than_spam():
+    spam_filter = SpamFilter(NearDuplicateIndex())
+
+    assert not spam_filter.check("quote", MESSAGE, "anne@example.lu").is_spam
+    verdict = spam_filter.check("quote", MESSAGE + " please", "Anne@example.lu")
+
+    assert verdict.reasons == ["near_duplicate"]
+    assert verdict.is_spam and verdict.needs_review
+
+
+def test_flood_from_many_senders_is_spam():
+    spam_filter = SpamFilter(NearDuplicateIndex(flood_size=3))
+    verdicts = [spam_filter.check("contact", MESSAGE, f"sender{i}@example.lu") for i in range(3)]
+
+    assert [verdict.reasons for verdict in verdicts] == [[], [], ["flood"]]
+    assert not verdicts[-1].needs_review
+
+
+def test_short_generic_messages_never_flood():
+    index = NearDuplicateIndex(flood_size=2)
+    assert all(index.check_and_add("please call me back", f"s{i}@example.lu") is None for i in range(5))
+
+
+def test_kinds_are_separate_namespaces():
+    spam_filter = SpamFilter(NearDuplicateIndex())
+    spam_filter.check("contact", MESSAGE, "anne@example.lu")
+
+    assert not spam_filter.check("quote", MESSAGE, "anne@example.lu").is_spam
+
+
+def test_entries_expire_after_the_window():
+    index = NearDuplicateIndex(window_seconds=60)
+    index.check_and_add(MESSAGE, "anne@example.lu", now=0)
+
+    assert index.check_and_add(MESSAGE, "anne@example.lu", now=30) == "near_duplicate"
+    assert index.check_and_add(MESSAGE, "anne@example.lu", now=200) is None
+
+
+def test_only_the_leading_words_are_hashed():
+    index = NearDuplicateIndex()
+    head = " ".join(f"word{i}" for i in range(MAX_WORDS))
+    index.check_and_add(head + " " + "tail " * 1000, "anne@example.lu")
+
+    assert index.check_and_add(head + " something else entirely", "anne@example.lu") == "near_duplicate"
+
+
+@pytest.fixture
+def mailed(server, monkeypatch):
+    from spam_filter import NearDuplicateIndex, SpamFilter
+
+    monkeypatch.setattr(server, "spam_filter", SpamFilter(NearDuplicateIndex()))
+    monkeypatch.setattr(server, "NOTIFICATION_DIGEST_SECONDS", 0)
+    sent = []
+    monkeypatch.setattr(server, "send_email", lambda to, subject, body, html=True: sent.append(subject) or True)
+    return sent
+
+
+def contact(message, email="anne@example.lu"):
+    return {"name": "Anne", "email": email, "message": message}
+
+
+def test_repeat_contact_is_stored_for_review_and_staff_notified(server, client, mailed):
+    client.post("/api/contact", json=contact(MESSAGE))
+    mailed.clear()
+    response = client.post("/api/contact", json=contact(MESSAGE))
+
+    assert response.status_code == 200
+    assert [doc["status"] for doc in server.contacts_collection.find()] == ["new", "review"]
+    # Staff get a review notification; the customer isn't confirmed twice
+    assert mailed == ["[Review] New Contact: Anne"]
+    assert "expire_at" not in server.contacts_collection.find_one({"status": "review"})
+
+
+def test_repeats_notify_staff_once_per_window(server, client, mailed):
+    for _ in range(4):
+        client.post("/api/contact", json=contact(MESSAGE))
+
+    assert server.contacts_collection.count_documents({"status": "review"}) == 3
+    assert [subject for subject in mailed if subject.startswith("[Review]")] == ["[Review] New Contact: Anne"]
+
+
+def test_link_spam_is_not_mailed(server, client, mailed):
+    response = client.post("/api/contact", json=contact("Cheap SEO http://a.example http://b.example http://c.example"))
+
+    assert response.status_code == 200
+    assert server.contacts_collection.find_one()["status"] == "spam"
+    assert mailed == []
+
+
+def test_overlong_messages_are_rejected(client, mailed):
+    response = client.post("/api/contact", json=contact("x" * 5001))
+
+    assert response.status_code == 422
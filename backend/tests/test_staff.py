@@ -0,0 +1,44 @@
+import mongomock
+import pytest
+
+import staff
+
+
+@pytest.fixture
+def users():
+    users = mongomock.MongoClient().db.users
+    users.insert_one({"email": "staff@sparksonic.lu"})
+    return users
+
+
+def test_grant_and_revoke(users):
+    assert staff.grant(users, "staff@sparksonic.lu")
+    assert staff.grant(users, "staff@sparksonic.lu")
+    assert users.find_one()["roles"] == ["admin"]
+    assert staff.holders(users) == ["staff@sparksonic.lu"]
+
+    assert staff.revoke(users, "staff@sparksonic.lu")
+    assert not staff.is_admin(users.find_one())
+
+
+def test_grant_needs_an_existing_account(users):
+    assert not staff.grant(users, "nobody@sparksonic.lu")
+    assert users.count_documents({}) == 1
+
+
+def test_admin_endpoints_check_the_stored_role(server, client):
+    server.users_collection.insert_many([
+        {"email": "staff@sparksonic.lu", "customer_id": "CUST-STAFF", "roles": ["admin"]},
+        {"email": "customer@example.com", "customer_id": "CUST-1"},
+    ])
+
+    def get(email):
+        token = server.create_access_token({"sub": email, "customer_id": "x"})
+        return client.get("/api/admin/technicians", headers={"Authorization": f"Bearer {token}"})
+
+    assert get("staff@sparksonic.lu").status_code == 200
+    assert get("customer@example.com").status_code == 403
+    # A valid token for an address that has no account (or lost the role) is not enough
+    assert get("contact@sparksonic.lu").status_code == 403
+    staff.revoke(server.users_collection, "staff@sparksonic.lu")
+    assert get("staff@sparksonic.lu").status_code == 403
@@ -0,0 +1,68 @@
+import json
+import logging
+import queue
+import time
+
+import pytest
+
+import structured_logging
+from structured_logging import JsonFormatter, NonBlockingQueueHandler
+
+
+@pytest.fixture
+def log():
+    logger = logging.getLogger("test.structured_logging")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    yield logger
+    logger.handlers.clear()
+
+
+def test_full_queue_drops_records_without_blocking(log):
+    # Nothing drains this queue, like a listener stuck on a backed-up pipe
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=10))
+    log.addHandler(handler)
+
+    started = time.perf_counter()
+    for n in range(1000):
+        log.info("event %d", n)
+
+    assert time.perf_counter() - started < 1
+    assert handler.queue.qsize() == 10
+    assert handler.dropped == 990
+
+
+def test_dropped_records_sums_the_root_handlers(monkeypatch):
+    root = logging.getLogger()
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.dropped = 7
+    monkeypatch.setattr(root, "handlers", root.handlers + [handler])
+
+    assert structured_logging.dropped_records() >= 7
+
+
+def test_records_are_json_with_request_id_and_extras(log):
+    handler = NonBlockingQueueHandler(queue.Queue())
+    log.addHandler(handler)
+    token = structured_logging.request_id_var.set("req-1")
+    try:
+        log.info("Quote %s", "QT-1", extra={"reasons": ["flood"]})
+    finally:
+        structured_logging.request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(handler.queue.get_nowait()))
+    assert entry["message"] == "Quote QT-1"
+    assert entry["request_id"] == "req-1"
+    assert entry["reasons"] == ["flood"]
+
+
+def test_logging_health_check_reports_new_drops(server, monkeypatch):
+    dropped = {"count": 0}
+    monkeypatch.setattr(server, "dropped_records", lambda: dropped["count"])
+    monkeypatch.setattr(server, "log_drops", {"reported": 0})
+
+    assert server.check_logging() == {"dropped_total": 0}
+    dropped["count"] = 5
+    with pytest.raises(RuntimeError, match="5 log records dropped"):
+        server.check_logging()
+    assert server.check_logging() == {"dropped_total": 5}
@@ -404,6 +404,7 @@ export default function Home() {
                   <textarea
                     required
                     rows={5}
+                    maxLength={5000}
                     value={contactForm.message}
                     onChange={(e) => setContactForm({ ...contactForm, message: e.target.value })}
                     className="w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary focus:border-transparent"
@@ -533,6 +533,7 @@ export default function ServiceDetailPage() {
                 <textarea
                   required
                   rows={5}
+                  maxLength={5000}
                   value={quoteForm.message}
                   onChange={(e) => setQuoteForm({ ...quoteForm, message: e.target.value })}
                   className="w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary focus:border-transparent"
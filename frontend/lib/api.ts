@@ -46,10 +46,68 @@ api.interceptors.request.use((config) => {
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Lets reads served by a replica see this tab's own recent writes
+    const causalToken = sessionStorage.getItem('causalToken');
+    if (causalToken) {
+      config.headers['X-Causal-Token'] = causalToken;
+    }
   }
   return config;
 });
 
+api.interceptors.response.use((response) => {
+  const causalToken = response.headers['x-causal-token'];
+  if (causalToken && typeof window !== 'undefined') {
+    sessionStorage.setItem('causalToken', causalToken);
+  }
+  return response;
+});
+
+// Form submissions carry an Idempotency-Key so a retry (timeout, dropped
+// connection, double click) replays the first response instead of creating a
+// second record. The key is kept per path and body until the server gives a
+// final answer, so resubmitting the same form after a failure reuses it.
+const submissionKeys = new Map<string, string>();
+const SUBMIT_ATTEMPTS = 3;
+
+const newIdempotencyKey = () => {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+};
+
+const isRetryable = (error: any) => {
+  const status = error?.response?.status;
+  // No response (network error/timeout), still in progress (409) or a server error
+  return !status || status === 409 || status >= 500;
+};
+
+const submit = async (path: string, data: any) => {
+  const submission = `${path} ${JSON.stringify(data)}`;
+  let key = submissionKeys.get(submission);
+  if (!key) {
+    key = newIdempotencyKey();
+    submissionKeys.set(submission, key);
+  }
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const response = await api.post(path, data, { headers: { 'Idempotency-Key': key } });
+      submissionKeys.delete(submission);
+      return response;
+    } catch (error) {
+      if (!isRetryable(error)) {
+        submissionKeys.delete(submission);
+        throw error;
+      }
+      if (attempt >= SUBMIT_ATTEMPTS) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** (attempt - 1)));
+    }
+  }
+};
+
 // Auth API
 export const authAPI = {
   register: (data: any) => api.post('/auth/register', data),
@@ -59,24 +117,36 @@ export const authAPI = {
 
 // Contact API
 export const contactAPI = {
-  submit: (data: any) => api.post('/contact', data),
+  submit: (data: any) => submit('/contact', data),
 };
 
 // Quotes API
 export const quotesAPI = {
-  create: (data: any) => api.post('/quotes', data),
+  create: (data: any) => submit('/quotes', data),
   getUserQuotes: () => api.get('/quotes/user'),
 };
 
+// Geocoding API (offline lookup of a quote/ticket location)
+export const geocodeAPI = {
+  lookup: (q: string) => api.get('/geocode', { params: { q } }),
+};
+
+// Appointments API
+export const appointmentsAPI = {
+  getAvailability: (service: string, date?: string, limit?: number) =>
+    api.get('/appointments/availability', { params: { service, date, limit } }),
+};
+
 // Tickets API
 export const ticketsAPI = {
-  create: (data: any) => api.post('/tickets', data),
+  create: (data: any) => submit('/tickets', data),
   getUserTickets: () => api.get('/tickets/user'),
 };
 
 // Services API
 export const servicesAPI = {
-  getAll: () => api.get('/services'),
+  getAll: (lang?: string, version?: string) => api.get('/services', { params: { lang, v: version } }),
+  getManifest: () => api.get('/services/manifest'),
 };
 
 // Reviews API